@@ -0,0 +1,35 @@
+"""
+Bandwidth and CPU trade-offs of compression: the transferred bytes, wall
+time and CPU time of a large get_all response of each vegetable table, for
+every coding the router supports, for rows encoded by the route and for
+pages served from the page cache.
+"""
+import statistics
+
+from common import TABLES, make_client, measure, measure_cpu
+
+from crouton.core._compression import offered_encodings
+
+ROWS = 5000
+
+
+def main() -> None:
+    print(f"{'':<36} {'bytes':>10} {'wall ms':>9} {'cpu ms':>9}")
+    for table, spec in TABLES.items():
+        for options in ({}, {"page_cache": True, "trusted_output": True}):
+            for coding in ("identity", *offered_encodings()):
+                client, _ = make_client(ROWS, table, compress=True, **options)
+                headers = {"Accept-Encoding": coding}
+
+                def get() -> int:
+                    return client.raw_size(f"/{spec.prefix}", headers=headers)
+
+                size = get()
+                wall = statistics.median(measure(get)) * 1000
+                cpu = statistics.median(measure_cpu(get)) * 1000
+                label = f"{table}, {coding}, {'page cache' if options else 'rows'}"
+                print(f"{label:<36} {size:>10} {wall:>9.2f} {cpu:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Overhead of the metrics hook: the latency of get_one with and without
+metrics, and the cost of a single counter increment and histogram
+observation.
+"""
+import timeit
+
+from common import make_client, measure, report
+
+from crouton.core import MetricsRegistry
+from crouton.core._metrics import LATENCY_BUCKETS
+
+CALLS = 200
+
+
+def main() -> None:
+    for metrics in (False, True):
+        client, _ = make_client(1000, metrics=MetricsRegistry() if metrics else False)
+
+        def calls() -> None:
+            for i in range(1, CALLS + 1):
+                client.get(f"/potato/{i}").raise_for_status()
+
+        report(f"{CALLS} get_one calls, metrics={metrics}", measure(calls, repeat=10))
+
+    registry = MetricsRegistry()
+    registry.counter("calls_total", "Calls")
+    registry.histogram("call_seconds", "Call time", LATENCY_BUCKETS)
+    labels = (("prefix", "/potato"), ("route", "get_one"))
+    number = 1_000_000
+    inc = timeit.timeit(lambda: registry.inc("calls_total", labels), number=number)
+    observe = timeit.timeit(
+        lambda: registry.observe("call_seconds", labels, 0.003), number=number
+    )
+    print(f"inc     {inc / number * 1e9:8.0f} ns per call")
+    print(f"observe {observe / number * 1e9:8.0f} ns per call")
+
+
+if __name__ == "__main__":
+    main()
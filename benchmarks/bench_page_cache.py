@@ -0,0 +1,58 @@
+"""
+A synthetic expiry storm: a write turns the cached page of get_all stale,
+then CONCURRENT identical reads of it arrive at once. Reports the SELECTs a
+storm issues and its wall time without the page cache, with it, and with
+the stale page served while a single request refreshes it.
+"""
+import statistics
+import time
+from typing import Any, List
+
+from common import make_client, potato
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROWS = 5000
+LIMIT = 1000
+CONCURRENT = 50
+ROUNDS = 20
+
+selects: List[str] = []
+
+
+def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    if statement.startswith("SELECT"):
+        selects.append(statement)
+
+
+def main() -> None:
+    event.listen(Engine, "before_cursor_execute", record)
+    for label, options in (
+        ("no cache", {}),
+        ("page_cache", {"page_cache": True}),
+        ("page_cache, cache_stale=1", {"page_cache": True, "cache_stale": 1.0}),
+    ):
+        client, _ = make_client(ROWS, **options)
+        params = {"limit": LIMIT}
+        client.get("/potato", params=params).raise_for_status()
+
+        timings, counts = [], []
+        for _ in range(ROUNDS):
+            client.request("POST", "/potato", json=potato(0)).raise_for_status()
+            selects.clear()
+            start = time.perf_counter()
+            storm = client.concurrent(CONCURRENT, "GET", "/potato", params=params)
+            timings.append(time.perf_counter() - start)
+            for response in storm:
+                response.raise_for_status()
+            counts.append(len(selects))
+
+        median = statistics.median(timings) * 1000
+        print(
+            f"{label:<28} {statistics.mean(counts):5.1f} SELECTs per storm   "
+            f"median {median:8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""
+Time of a large get_all response validated through the response model, as
+FastAPI does by default, against trusted_output writing the rows straight to
+JSON.
+"""
+from common import make_client, measure, report
+
+ROWS = 5000
+
+
+def main() -> None:
+    for trusted in (False, True):
+        client, _ = make_client(ROWS, trusted_output=trusted)
+        timings = measure(lambda: client.get("/potato").raise_for_status())
+        report(f"get_all {ROWS} rows, trusted_output={trusted}", timings)
+
+
+if __name__ == "__main__":
+    main()
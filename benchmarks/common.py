@@ -0,0 +1,246 @@
+"""
+Shared setup of the benchmarks: SQLite potato, carrot and onion tables served
+by the generated routers. Run a benchmark from the repository root with
+
+    PYTHONPATH=env/Lib/site-packages python benchmarks/<name>.py
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Tuple, Type
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+from sqlalchemy import Column, Float, Integer, String, create_engine, insert
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from crouton import SQLAlchemyCRUDRouter
+
+Base = declarative_base()
+
+
+class PotatoCreate(BaseModel):
+    thickness: float
+    mass: float
+    color: str
+    type: str
+
+
+class Potato(PotatoCreate):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class PotatoModel(Base):
+    __tablename__ = "potatoes"
+    id = Column(Integer, primary_key=True, index=True)
+    thickness = Column(Float)
+    mass = Column(Float)
+    color = Column(String)
+    type = Column(String)
+
+
+class CarrotCreate(BaseModel):
+    length: float
+    color: str
+
+
+class Carrot(CarrotCreate):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class CarrotModel(Base):
+    __tablename__ = "carrots"
+    id = Column(Integer, primary_key=True, index=True)
+    length = Column(Float)
+    color = Column(String)
+
+
+class OnionCreate(BaseModel):
+    name: str
+    layers: int
+    mass: float
+    origin: str
+    notes: str
+
+
+class Onion(OnionCreate):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class OnionModel(Base):
+    __tablename__ = "onions"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String)
+    layers = Column(Integer)
+    mass = Column(Float)
+    origin = Column(String)
+    notes = Column(String)
+
+
+def potato(i: int) -> dict:
+    return {
+        "thickness": 0.1 * i,
+        "mass": float(i),
+        "color": ("red", "brown", "yellow")[i % 3],
+        "type": f"type {i % 50}",
+    }
+
+
+def carrot(i: int) -> dict:
+    return {"length": 10 + (i * 7919) % 200 / 10, "color": ("orange", "purple")[i % 2]}
+
+
+def onion(i: int) -> dict:
+    origin = ("Spain", "Egypt", "Netherlands", "Peru")[i % 4]
+    return {
+        "name": f"onion {i}",
+        "layers": 6 + i % 9,
+        "mass": 80 + (i * 104729) % 2000 / 10,
+        "origin": origin,
+        "notes": f"Harvested in week {i % 52} in {origin}, cured for {i % 30} days",
+    }
+
+
+class Table(NamedTuple):
+    schema: Type[BaseModel]
+    create_schema: Type[BaseModel]
+    db_model: Any
+    row: Callable[[int], dict]
+    prefix: str
+
+
+TABLES: Dict[str, Table] = {
+    "potatoes": Table(Potato, PotatoCreate, PotatoModel, potato, "potato"),
+    "carrots": Table(Carrot, CarrotCreate, CarrotModel, carrot, "carrot"),
+    "onions": Table(Onion, OnionCreate, OnionModel, onion, "onion"),
+}
+
+
+class Client:
+    """
+    Synchronous client calling the app in process on its own event loop.
+    Unlike TestClient it does not start a thread per request, whose leftovers
+    slow down later measurements.
+    """
+
+    def __init__(self, app: FastAPI) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        )
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        call = self._client.request(method, url, **kwargs)
+        return self._loop.run_until_complete(call)
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def concurrent(
+        self, count: int, method: str, url: str, **kwargs: Any
+    ) -> List[httpx.Response]:
+        """``count`` identical requests sent at once"""
+
+        async def send() -> List[httpx.Response]:
+            calls = [self._client.request(method, url, **kwargs) for _ in range(count)]
+            return list(await asyncio.gather(*calls))
+
+        return self._loop.run_until_complete(send())
+
+    def raw_size(self, url: str, **kwargs: Any) -> int:
+        """The size of a response body as sent, before any decompression"""
+
+        async def size() -> int:
+            request = self._client.build_request("GET", url, **kwargs)
+            response = await self._client.send(request, stream=True)
+            try:
+                return sum([len(chunk) async for chunk in response.aiter_raw()])
+            finally:
+                await response.aclose()
+
+        return self._loop.run_until_complete(size())
+
+
+def make_client(
+    rows: int, table: str = "potatoes", **kwargs: Any
+) -> Tuple[Client, SQLAlchemyCRUDRouter]:
+    """A client of a router over a fresh ``table`` of ``rows`` rows"""
+    spec = TABLES[table]
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+    )
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        if rows:
+            conn.execute(insert(spec.db_model), [spec.row(i) for i in range(rows)])
+
+    session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_db() -> Iterator[Any]:
+        session = session_local()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    router = SQLAlchemyCRUDRouter(
+        schema=spec.schema,
+        create_schema=spec.create_schema,
+        db_model=spec.db_model,
+        db=get_db,
+        prefix=spec.prefix,
+        **kwargs,
+    )
+    app = FastAPI()
+    app.include_router(router)
+    return Client(app), router
+
+
+def measure(fn: Callable[[], Any], repeat: int = 20, warmup: int = 3) -> List[float]:
+    """Wall clock seconds of ``repeat`` calls of ``fn``, after ``warmup`` calls"""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    return timings
+
+
+def measure_cpu(
+    fn: Callable[[], Any], repeat: int = 20, warmup: int = 3
+) -> List[float]:
+    """CPU seconds of the process, all threads included, per call of ``fn``"""
+    for _ in range(warmup):
+        fn()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        timings.append(time.process_time() - start)
+
+    return timings
+
+
+def report(label: str, timings: List[float]) -> None:
+    median = statistics.median(timings) * 1000
+    best = min(timings) * 1000
+    print(f"{label:<40} median {median:8.2f} ms   best {best:8.2f} ms")
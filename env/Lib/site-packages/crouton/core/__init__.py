@@ -1,5 +1,8 @@
 from . import _utils
-from ._base import NOT_FOUND, CRUDGenerator
+from ._base import NOT_FOUND, PRECONDITION_FAILED, CRUDGenerator
+from ._changes import ChangeHub
+from ._indexes import IndexAdvisor
+from ._metrics import REGISTRY, MetricsRegistry
 from .databases import DatabasesCRUDRouter
 from .mem import MemoryCRUDRouter
 from .ormar import OrmarCRUDRouter
@@ -10,6 +13,11 @@ __all__ = [
     "_utils",
     "CRUDGenerator",
     "NOT_FOUND",
+    "PRECONDITION_FAILED",
+    "ChangeHub",
+    "IndexAdvisor",
+    "MetricsRegistry",
+    "REGISTRY",
     "MemoryCRUDRouter",
     "SQLAlchemyCRUDRouter",
     "DatabasesCRUDRouter",
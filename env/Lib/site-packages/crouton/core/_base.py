@@ -1,13 +1,99 @@
+import asyncio
+import inspect
+import logging
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Generic, List, Optional, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket
 from fastapi.types import DecoratedCallable
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
 
+from ._cache import (
+    DEFAULT_PAGE_CACHE_BYTES,
+    PageCache,
+    conditional_get_hook,
+    get_generation,
+    page_cache_hook,
+    write_hook,
+)
+from ._changes import ChangeHub, change_feed_hook, sse_stream, websocket_stream
+from ._compression import DEFAULT_COMPRESSION_THRESHOLD, compression_hook
+from ._encoders import response_encoder, row_encoder, trusted_output_hook
+from ._indexes import IndexAdvisor
+from ._metrics import (
+    REGISTRY,
+    MetricsRegistry,
+    metrics_route_class,
+    register_route_metrics,
+)
+from ._negative import (
+    DEFAULT_NEGATIVE_TTL,
+    DEFAULT_RESEED_INTERVAL,
+    LookupReport,
+    NegativeLookup,
+    negative_lookup_hook,
+)
+from ._querylog import SlowQuery, SlowQueryLog, query_log_hook
+from ._formats import content_negotiation_hook
+from ._hotkeys import (
+    DEFAULT_SAMPLE_RATE,
+    READ_KEY_ROUTES,
+    WRITE_KEY_ROUTES,
+    KeyReport,
+    KeyTelemetry,
+    key_telemetry_hook,
+)
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext, wrap_endpoint
+from ._stats import CHANGES, TableStats, replaced_rows
+from ._sync import ChangeTracker
 from ._types import T, DEPENDENCIES
-from ._utils import pagination_factory, schema_factory
+from ._utils import (
+    aggregate_factory,
+    aggregate_fields,
+    batch_schema_factory,
+    bulk_result_schema_factory,
+    get_many_schema_factory,
+    if_match_factory,
+    item_ids_factory,
+    pagination_factory,
+    partial_schema_factory,
+    schema_factory,
+    selection_factory,
+    sort_factory,
+    sync_schema_factory,
+    upsert_body_factory,
+)
 
 NOT_FOUND = HTTPException(404, "Item not found")
+PRECONDITION_FAILED = HTTPException(412, "Item version does not match")
+
+logger = logging.getLogger(__name__)
+
+READ_ROUTES = ("get_all", "get_many", "get_one")
+WRITE_ROUTES = (
+    "create",
+    "upsert",
+    "batch",
+    "update",
+    "patch",
+    "delete_one",
+    "delete_all",
+    "bulk_delete",
+    "bulk_update",
+)
 
 
 class CRUDGenerator(Generic[T], APIRouter, ABC):
@@ -30,12 +116,63 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        get_many_limit: Optional[int] = 100,
+        aggregate_route: Union[bool, DEPENDENCIES] = False,
+        aggregate_cache: Union[bool, int] = False,
+        batch_route: Union[bool, DEPENDENCIES] = False,
+        batch_limit: Optional[int] = 500,
+        upsert_route: Union[bool, DEPENDENCIES] = False,
+        upsert_limit: Optional[int] = 500,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        etag: bool = False,
+        page_cache: Union[bool, int] = False,
+        cache_ttl: Optional[float] = None,
+        cache_stale: float = 0.0,
+        trusted_output: bool = False,
+        binary_formats: bool = False,
+        compress: Union[bool, int] = False,
+        metrics: Union[bool, MetricsRegistry] = False,
+        slow_query_route: Union[bool, DEPENDENCIES] = True,
+        index_advisor: Optional[IndexAdvisor] = None,
+        sort_fields: Optional[Sequence[str]] = None,
+        stats_fields: Optional[Sequence[str]] = None,
+        stats_route: Union[bool, DEPENDENCIES] = True,
+        change_feed: Union[bool, ChangeHub] = False,
+        changes_route: Union[bool, DEPENDENCIES] = True,
+        sync_route: Union[bool, DEPENDENCIES] = True,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
+        bulk_limit: Optional[int] = 1000,
+        negative_cache: Union[bool, float] = False,
+        negative_reseed: Optional[float] = DEFAULT_RESEED_INTERVAL,
+        negative_lookup_route: Union[bool, DEPENDENCIES] = True,
+        hot_keys: Union[bool, float] = False,
+        hot_keys_route: Union[bool, DEPENDENCIES] = True,
         **kwargs: Any,
     ) -> None:
 
         self.schema = schema
+        self.index_advisor = index_advisor
         self.pagination = pagination_factory(max_limit=paginate)
         self._pk: str = self._pk if hasattr(self, "_pk") else "id"
+        self._pk_type: type = self._pk_type if hasattr(self, "_pk_type") else int
+        self.sort = sort_factory(
+            list(schema.__fields__) if sort_fields is None else sort_fields, self._pk
+        )
+        self.item_ids = item_ids_factory(self._pk_type, max_ids=get_many_limit)
+        self.aggregation = (
+            aggregate_factory(schema) if aggregate_route or stats_fields else None
+        )
+        self._version_col: Optional[str] = (
+            self._version_col if hasattr(self, "_version_col") else None
+        )
+        self.if_match = if_match_factory(enabled=self._version_col is not None)
+        self.slow_query_log: Optional[SlowQueryLog] = (
+            self.slow_query_log if hasattr(self, "slow_query_log") else None
+        )
+        self.change_tracker: Optional[ChangeTracker] = (
+            self.change_tracker if hasattr(self, "change_tracker") else None
+        )
         self.create_schema = (
             create_schema
             if create_schema
@@ -46,6 +183,9 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
             if update_schema
             else schema_factory(self.schema, pk_field_name=self._pk, name="Update")
         )
+        self.patch_schema = partial_schema_factory(
+            self.schema, pk_field_name=self._pk, name="Patch"
+        )
 
         prefix = str(prefix if prefix else self.schema.__name__).lower()
         prefix = self._base_path + prefix.strip("/")
@@ -53,12 +193,151 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
 
         super().__init__(prefix=prefix, tags=tags, **kwargs)
 
+        self._table_name: str = (
+            self._table_name if hasattr(self, "_table_name") else prefix
+        )
+        self._generation = get_generation(self._table_name)
+        self._route_hooks: Dict[str, List[ROUTE_HOOK]] = (
+            self._route_hooks if hasattr(self, "_route_hooks") else {}
+        )
+        vary = ("accept",) if binary_formats else ()
+
+        if metrics:
+            self.metrics = REGISTRY if metrics is True else metrics
+            self._metrics_prefix = prefix
+            register_route_metrics(self.metrics)
+            self.route_class = metrics_route_class(self.route_class)
+
+        if self.slow_query_log is not None:
+            self._add_route_hook(
+                query_log_hook(self.slow_query_log, prefix), self.get_routes()
+            )
+
+        self.key_telemetry: Optional[KeyTelemetry] = None
+        if hot_keys:
+            self.key_telemetry = KeyTelemetry(
+                DEFAULT_SAMPLE_RATE if hot_keys is True else hot_keys
+            )
+            self._add_route_hook(
+                key_telemetry_hook(self.key_telemetry),
+                [*READ_KEY_ROUTES, *WRITE_KEY_ROUTES],
+            )
+
+        if etag:
+            self._track_writes()
+            self._add_route_hook(
+                conditional_get_hook(self._generation, vary), READ_ROUTES
+            )
+
+        if compress:
+            self._add_route_hook(
+                compression_hook(
+                    DEFAULT_COMPRESSION_THRESHOLD if compress is True else compress,
+                    response_encoder(List[self.schema]),  # type: ignore
+                ),
+                ["get_all"],
+            )
+
+        self.page_cache: Optional[PageCache] = None
+        if page_cache:
+            self.page_cache = PageCache(
+                DEFAULT_PAGE_CACHE_BYTES if page_cache is True else page_cache,
+                ttl=cache_ttl,
+                stale=cache_stale,
+            )
+            self._track_writes()
+            self._add_route_hook(
+                page_cache_hook(
+                    self.page_cache,
+                    self._generation,
+                    response_encoder(Optional[List[self.schema]]),  # type: ignore
+                    vary,
+                    etag,
+                ),
+                ["get_all"],
+            )
+
+        self.aggregate_cache: Optional[PageCache] = None
+        if aggregate_cache:
+            self.aggregate_cache = PageCache(
+                (
+                    DEFAULT_PAGE_CACHE_BYTES
+                    if aggregate_cache is True
+                    else aggregate_cache
+                ),
+                ttl=cache_ttl,
+                stale=cache_stale,
+            )
+            self._track_writes()
+            self._add_route_hook(
+                page_cache_hook(
+                    self.aggregate_cache,
+                    self._generation,
+                    response_encoder(List[Dict[str, Any]]),
+                    etag=etag,
+                ),
+                ["aggregate"],
+            )
+
+        self.stats: Optional[TableStats] = None
+        self._stats_dropped = False
+        if stats_fields:
+            numeric, strings = aggregate_fields(schema)
+            unknown = set(stats_fields) - set(numeric + strings)
+            assert not unknown, f"Cannot keep statistics of {', '.join(unknown)}"
+
+            self._aggregate()
+            self.stats = TableStats(
+                [f for f in stats_fields if f in numeric],
+                [f for f in stats_fields if f in strings],
+            )
+            self._add_route_hook(self._maintain_stats, WRITE_ROUTES)
+
+        self.negative_lookup: Optional[NegativeLookup] = None
+        if negative_cache:
+            self.negative_lookup = NegativeLookup(
+                DEFAULT_NEGATIVE_TTL if negative_cache is True else negative_cache,
+                reseed_interval=negative_reseed,
+            )
+            self._add_route_hook(
+                negative_lookup_hook(
+                    self.negative_lookup,
+                    self._pk,
+                    self._load_ids,
+                    NOT_FOUND,
+                    getattr(self, "metrics", None),
+                    prefix,
+                ),
+                ["get_one", *WRITE_ROUTES],
+            )
+            self.add_event_handler("startup", self._seed_negative_lookup)
+
+        self.change_hub: Optional[ChangeHub] = None
+        if change_feed:
+            self.change_hub = ChangeHub() if change_feed is True else change_feed
+            self._add_route_hook(
+                change_feed_hook(
+                    self.change_hub,
+                    self._table_name,
+                    self._pk,
+                    row_encoder(self.schema),
+                ),
+                WRITE_ROUTES,
+            )
+
+        if trusted_output:
+            self._add_route_hook(trusted_output_hook(self.schema), READ_ROUTES)
+
+        if binary_formats:
+            self._add_route_hook(content_negotiation_hook(self.schema), ["get_all"])
+
         if get_all_route:
             self._add_api_route(
                 "",
                 self._get_all(),
                 methods=["GET"],
                 response_model=Optional[List[self.schema]],  # type: ignore
+                route="get_all",
                 summary="Get All",
                 dependencies=get_all_route,
             )
@@ -69,26 +348,175 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
                 self._create(),
                 methods=["POST"],
                 response_model=self.schema,
+                route="create",
                 summary="Create One",
                 dependencies=create_route,
             )
 
-        if delete_all_route:
+        self.bulk_limit = bulk_limit
+        if bulk_route:
+            # Takes over DELETE on the collection, deleting everything being
+            # the bulk delete of an empty selection
+            self.selection = selection_factory(
+                self.schema, self._pk, self._pk_type, max_ids=bulk_limit
+            )
+            bulk_result_schema = bulk_result_schema_factory(
+                self.schema, self._pk_type
+            )
+            self._add_api_route(
+                "",
+                self._bulk_delete(),
+                methods=["DELETE"],
+                response_model=bulk_result_schema,
+                route="bulk_delete",
+                summary="Delete Many",
+                dependencies=bulk_route,
+            )
+            self._add_api_route(
+                "",
+                self._bulk_update(),
+                methods=["PATCH"],
+                response_model=bulk_result_schema,
+                route="bulk_update",
+                summary="Update Many",
+                dependencies=bulk_route,
+            )
+        elif delete_all_route:
             self._add_api_route(
                 "",
                 self._delete_all(),
                 methods=["DELETE"],
                 response_model=Optional[List[self.schema]],  # type: ignore
+                route="delete_all",
                 summary="Delete All",
                 dependencies=delete_all_route,
             )
 
+        if upsert_route:
+            self.upsert_body = upsert_body_factory(self.schema, max_items=upsert_limit)
+            self._add_api_route(
+                "",
+                self._upsert(),
+                methods=["PUT"],
+                response_model=List[self.schema],  # type: ignore
+                route="upsert",
+                summary="Upsert Many",
+                dependencies=upsert_route,
+            )
+
+        if batch_route:
+            self.batch_schema, batch_result_schema = batch_schema_factory(
+                self.schema, self._pk_type, max_operations=batch_limit
+            )
+            self._add_api_route(
+                "/_batch",
+                self._batch(),
+                methods=["POST"],
+                response_model=List[batch_result_schema],  # type: ignore
+                route="batch",
+                summary="Batch",
+                dependencies=batch_route,
+            )
+
+        if get_many_route:
+            self._add_api_route(
+                "/_many",
+                self._get_many(),
+                methods=["GET"],
+                response_model=get_many_schema_factory(self.schema, self._pk_type),
+                route="get_many",
+                summary="Get Many",
+                dependencies=get_many_route,
+            )
+
+        if aggregate_route:
+            self._add_api_route(
+                "/aggregate",
+                self._aggregate(),
+                methods=["GET"],
+                response_model=List[Dict[str, Any]],
+                route="aggregate",
+                summary="Aggregate",
+                dependencies=aggregate_route,
+            )
+
+        if self.stats is not None and stats_route:
+            self._add_api_route(
+                "/_stats",
+                self._stats(),
+                methods=["GET"],
+                response_model=Dict[str, Any],
+                route="stats",
+                summary="Stats",
+                dependencies=stats_route,
+            )
+
+        if self.change_hub is not None and changes_route:
+            self._add_api_route(
+                "/changes",
+                self._changes(),
+                methods=["GET"],
+                route="changes",
+                summary="Changes",
+                dependencies=changes_route,
+            )
+            self.add_api_websocket_route(
+                "/changes",
+                self._changes_websocket(),
+                dependencies=[] if changes_route is True else changes_route,
+            )
+
+        if self.change_tracker is not None and sync_route:
+            self._add_api_route(
+                "/sync",
+                self._sync(),
+                methods=["GET"],
+                response_model=sync_schema_factory(self.schema, self._pk_type),
+                route="sync",
+                summary="Sync",
+                dependencies=sync_route,
+            )
+
+        if self.slow_query_log is not None and slow_query_route:
+            self._add_api_route(
+                "/_slow_queries",
+                self._slow_queries(),
+                methods=["GET"],
+                response_model=List[SlowQuery],
+                route="slow_queries",
+                summary="Slow Queries",
+                dependencies=slow_query_route,
+            )
+
+        if self.key_telemetry is not None and hot_keys_route:
+            self._add_api_route(
+                "/_hot_keys",
+                self._hot_keys(),
+                methods=["GET"],
+                response_model=KeyReport,
+                route="hot_keys",
+                summary="Hot Keys",
+                dependencies=hot_keys_route,
+            )
+
+        if self.negative_lookup is not None and negative_lookup_route:
+            self._add_api_route(
+                "/_negative_lookups",
+                self._negative_lookups(),
+                methods=["GET"],
+                response_model=LookupReport,
+                route="negative_lookups",
+                summary="Negative Lookups",
+                dependencies=negative_lookup_route,
+            )
+
         if get_one_route:
             self._add_api_route(
                 "/{item_id}",
                 self._get_one(),
                 methods=["GET"],
                 response_model=self.schema,
+                route="get_one",
                 summary="Get One",
                 dependencies=get_one_route,
                 error_responses=[NOT_FOUND],
@@ -100,9 +528,22 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
                 self._update(),
                 methods=["PUT"],
                 response_model=self.schema,
+                route="update",
                 summary="Update One",
                 dependencies=update_route,
-                error_responses=[NOT_FOUND],
+                error_responses=[NOT_FOUND, PRECONDITION_FAILED],
+            )
+
+        if patch_route:
+            self._add_api_route(
+                "/{item_id}",
+                self._patch(),
+                methods=["PATCH"],
+                response_model=self.schema,
+                route="patch",
+                summary="Patch One",
+                dependencies=patch_route,
+                error_responses=[NOT_FOUND, PRECONDITION_FAILED],
             )
 
         if delete_one_route:
@@ -111,9 +552,10 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
                 self._delete_one(),
                 methods=["DELETE"],
                 response_model=self.schema,
+                route="delete_one",
                 summary="Delete One",
                 dependencies=delete_one_route,
-                error_responses=[NOT_FOUND],
+                error_responses=[NOT_FOUND, PRECONDITION_FAILED],
             )
 
     def _add_api_route(
@@ -122,9 +564,19 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
         endpoint: Callable[..., Any],
         dependencies: Union[bool, DEPENDENCIES],
         error_responses: Optional[List[HTTPException]] = None,
+        route: Optional[str] = None,
         **kwargs: Any,
     ) -> None:
         dependencies = [] if isinstance(dependencies, bool) else dependencies
+        hooks = self._route_hooks.get(route) if route else None
+        if hooks:
+            endpoint = wrap_endpoint(endpoint, route, hooks)  # type: ignore
+        if route in self.get_routes() and hasattr(self, "metrics"):
+            endpoint.crouton_metrics = (  # type: ignore
+                self.metrics,
+                self._metrics_prefix,
+                route,
+            )
         responses: Any = (
             {err.status_code: {"detail": err.detail} for err in error_responses}
             if error_responses
@@ -135,6 +587,186 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
             path, endpoint, dependencies=dependencies, responses=responses, **kwargs
         )
 
+    def _add_route_hook(self, hook: ROUTE_HOOK, routes: Sequence[str]) -> None:
+        """
+        Registers a hook around the given generated routes. Hooks must be
+        registered before the routes are added, the first one registered
+        being the outermost. Backends may register theirs before calling
+        ``super().__init__``.
+        """
+        if not hasattr(self, "_route_hooks"):
+            self._route_hooks = {}
+
+        for route in routes:
+            self._route_hooks.setdefault(route, []).append(hook)
+
+    def _track_writes(self) -> None:
+        """Bumps the table generation after each write route"""
+        if not getattr(self, "_tracking_writes", False):
+            self._tracking_writes = True
+            self._add_route_hook(write_hook(self._generation), WRITE_ROUTES)
+
+    async def _maintain_stats(self, ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        """
+        Route hook applying the writes of the router to its statistics. The
+        values an update overwrites are handed over by the backend, and
+        writes of many rows have the statistics rebuilt on their next read.
+        """
+        stats: TableStats = self.stats  # type: ignore
+        replaced: List[Dict[str, Any]] = []
+        token = replaced_rows.set(replaced)
+        try:
+            result = await call_next()
+        finally:
+            replaced_rows.reset(token)
+
+        changes: Optional[CHANGES] = None
+        if ctx.route == "create":
+            changes = [(1, stats.values(result))]
+        elif ctx.route in ("update", "patch") and replaced:
+            values = stats.values(result)
+            if values == replaced[0]:
+                return result
+
+            changes = [(-1, replaced[0]), (1, values)]
+        elif ctx.route == "delete_one":
+            changes = [(-1, stats.values(result))]
+        elif ctx.route.startswith("bulk_") and result["dry_run"]:
+            return result
+
+        try:
+            await self._apply_stats(ctx.params, changes)
+        except Exception:
+            # The write is committed by now, so rather than failing it the
+            # statistics are dropped for the next read to rebuild
+            logger.exception("Could not update the statistics of %s", self.prefix)
+            await self._drop_stats(ctx.params)
+
+        return result
+
+    async def _drop_stats(self, params: Dict[str, Any]) -> None:
+        """
+        Has the statistics rebuilt on their next read, even when the persisted
+        ones cannot be dropped either
+        """
+        self._stats_dropped = True
+        try:
+            await self._apply_stats(params, None)
+        except Exception:
+            logger.exception("Could not drop the statistics of %s", self.prefix)
+
+    def _replacing(self, row: Any) -> None:
+        """
+        Hands the row an update is about to overwrite to the statistics hook,
+        when it runs
+        """
+        replaced = replaced_rows.get()
+        if replaced is not None:
+            replaced.append(self.stats.values(row))  # type: ignore
+
+    async def _read_stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        stats: TableStats = self.stats  # type: ignore
+        await self._load_stats(params)
+        if self._stats_dropped:
+            # Persisted statistics may have missed writes since they failed
+            # to be dropped, so they are rebuilt whatever was loaded
+            self._stats_dropped = False
+            stats.apply(None)
+
+        if not stats.ready or stats.stale:
+            fields = sorted(stats.stale) if stats.ready else None
+            await self._refresh_stats(params)
+            await self._save_stats(params, fields)
+
+        return stats.report()
+
+    async def _refresh_stats(self, params: Dict[str, Any]) -> None:
+        """
+        Rebuilds the statistics from the table when they are unknown, or only
+        recomputes the stale extremes
+        """
+        stats: TableStats = self.stats  # type: ignore
+        if stats.ready and not stats.stale:
+            return
+
+        fields = stats.numeric if not stats.ready else sorted(stats.stale)
+        aggregate = self._aggregate()
+        totals = await self._call_endpoint(
+            aggregate, params, aggregation=stats.totals_aggregation(fields)
+        )
+        stats.load_totals(totals[0], fields)
+
+        if not stats.ready:
+            for field in stats.categories:
+                rows = await self._call_endpoint(
+                    aggregate, params, aggregation=([field], [("count", "count", None)])
+                )
+                stats.load_counts(field, rows)
+
+            stats.ready = True
+
+    async def _load_stats(self, params: Dict[str, Any]) -> None:
+        """Loads persisted statistics, for backends that persist them"""
+
+    async def _save_stats(
+        self, params: Dict[str, Any], fields: Optional[Sequence[str]]
+    ) -> None:
+        """
+        Persists rebuilt statistics, or the recomputed extremes of ``fields``,
+        for backends that persist them
+        """
+
+    async def _apply_stats(
+        self, params: Dict[str, Any], changes: Optional[CHANGES]
+    ) -> None:
+        """
+        Applies row changes to the statistics, None meaning they must be
+        rebuilt. Backends persisting them apply the changes there instead.
+        """
+        self.stats.apply(changes)  # type: ignore
+
+    async def _load_ids(self, params: Dict[str, Any]) -> Optional[List[Any]]:
+        """
+        Every primary key of the table, seeding the negative lookup. Backends
+        that cannot scan them return None. ``params`` is empty at startup and
+        for the reseeds running in the background.
+        """
+        return None
+
+    async def _seed_negative_lookup(self) -> None:
+        """Seeds the negative lookup at startup, so no request waits on it"""
+        try:
+            await self.negative_lookup.seed(  # type: ignore
+                lambda: self._load_ids({})
+            )
+        except Exception:
+            # The database may only be connected by startup handlers running
+            # after this one, in which case the first get_one seeds it
+            logger.exception("Could not seed the negative lookup at startup")
+
+    async def _call_endpoint(
+        self, endpoint: Callable[..., Any], params: Dict[str, Any], **kwargs: Any
+    ) -> Any:
+        """
+        Calls a route endpoint with ``kwargs``, passing on the parameters of
+        the current call it also takes, such as the database session. Returns
+        None when the endpoint raises NOT_FOUND.
+        """
+        names = inspect.signature(endpoint).parameters
+        kwargs.update(
+            {k: v for k, v in params.items() if k in names and k not in kwargs}
+        )
+
+        try:
+            if asyncio.iscoroutinefunction(endpoint):
+                return await endpoint(**kwargs)
+
+            return await run_in_threadpool(endpoint, **kwargs)
+        except HTTPException as e:
+            if e is NOT_FOUND:
+                return None
+            raise
+
     def api_route(
         self, path: str, *args: Any, **kwargs: Any
     ) -> Callable[[DecoratedCallable], DecoratedCallable]:
@@ -201,9 +833,195 @@ class CRUDGenerator(Generic[T], APIRouter, ABC):
     def _delete_all(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
         raise NotImplementedError
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the get_many route."
+        )
+
+    def _patch(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the patch route."
+        )
+
+    def _upsert(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the upsert route."
+        )
+
+    def _batch(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the batch route."
+        )
+
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the bulk routes."
+        )
+
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the bulk routes."
+        )
+
+    def _bulk_values(self, model: BaseModel) -> Dict[str, Any]:
+        values = model.dict(exclude_unset=True, exclude={self._pk})
+        if self._version_col:
+            values.pop(self._version_col, None)
+
+        if not values:
+            raise HTTPException(422, "Body must set at least one field")
+
+        return values
+
+    def _check_bulk_limit(self, count: int) -> None:
+        if self.bulk_limit is not None and count > self.bulk_limit:
+            raise HTTPException(
+                422,
+                f"The selection matches {count} rows, more than the limit of "
+                f"{self.bulk_limit}",
+            )
+
+    @staticmethod
+    def _bulk_result(
+        ids: List[Any], dry_run: bool = False, count: Optional[int] = None
+    ) -> Dict[str, Any]:
+        return {
+            "count": len(ids) if count is None else count,
+            "ids": ids,
+            "dry_run": dry_run,
+        }
+
+    def _record_query(
+        self, filters: Sequence[str] = (), sort: Sequence[str] = ()
+    ) -> None:
+        """Reports the columns a list query filters and sorts on to the advisor"""
+        if self.index_advisor is not None:
+            self.index_advisor.record(self._table_name, filters, sort)
+
+    def _slow_queries(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        def route() -> List[SlowQuery]:
+            return self.slow_query_log.entries()  # type: ignore
+
+        return route
+
+    def _hot_keys(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        def route(limit: int = Query(20, ge=1)) -> KeyReport:
+            return self.key_telemetry.report(limit)  # type: ignore
+
+        return route
+
+    def _negative_lookups(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        def route() -> LookupReport:
+            return self.negative_lookup.report()  # type: ignore
+
+        return route
+
+    def _stats(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route() -> Dict[str, Any]:
+            return await self._read_stats({})
+
+        return route
+
+    def _changes(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(
+            after: Optional[int] = Query(
+                None, description="Sequence number of the last event received"
+            ),
+            last_event_id: Optional[int] = Header(None),
+        ) -> StreamingResponse:
+            subscription = self.change_hub.subscribe(  # type: ignore
+                self._table_name, after if after is not None else last_event_id
+            )
+            return StreamingResponse(
+                sse_stream(subscription),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+
+        return route
+
+    def _changes_websocket(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(websocket: WebSocket, after: Optional[int] = None) -> None:
+            await websocket.accept()
+            subscription = self.change_hub.subscribe(  # type: ignore
+                self._table_name, after
+            )
+            await websocket_stream(websocket, subscription)
+
+        return route
+
+    def _sync(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the sync route."
+        )
+
+    def _aggregate(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the aggregate route."
+        )
+
+    def _batch_data(self, operation: Any) -> Optional[BaseModel]:
+        if operation.op != "create" and operation.id is None:
+            raise HTTPException(422, "Operation id is required")
+        elif operation.op == "delete":
+            return None
+
+        schema = self.create_schema if operation.op == "create" else self.update_schema
+        try:
+            return schema(**(operation.data or {}))
+        except ValidationError as e:
+            raise HTTPException(422, e.errors()) from None
+
+    def _batch_result(
+        self,
+        operation: Any,
+        status_code: int = 200,
+        data: Any = None,
+        detail: Any = None,
+    ) -> Dict[str, Any]:
+        return {
+            "op": operation.op,
+            "status": status_code,
+            "id": getattr(data, self._pk, operation.id),
+            "data": data,
+            "detail": detail,
+        }
+
+    @staticmethod
+    def _batch_error(index: int, e: HTTPException) -> HTTPException:
+        return HTTPException(e.status_code, {"index": index, "detail": e.detail})
+
+    def _get_many_response(
+        self, item_ids: List[Any], models: Mapping[Any, Any]
+    ) -> Dict[str, List[Any]]:
+        return {
+            "items": [models[id_] for id_ in item_ids if id_ in models],
+            "missing": [id_ for id_ in item_ids if id_ not in models],
+        }
+
     def _raise(self, e: Exception, status_code: int = 422) -> HTTPException:
         raise HTTPException(422, ", ".join(e.args)) from e
 
     @staticmethod
     def get_routes() -> List[str]:
-        return ["get_all", "create", "delete_all", "get_one", "update", "delete_one"]
+        return [
+            "get_all",
+            "create",
+            "delete_all",
+            "bulk_delete",
+            "bulk_update",
+            "upsert",
+            "batch",
+            "get_many",
+            "aggregate",
+            "stats",
+            "changes",
+            "sync",
+            "slow_queries",
+            "hot_keys",
+            "negative_lookups",
+            "get_one",
+            "update",
+            "patch",
+            "delete_one",
+        ]
@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+from ._encoders import ENCODER
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext, render
+
+DEFAULT_PAGE_CACHE_BYTES = 16 * 1024 * 1024
+DEFAULT_EARLY_EXPIRY_BETA = 1.0
+
+HEADERS = List[Tuple[bytes, bytes]]
+
+
+class TableGeneration:
+    """
+    Write generation of a table. Routers bump it after each of their writes,
+    so anything derived from the table at generation ``n`` is known to be
+    outdated once the generation moves on. The epoch keeps values from
+    different processes apart.
+    """
+
+    def __init__(self) -> None:
+        self.epoch = uuid.uuid4().hex[:8]
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def bump(self) -> int:
+        with self._lock:
+            self.value += 1
+            return self.value
+
+
+_generations: Dict[str, TableGeneration] = {}
+_generations_lock = threading.Lock()
+
+
+def get_generation(table: str) -> TableGeneration:
+    """Returns the generation shared by every router of ``table``"""
+    with _generations_lock:
+        if table not in _generations:
+            _generations[table] = TableGeneration()
+
+        return _generations[table]
+
+
+def write_hook(generation: TableGeneration) -> ROUTE_HOOK:
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        try:
+            return await call_next()
+        finally:
+            generation.bump()
+
+    return hook
+
+
+def request_key(request: Request, vary: Sequence[str] = ()) -> str:
+    """
+    The path and query string of a request, with parameters sorted, followed
+    by the ``vary`` headers the response depends on
+    """
+    key = request.url.path + "?" + "&".join(sorted(request.url.query.split("&")))
+    for header in vary:
+        key += "\n" + request.headers.get(header, "")
+
+    return key
+
+
+def make_etag(
+    generation: TableGeneration,
+    request: Request,
+    vary: Sequence[str] = (),
+    value: Optional[int] = None,
+) -> str:
+    """The ETag of a response read at generation ``value``, the current one"""
+    key = request_key(request, vary)
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    value = generation.value if value is None else value
+    return f'W/"{generation.epoch}-{value}-{digest}"'
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header"""
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == opaque for tag in tags)
+
+
+def conditional_get_hook(
+    generation: TableGeneration, vary: Sequence[str] = ()
+) -> ROUTE_HOOK:
+    """
+    Answers ``If-None-Match`` with ``304`` when the table has not been written
+    since the ETag was issued, before the endpoint touches the database. The
+    generation is read before the endpoint runs, so a concurrent write can
+    only make an ETag older than its content, never newer. Responses inner
+    hooks already tagged, such as stale cached pages, keep their ETag.
+    """
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        etag = make_etag(generation, ctx.request, vary)
+        if etag_matches(ctx.request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        result = await call_next()
+        response = result if isinstance(result, Response) else ctx.response
+        response.headers.setdefault("ETag", etag)
+        return result
+
+    return hook
+
+
+class CacheEntry:
+    __slots__ = ("generation", "body", "headers", "created", "delta", "stale_since")
+
+    def __init__(
+        self, generation: int, body: bytes, headers: HEADERS, delta: float
+    ) -> None:
+        self.generation = generation
+        self.body = body
+        self.headers = headers
+        self.created = time.monotonic()
+        self.delta = delta
+        self.stale_since: Optional[float] = None
+
+
+class PageCache:
+    """
+    Byte bounded LRU cache of serialized list pages and their headers. Each
+    entry remembers the table generation it was read at and turns stale once
+    the table moves on, or ``ttl`` seconds after it was read.
+
+    Stale entries may still be served for ``stale`` seconds while a single
+    request refreshes them. Entries with a ``ttl`` also expire early at
+    random, more likely the closer they are to expiring and the longer they
+    took to compute (XFetch, scaled by ``beta``), so that a hot page is
+    usually refreshed by one request before it expires for all of them.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_PAGE_CACHE_BYTES,
+        ttl: Optional[float] = None,
+        stale: float = 0.0,
+        beta: float = DEFAULT_EARLY_EXPIRY_BETA,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale = stale
+        self.beta = beta
+        self.size = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshes: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def get(
+        self, key: str, generation: int, early: bool = True
+    ) -> Tuple[Optional[CacheEntry], bool]:
+        """
+        The entry of ``key`` and whether it is fresh at ``generation``. Stale
+        entries are only returned while they may still be served.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+
+            if entry.generation < generation:
+                entry.stale_since = entry.stale_since or now
+            elif self.ttl is not None and now - entry.created >= self.ttl:
+                entry.stale_since = entry.stale_since or entry.created + self.ttl
+            else:
+                self._entries.move_to_end(key)
+                return entry, not (early and self._expires_early(entry, now))
+
+            if now - entry.stale_since < self.stale:
+                return entry, False
+
+            self._discard(key)
+            return None, False
+
+    def set(
+        self,
+        key: str,
+        generation: int,
+        body: bytes,
+        headers: HEADERS,
+        delta: float = 0.0,
+    ) -> None:
+        if len(body) > self.max_bytes:
+            return
+
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = CacheEntry(generation, body, headers, delta)
+            self.size += len(body)
+
+            while self.size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def refreshing(self, key: str) -> bool:
+        """Whether a request is refreshing ``key``"""
+        refresh = self._refreshes.get(key)
+        return refresh is not None and refresh[0].locked()
+
+    @asynccontextmanager
+    async def refresh(self, key: str) -> AsyncIterator[None]:
+        """Holds the refresh lock of ``key``, so one request computes it"""
+        lock, waiting = self._refreshes.get(key, (None, 0))
+        lock = lock or asyncio.Lock()
+        self._refreshes[key] = (lock, waiting + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, waiting = self._refreshes[key]
+            if waiting == 1:
+                del self._refreshes[key]
+            else:
+                self._refreshes[key] = (lock, waiting - 1)
+
+    def _expires_early(self, entry: CacheEntry, now: float) -> bool:
+        if self.ttl is None or not entry.delta:
+            return False
+
+        gap = -entry.delta * self.beta * math.log(1.0 - random.random())
+        return now + gap >= entry.created + self.ttl
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+
+def page_cache_hook(
+    cache: PageCache,
+    generation: TableGeneration,
+    encode: ENCODER,
+    vary: Sequence[str] = (),
+    etag: bool = False,
+) -> ROUTE_HOOK:
+    """
+    Serves list pages from ``cache`` as pre-serialized JSON, skipping both the
+    database and pydantic. Pages are keyed by path and query string, so the
+    pagination and any other query parameter are part of the key, as are the
+    ``vary`` headers. Responses already rendered by inner hooks are cached as
+    they are, headers included.
+
+    A single request per page computes it while concurrent ones wait for its
+    result, or are served the stale page when the cache allows it. With
+    ``etag``, stale pages carry the ETag of the generation they were read at.
+    """
+
+    def cached(ctx: RouteContext, entry: CacheEntry, fresh: bool) -> Response:
+        response = Response(entry.body)
+        response.raw_headers = list(entry.headers)
+        if etag and not fresh:
+            response.headers["ETag"] = make_etag(
+                generation, ctx.request, vary, entry.generation
+            )
+
+        return response
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        key = request_key(ctx.request, vary)
+        current = generation.value
+
+        entry, fresh = cache.get(key, current)
+        if entry is not None and (fresh or cache.refreshing(key)):
+            return cached(ctx, entry, entry.generation >= current)
+
+        async with cache.refresh(key):
+            # The request holding the lock before this one may have read the
+            # page at the generation this request started at, or later
+            entry, fresh = cache.get(key, current, early=False)
+            if entry is not None and fresh:
+                return cached(ctx, entry, True)
+
+            started = time.monotonic()
+            result = await call_next()
+            if not isinstance(result, Response):
+                result = render(ctx, await encode(result), "application/json")
+            elif result.status_code != 200 or not hasattr(result, "body"):
+                return result
+
+            body, headers = result.body, list(result.raw_headers)  # type: ignore
+            cache.set(key, current, body, headers, time.monotonic() - started)
+
+        return result
+
+    return hook
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext
+
+EVENT = Dict[str, Any]
+
+DEFAULT_HISTORY = 1000
+DEFAULT_QUEUE_SIZE = 256
+KEEPALIVE_INTERVAL = 15.0
+
+RESYNC = "resync"
+_CLOSED: EVENT = {}
+
+
+class Subscription:
+    """
+    The events of a single consumer of a :class:`ChangeHub`. Events are queued
+    on the event loop of the consumer, and a consumer falling more than
+    ``queue_size`` events behind is dropped: its queue is replaced by a
+    resync marker after which the subscription ends.
+    """
+
+    def __init__(
+        self,
+        hub: "ChangeHub",
+        table: Optional[str],
+        queue_size: int,
+        loop: asyncio.AbstractEventLoop,
+    ) -> None:
+        self.hub = hub
+        self.table = table
+        self.queue_size = queue_size
+        self.closed = False
+        self._loop = loop
+        self._queue: "asyncio.Queue[EVENT]" = asyncio.Queue()
+
+    def matches(self, event: EVENT) -> bool:
+        return self.table is None or event["table"] == self.table
+
+    def push(self, event: EVENT) -> None:
+        """Queues an event, from any thread"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # The event loop of the consumer is closed
+            self.hub.unsubscribe(self)
+
+    def resync(self, seq: int, close: bool = False) -> None:
+        """Queues a resync marker, telling the consumer it missed events"""
+        self._queue.put_nowait({"seq": seq, "table": self.table, "type": RESYNC})
+        if close:
+            self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.hub.unsubscribe(self)
+            self._queue.put_nowait(_CLOSED)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[EVENT]:
+        """
+        The next event, None when the subscription ended. Raises
+        ``asyncio.TimeoutError`` when no event arrived within ``timeout``.
+        """
+        event = await asyncio.wait_for(self._queue.get(), timeout)
+        return None if event is _CLOSED else event
+
+    def _put(self, event: EVENT) -> None:
+        if self.closed:
+            return
+        elif self._queue.qsize() >= self.queue_size:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+
+            self.resync(event["seq"], close=True)
+        else:
+            self._queue.put_nowait(event)
+
+
+class ChangeHub:
+    """
+    In-process broadcast of the changes made through write routes. Events get
+    increasing sequence numbers and the last ``history`` events are kept, so
+    consumers can resume after the last sequence number they received.
+    Publishing is thread safe.
+    """
+
+    def __init__(
+        self, history: int = DEFAULT_HISTORY, queue_size: int = DEFAULT_QUEUE_SIZE
+    ) -> None:
+        self.queue_size = queue_size
+        self._seq = 0
+        self._history: Deque[EVENT] = deque(maxlen=history)
+        self._subscribers: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self) -> int:
+        """The sequence number of the last event"""
+        return self._seq
+
+    def publish(
+        self, table: str, type_: str, id_: Any = None, data: Any = None
+    ) -> int:
+        with self._lock:
+            self._seq += 1
+            event = {
+                "seq": self._seq,
+                "table": table,
+                "type": type_,
+                "id": id_,
+                "data": data,
+            }
+            self._history.append(event)
+            subscribers = [s for s in self._subscribers if s.matches(event)]
+
+        for subscription in subscribers:
+            subscription.push(event)
+
+        return event["seq"]
+
+    def subscribe(
+        self, table: Optional[str] = None, after: Optional[int] = None
+    ) -> Subscription:
+        """
+        Subscribes the running event loop to the events of ``table``, or of
+        every table. With ``after``, the kept events following that sequence
+        number are replayed first, or a resync marker is queued when some of
+        them are no longer kept.
+        """
+        subscription = Subscription(
+            self, table, self.queue_size, asyncio.get_running_loop()
+        )
+
+        with self._lock:
+            if after is not None and after < self._seq:
+                oldest = self._history[0]["seq"] if self._history else self._seq + 1
+                missed = [e for e in self._history if e["seq"] > after]
+                missed = [e for e in missed if subscription.matches(e)]
+
+                if after < oldest - 1 or len(missed) > self.queue_size:
+                    subscription.resync(self._seq)
+                else:
+                    for event in missed:
+                        subscription._queue.put_nowait(event)
+
+            self._subscribers.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+def change_feed_hook(
+    hub: ChangeHub, table: str, pk: str, encode: Callable[[Any], Any]
+) -> ROUTE_HOOK:
+    """Route hook publishing the changes made by write routes into ``hub``"""
+
+    def publish(type_: str, row: Any) -> None:
+        hub.publish(table, type_, getattr(row, pk, None), encode(row))
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        result = await call_next()
+
+        if ctx.route == "create":
+            publish("create", result)
+        elif ctx.route in ("update", "patch"):
+            publish("update", result)
+        elif ctx.route == "delete_one":
+            publish("delete", result)
+        elif ctx.route == "upsert":
+            for row in result:
+                publish("upsert", row)
+        elif ctx.route == "batch":
+            for operation in result:
+                if operation["status"] < 300:
+                    publish(operation["op"], operation["data"])
+        elif ctx.route == "delete_all":
+            hub.publish(table, "delete_all")
+        elif ctx.route in ("bulk_delete", "bulk_update") and not result["dry_run"]:
+            type_ = "delete" if ctx.route == "bulk_delete" else "update"
+            for id_ in result["ids"]:
+                hub.publish(table, type_, id_)
+
+        return result
+
+    return hook
+
+
+def sse_message(event: EVENT) -> bytes:
+    data = json.dumps(event, separators=(",", ":"))
+    return f"id: {event['seq']}\nevent: {event['type']}\ndata: {data}\n\n".encode()
+
+
+async def sse_stream(subscription: Subscription) -> AsyncIterator[bytes]:
+    """
+    The events of a subscription as server-sent events, with a comment line
+    keeping the connection alive while there are none
+    """
+    try:
+        while True:
+            try:
+                event = await subscription.get(KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+
+            if event is None:
+                break
+
+            yield sse_message(event)
+    finally:
+        subscription.close()
+
+
+async def websocket_stream(websocket: WebSocket, subscription: Subscription) -> None:
+    """
+    Sends the events of a subscription as JSON messages until either side
+    ends, closing the socket after a resync marker
+    """
+
+    async def receive() -> None:
+        # Nothing is expected from the client, this only notices it left
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscription.close()
+
+    receiver = asyncio.ensure_future(receive())
+    try:
+        while True:
+            event = await subscription.get()
+            if event is None:
+                break
+
+            await websocket.send_json(event)
+            if event["type"] == RESYNC and subscription.closed:
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        subscription.close()
+        receiver.cancel()
@@ -0,0 +1,136 @@
+import zlib
+from typing import Any, Iterator, List, Optional, Sequence
+
+from fastapi import Response
+from starlette.responses import StreamingResponse
+
+from ._encoders import ENCODER
+from ._formats import accepted_media_types
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext, add_vary, render
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # type: ignore
+
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+CHUNK_ROWS = 500
+CHUNK_BYTES = 64 * 1024
+
+
+def offered_encodings() -> List[str]:
+    """The content codings responses can be compressed with, by preference"""
+    if zstandard is None:
+        return ["gzip"]
+
+    return ["zstd", "gzip"]
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], offered: Sequence[str]
+) -> Optional[str]:
+    """Picks the offered coding the client prefers, None meaning identity"""
+    for coding in accepted_media_types(accept_encoding):
+        if coding in offered:
+            return coding
+        elif coding == "*":
+            return offered[0]
+
+    return None
+
+
+def compressor(coding: str) -> Any:
+    """An incremental compressor exposing ``compress`` and ``flush``"""
+    if coding == "zstd":
+        return zstandard.ZstdCompressor().compressobj()  # type: ignore
+
+    return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def compress_body(body: bytes, coding: str) -> Iterator[bytes]:
+    """
+    Compresses an already rendered body chunk by chunk while it is sent, so
+    the compressed copy is never held whole, only the body itself
+    """
+    stream = compressor(coding)
+    for start in range(0, len(body), CHUNK_BYTES):
+        chunk = stream.compress(body[start : start + CHUNK_BYTES])
+        if chunk:
+            yield chunk
+
+    yield stream.flush()
+
+
+async def compress_rows(
+    first: bytes, rows: Sequence[Any], encode: ENCODER, coding: str
+) -> bytes:
+    """
+    Encodes rows chunk by chunk, compressing each chunk as soon as it is
+    encoded so the uncompressed JSON page is never held whole, and returns
+    the whole compressed body. ``first`` is the already encoded first chunk.
+    This is not streamed to the client: rows must be encoded before the
+    route returns, while the database session they were loaded with is still
+    open.
+    """
+    stream = compressor(coding)
+    compressed = [stream.compress(first[:-1])]
+
+    for start in range(CHUNK_ROWS, len(rows), CHUNK_ROWS):
+        chunk = await encode(rows[start : start + CHUNK_ROWS])
+        compressed.append(stream.compress(b"," + chunk[1:-1]))
+
+    compressed.append(stream.compress(b"]") + stream.flush())
+    return b"".join(compressed)
+
+
+def _streaming(response: Response, content: Any) -> Response:
+    streaming = StreamingResponse(content, status_code=response.status_code)
+    streaming.raw_headers = [
+        (key, value) for key, value in response.raw_headers if key != b"content-length"
+    ]
+    return streaming
+
+
+def compression_hook(threshold: int, encode: ENCODER) -> ROUTE_HOOK:
+    """
+    Compresses list responses of at least ``threshold`` bytes for clients
+    sending Accept-Encoding, with zstd when available and gzip otherwise.
+    Bodies already rendered by inner hooks, such as cached pages, are
+    compressed chunk by chunk as they are sent. Rows returned by the backend
+    are encoded and compressed one chunk at a time before the route returns,
+    and sent as a single compressed body.
+    """
+    offered = offered_encodings()
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        coding = negotiate_encoding(ctx.request.headers.get("accept-encoding"), offered)
+        result = await call_next()
+
+        if isinstance(result, Response):
+            add_vary(result, "Accept-Encoding")
+            if (
+                coding is None
+                or result.status_code != 200
+                or "content-encoding" in result.headers
+                or len(getattr(result, "body", b"")) < threshold
+            ):
+                return result
+
+            response = _streaming(result, compress_body(result.body, coding))
+            response.headers["Content-Encoding"] = coding
+            return response
+
+        add_vary(ctx.response, "Accept-Encoding")
+        if coding is None or result is None:
+            return result
+
+        first = await encode(result[:CHUNK_ROWS])
+        if len(result) <= CHUNK_ROWS and len(first) < threshold:
+            return render(ctx, first, "application/json")
+
+        body = await compress_rows(first, result, encode, coding)
+        response = render(ctx, body, "application/json")
+        response.headers["Content-Encoding"] = coding
+        return response
+
+    return hook
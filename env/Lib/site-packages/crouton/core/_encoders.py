@@ -0,0 +1,152 @@
+import json
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext, render
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
+ENCODER = Callable[[Any], Awaitable[bytes]]
+ROW_ENCODER = Callable[[Any], Dict[str, Any]]
+FIELD_ENCODER = Tuple[str, str, Optional[Callable[[Any], Any]]]
+
+_PRIMITIVES = (int, float, str, bool, type(None))
+
+
+def dump_json(content: Any) -> bytes:
+    """Renders JSON content byte for byte as ``JSONResponse`` does"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def response_encoder(response_model: Any) -> ENCODER:
+    """
+    Creates an encoder validating and serializing route results through
+    ``response_model``, the same way FastAPI does for the route itself.
+    """
+    field = create_model_field(
+        name="Response", type_=response_model, mode="serialization"
+    )
+
+    async def encode(content: Any) -> bytes:
+        content = await serialize_response(field=field, response_content=content)
+        return dump_json(content)
+
+    return encode
+
+
+def dump_trusted_json(content: Any) -> bytes:
+    """Renders JSON content, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)  # type: ignore
+
+    return dump_json(content)
+
+
+def _value_encoder(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """The conversion a field value needs to become JSON, None if it is JSON"""
+    if annotation in _PRIMITIVES:
+        return None
+
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        encoders = [_value_encoder(arg) for arg in args if arg is not type(None)]
+        if all(encoder is None for encoder in encoders):
+            return None
+        elif len(encoders) == 1:
+            inner = encoders[0]
+            return lambda value: None if value is None else inner(value)  # type: ignore
+    elif origin in (list, set, frozenset, tuple) and len(set(args) - {Ellipsis}) == 1:
+        inner = _value_encoder(args[0])
+        if inner is None:
+            return list
+
+        return lambda values: [inner(value) for value in values]  # type: ignore
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return row_encoder(annotation)
+
+    return jsonable_encoder
+
+
+def field_encoders(schema: Type[BaseModel]) -> List[FIELD_ENCODER]:
+    """The name, alias and value conversion of each field of ``schema``"""
+    return [
+        (name, field.alias, _value_encoder(field.annotation))
+        for name, field in schema.__fields__.items()
+    ]
+
+
+def row_encoder(schema: Type[BaseModel]) -> ROW_ENCODER:
+    """
+    Compiles an encoder turning a row handed back by a backend (ORM object,
+    record or model) into the JSON content of ``schema``, reading each field
+    straight off the row. Rows are trusted to match the schema, they are
+    not validated.
+    """
+    fields = field_encoders(schema)
+
+    def encode(row: Any) -> Dict[str, Any]:
+        return {
+            alias: (
+                getattr(row, name) if convert is None else convert(getattr(row, name))
+            )
+            for name, alias, convert in fields
+        }
+
+    return encode
+
+
+def trusted_output_hook(schema: Type[BaseModel]) -> ROUTE_HOOK:
+    """
+    Writes the rows returned by read routes straight into a JSON response,
+    bypassing the validation and serialization FastAPI performs through the
+    response model. The documented response model stays the same.
+    """
+    encode = row_encoder(schema)
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        result = await call_next()
+        if isinstance(result, Response):
+            return result
+
+        content: Any
+        if result is None:
+            content = None
+        elif ctx.route == "get_all":
+            content = [encode(row) for row in result]
+        elif ctx.route == "get_many":
+            content = {
+                "items": [encode(row) for row in result["items"]],
+                "missing": jsonable_encoder(result["missing"]),
+            }
+        else:
+            content = encode(result)
+
+        return render(ctx, dump_trusted_json(content), "application/json")
+
+    return hook
@@ -0,0 +1,123 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from ._encoders import dump_trusted_json, field_encoders, row_encoder
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext, add_vary, render
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # type: ignore
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNAR_JSON = "application/vnd.crouton.columnar+json"
+COLUMNAR_MSGPACK = "application/vnd.crouton.columnar+msgpack"
+
+_ALIASES = {"application/x-msgpack": MSGPACK}
+
+COLUMNS_ENCODER = Callable[[Sequence[Any]], Dict[str, List[Any]]]
+
+
+def offered_media_types() -> List[str]:
+    """The formats list routes can be served in, JSON being the default"""
+    if msgpack is None:
+        return [JSON, COLUMNAR_JSON]
+
+    return [JSON, COLUMNAR_JSON, MSGPACK, COLUMNAR_MSGPACK]
+
+
+def accepted_media_types(accept: Optional[str]) -> List[str]:
+    """The media types of an Accept header, by decreasing quality"""
+    ranges = []
+    for index, media_range in enumerate((accept or "").split(",")):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        if media_type and quality > 0:
+            ranges.append((-quality, index, media_type.lower()))
+
+    return [media_type for _, _, media_type in sorted(ranges)]
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> str:
+    """
+    Picks the offered format the client prefers. Clients accepting none of
+    them get the first one, as FastAPI serves JSON regardless of Accept.
+    """
+    for media_type in accepted_media_types(accept):
+        media_type = _ALIASES.get(media_type, media_type)
+        if media_type in offered:
+            return media_type
+        elif media_type in ("*/*", "application/*"):
+            return offered[0]
+
+    return offered[0]
+
+
+def columnar_encoder(schema: Type[BaseModel]) -> COLUMNS_ENCODER:
+    """
+    Compiles an encoder turning rows into one array per field of ``schema``,
+    so that clients decode a page without creating an object per row
+    """
+    fields = field_encoders(schema)
+
+    def encode(rows: Sequence[Any]) -> Dict[str, List[Any]]:
+        return {
+            alias: (
+                [getattr(row, name) for row in rows]
+                if convert is None
+                else [convert(getattr(row, name)) for row in rows]
+            )
+            for name, alias, convert in fields
+        }
+
+    return encode
+
+
+def content_negotiation_hook(schema: Type[BaseModel]) -> ROUTE_HOOK:
+    """
+    Serves list routes as MessagePack or columnar content when the Accept
+    header asks for it, encoding the rows returned by the backend directly.
+    JSON responses are left to FastAPI and the outer hooks.
+    """
+    offered = offered_media_types()
+    encode_row = row_encoder(schema)
+    encode_columns = columnar_encoder(schema)
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        media_type = negotiate(ctx.request.headers.get("accept"), offered)
+        result = await call_next()
+
+        if isinstance(result, Response):
+            add_vary(result, "Accept")
+            return result
+
+        add_vary(ctx.response, "Accept")
+        if media_type == JSON:
+            return result
+
+        rows = result or []
+        content: Any
+        if media_type in (COLUMNAR_JSON, COLUMNAR_MSGPACK):
+            content = encode_columns(rows)
+        else:
+            content = [encode_row(row) for row in rows]
+
+        if media_type == COLUMNAR_JSON:
+            body = dump_trusted_json(content)
+        else:
+            body = msgpack.packb(content)  # type: ignore
+
+        return render(ctx, body, media_type)
+
+    return hook
@@ -0,0 +1,100 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Coroutine, Dict, List, Optional, Sequence
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+CALL_NEXT = Callable[[], Awaitable[Any]]
+
+
+class RouteContext:
+    """
+    A single call of a generated route, as seen by the hooks wrapping it.
+    ``params`` holds the arguments FastAPI resolved for the endpoint.
+    """
+
+    __slots__ = ("route", "request", "response", "params")
+
+    def __init__(
+        self, route: str, request: Request, response: Response, params: Dict[str, Any]
+    ) -> None:
+        self.route = route
+        self.request = request
+        self.response = response
+        self.params = params
+
+
+ROUTE_HOOK = Callable[[RouteContext, CALL_NEXT], Awaitable[Any]]
+
+
+def render(ctx: RouteContext, body: bytes, media_type: Optional[str]) -> Response:
+    """
+    Builds the response of a route from an already encoded body, keeping the
+    headers hooks set on ``ctx.response`` as FastAPI would for a plain result
+    """
+    response = Response(body, media_type=media_type)
+    response.headers.raw.extend(
+        (key, value)
+        for key, value in ctx.response.headers.raw
+        if key not in (b"content-length", b"content-type")
+    )
+    return response
+
+
+def add_vary(response: Response, header: str) -> None:
+    vary = [v.strip() for v in response.headers.get("vary", "").split(",") if v]
+    if header not in vary:
+        response.headers["Vary"] = ", ".join(vary + [header])
+
+
+def wrap_endpoint(
+    endpoint: Callable[..., Any], route: str, hooks: Sequence[ROUTE_HOOK]
+) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """
+    Wraps a route endpoint so that every call passes through ``hooks``, the
+    first hook being the outermost. The wrapper exposes the signature of the
+    endpoint, plus the request and response, so FastAPI resolves the same
+    parameters and generates the same OpenAPI schema.
+    """
+    signature = inspect.signature(endpoint)
+    is_coroutine = asyncio.iscoroutinefunction(endpoint)
+    hooks = list(hooks)
+
+    async def call(params: Dict[str, Any]) -> Any:
+        if is_coroutine:
+            return await endpoint(**params)
+        else:
+            return await run_in_threadpool(endpoint, **params)
+
+    async def wrapper(
+        crouton_request: Request, crouton_response: Response, **params: Any
+    ) -> Any:
+        ctx = RouteContext(route, crouton_request, crouton_response, params)
+
+        async def dispatch(index: int) -> Any:
+            if index == len(hooks):
+                return await call(ctx.params)
+
+            return await hooks[index](ctx, lambda: dispatch(index + 1))
+
+        return await dispatch(0)
+
+    parameters: List[inspect.Parameter] = [
+        inspect.Parameter(
+            "crouton_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+        ),
+        inspect.Parameter(
+            "crouton_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response
+        ),
+    ]
+    parameters += [
+        p.replace(kind=inspect.Parameter.KEYWORD_ONLY)
+        for p in signature.parameters.values()
+    ]
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)  # type: ignore
+    wrapper.__name__ = endpoint.__name__
+    wrapper.__qualname__ = endpoint.__qualname__
+    wrapper.__doc__ = endpoint.__doc__
+    return wrapper
@@ -0,0 +1,196 @@
+import hashlib
+import math
+import random
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext
+
+DEFAULT_SAMPLE_RATE = 0.01
+DEFAULT_HOT_KEY_CAPACITY = 1000
+HLL_PRECISION = 12
+
+READ_KEY_ROUTES = ("get_one", "get_many")
+WRITE_KEY_ROUTES = ("update", "patch", "delete_one")
+
+
+class HotKey(BaseModel):
+    key: str
+    count: float
+    error: float
+    reads: float
+    writes: float
+
+
+class KeyReport(BaseModel):
+    sample_rate: float
+    reads: int
+    writes: int
+    read_write_ratio: Optional[float]
+    cardinality: int
+    hot_keys: List[HotKey]
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k counter over at most ``capacity`` keys. A key seen
+    while the counter is full replaces the least counted one and inherits its
+    count as error, so counts are overestimated by at most their error.
+
+    Keys are grouped in buckets by count (a stream summary), so that both
+    counting a key and finding the least counted one take constant time.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HOT_KEY_CAPACITY) -> None:
+        self.capacity = capacity
+        # Key to [count, error, reads since the key is tracked]
+        self._counters: Dict[str, List[int]] = {}
+        # Count to the keys with that count, oldest first
+        self._buckets: Dict[int, Dict[str, None]] = {}
+        self._min = 0
+
+    def add(self, key: str, read: bool) -> None:
+        counter = self._counters.get(key)
+        if counter is None:
+            if len(self._counters) < self.capacity:
+                floor = self._min = 0
+            else:
+                floor = self._min
+                victim = next(iter(self._buckets[floor]))
+                del self._buckets[floor][victim]
+                del self._counters[victim]
+
+            counter = self._counters[key] = [floor, floor, 0]
+            self._buckets.setdefault(floor, {})[key] = None
+
+        count = counter[0]
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if count == self._min:
+                self._min = count + 1
+
+        counter[0] += 1
+        self._buckets.setdefault(count + 1, {})[key] = None
+        if read:
+            counter[2] += 1
+
+    def top(self, k: int) -> List[List[Any]]:
+        """The ``k`` most counted keys, as ``[key, count, error, reads]``"""
+        ranked = sorted(self._counters.items(), key=lambda kv: -kv[1][0])
+        return [[key, *counter] for key, counter in ranked[:k]]
+
+    def clear(self) -> None:
+        self._counters.clear()
+        self._buckets.clear()
+        self._min = 0
+
+
+class HyperLogLog:
+    """Distinct key estimate within about 1.6% using 4 KiB of registers"""
+
+    def __init__(self, precision: int = HLL_PRECISION) -> None:
+        self.precision = precision
+        self.size = 1 << precision
+        self._registers = bytearray(self.size)
+
+    def add(self, key: str) -> None:
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def estimate(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0**-r for r in self._registers)
+        zeros = self._registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return round(m * math.log(m / zeros))
+
+        return round(raw)
+
+    def clear(self) -> None:
+        self._registers = bytearray(self.size)
+
+
+class KeyTelemetry:
+    """
+    Access pattern of the keys of a router. Every keyed call is counted, while
+    only a ``sample_rate`` fraction of them is hashed and updates the hot
+    keys, whose counts are scaled back up. The cardinality is that of the
+    keys among sampled calls, so keys called fewer than about
+    ``1 / sample_rate`` times may be missing from it. The reads and writes of
+    a hot key are those since it was last tracked. Hooks run on the event
+    loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = DEFAULT_SAMPLE_RATE,
+        capacity: int = DEFAULT_HOT_KEY_CAPACITY,
+    ) -> None:
+        assert 0 < sample_rate <= 1, "The sample rate must be in (0, 1]"
+        self.sample_rate = sample_rate
+        self.reads = 0
+        self.writes = 0
+        self.top_k = SpaceSaving(capacity)
+        self.distinct = HyperLogLog()
+
+    def record(self, key: Any, read: bool) -> None:
+        if read:
+            self.reads += 1
+        else:
+            self.writes += 1
+
+        if self.sample_rate == 1 or random.random() < self.sample_rate:
+            key = str(key)
+            self.distinct.add(key)
+            self.top_k.add(key, read)
+
+    def report(self, limit: int) -> KeyReport:
+        scale = 1 / self.sample_rate
+        return KeyReport(
+            sample_rate=self.sample_rate,
+            reads=self.reads,
+            writes=self.writes,
+            read_write_ratio=self.reads / self.writes if self.writes else None,
+            cardinality=self.distinct.estimate(),
+            hot_keys=[
+                HotKey(
+                    key=key,
+                    count=count * scale,
+                    error=error * scale,
+                    reads=reads * scale,
+                    writes=(count - error - reads) * scale,
+                )
+                for key, count, error, reads in self.top_k.top(limit)
+            ],
+        )
+
+    def clear(self) -> None:
+        self.reads = self.writes = 0
+        self.top_k.clear()
+        self.distinct.clear()
+
+
+def key_telemetry_hook(telemetry: KeyTelemetry) -> ROUTE_HOOK:
+    """Route hook recording the keys read and written by the keyed routes"""
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        read = ctx.route in READ_KEY_ROUTES
+        if ctx.route == "get_many":
+            for key in ctx.params["item_ids"]:
+                telemetry.record(key, read)
+        else:
+            telemetry.record(ctx.params["item_id"], read)
+
+        return await call_next()
+
+    return hook
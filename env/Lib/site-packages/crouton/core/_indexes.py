@@ -0,0 +1,198 @@
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+try:
+    from sqlalchemy import Index, MetaData, Table, inspect
+except ImportError:
+    Index = None  # type: ignore
+
+COLUMNS = Tuple[str, ...]
+
+
+class IndexInfo(BaseModel):
+    name: str
+    columns: List[str]
+    unique: bool
+
+
+class RedundantIndex(BaseModel):
+    name: str
+    reason: str
+
+
+class ColumnUsage(BaseModel):
+    filters: List[str]
+    sort: List[str]
+    count: int
+
+
+class TableIndexReport(BaseModel):
+    table: str
+    indexes: List[IndexInfo]
+    usage: List[ColumnUsage]
+    missing: List[List[str]]
+    redundant: List[RedundantIndex]
+
+
+class IndexAdvisor:
+    """
+    Records the columns list routes filter and sort on, and checks them
+    against the indexes of the database. Routers report into the advisor
+    they were given with ``index_advisor=``.
+    """
+
+    def __init__(self) -> None:
+        self._usage: Dict[str, "Counter[Tuple[COLUMNS, COLUMNS]]"] = {}
+        self._lock = threading.Lock()
+
+    def record(
+        self, table: str, filters: Sequence[str] = (), sort: Sequence[str] = ()
+    ) -> None:
+        """Records a query on ``table`` filtering and sorting on the given columns"""
+        if not filters and not sort:
+            return
+
+        key = (tuple(sorted(set(filters))), tuple(sort))
+        with self._lock:
+            self._usage.setdefault(table, Counter())[key] += 1
+
+    def report(self, bind: Any) -> List[TableIndexReport]:
+        """
+        Cross-checks the recorded usage against the indexes of ``bind``, a
+        SQLAlchemy engine or connection
+        """
+        inspector = inspect(bind)
+        with self._lock:
+            usage = {table: Counter(counts) for table, counts in self._usage.items()}
+
+        reports = []
+        for table in sorted(set(usage) | set(inspector.get_table_names())):
+            if not inspector.has_table(table):
+                continue
+
+            indexes = [
+                IndexInfo(
+                    name=index["name"],
+                    columns=list(index["column_names"]),
+                    unique=bool(index.get("unique")),
+                )
+                for index in inspector.get_indexes(table)
+                if index.get("name") and None not in index["column_names"]
+            ]
+            pk = tuple(inspector.get_pk_constraint(table)["constrained_columns"])
+            counts = usage.get(table, Counter())
+
+            reports.append(
+                TableIndexReport(
+                    table=table,
+                    indexes=indexes,
+                    usage=[
+                        ColumnUsage(filters=list(f), sort=list(s), count=count)
+                        for (f, s), count in counts.most_common()
+                    ],
+                    missing=[
+                        list(columns)
+                        for columns in _missing_indexes(counts, indexes, pk)
+                    ],
+                    redundant=_redundant_indexes(indexes, pk),
+                )
+            )
+
+        return reports
+
+    def create_indexes(self, bind: Any) -> List[str]:
+        """
+        Creates an index for each missing combination of filtered and sorted
+        columns, returning the names of the created indexes
+        """
+        created = []
+        metadata = MetaData()
+        for report in self.report(bind):
+            if not report.missing:
+                continue
+
+            table = Table(report.table, metadata, autoload_with=bind)
+            for columns in report.missing:
+                name = index_name(report.table, columns)
+                Index(name, *(table.c[column] for column in columns)).create(bind)
+                created.append(name)
+
+        return created
+
+    def clear(self) -> None:
+        with self._lock:
+            self._usage.clear()
+
+
+def index_name(table: str, columns: Sequence[str]) -> str:
+    return f"ix_{table}_{'_'.join(columns)}"
+
+
+def _covers(index: Sequence[str], filters: COLUMNS, sort: COLUMNS) -> bool:
+    """
+    Whether an index serves a query, its leading columns being the filtered
+    columns in any order followed by the sorted columns in order
+    """
+    columns = tuple(index)
+    if set(columns[: len(filters)]) != set(filters):
+        return False
+
+    return columns[len(filters) : len(filters) + len(sort)] == sort
+
+
+def _missing_indexes(
+    counts: "Counter[Tuple[COLUMNS, COLUMNS]]",
+    indexes: List[IndexInfo],
+    pk: COLUMNS,
+) -> List[COLUMNS]:
+    candidates = [tuple(index.columns) for index in indexes] + [pk]
+    missing: List[COLUMNS] = []
+
+    for (filters, sort), _ in counts.most_common():
+        sort = _strip_pk_tiebreaker(sort, pk)
+        if not filters and not sort:
+            continue
+
+        columns = filters + tuple(c for c in sort if c not in filters)
+        if columns in missing or any(_covers(c, filters, sort) for c in candidates):
+            continue
+
+        missing.append(columns)
+
+    return missing
+
+
+def _strip_pk_tiebreaker(sort: COLUMNS, pk: COLUMNS) -> COLUMNS:
+    """Sorts ending on the primary key only need an index on what precedes it"""
+    if len(sort) > len(pk) and sort[-len(pk) :] == pk:
+        return sort[: -len(pk)]
+
+    return sort
+
+
+def _redundant_indexes(indexes: List[IndexInfo], pk: COLUMNS) -> List[RedundantIndex]:
+    redundant = []
+    for index in indexes:
+        columns = tuple(index.columns)
+        reason: Optional[str] = None
+
+        if pk and pk[: len(columns)] == columns:
+            reason = "duplicates the primary key"
+        else:
+            for other in indexes:
+                other_columns = tuple(other.columns)
+                if other is index or index.unique:
+                    continue
+                elif other_columns[: len(columns)] == columns and (
+                    len(other_columns) > len(columns) or other.name < index.name
+                ):
+                    reason = f"covered by {other.name}"
+                    break
+
+        if reason is not None:
+            redundant.append(RedundantIndex(name=index.name, reason=reason))
+
+    return redundant
@@ -0,0 +1,102 @@
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    TypeVar,
+    Union,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+LOAD_MANY = Callable[[List[K]], Awaitable[Mapping[K, V]]]
+
+
+class BatchLoader(Generic[K, V]):
+    """
+    Coalesces single key lookups issued on the same event loop into one
+    call of ``load_many``. Keys are collected until the end of the current
+    loop tick (``window=0``) or for ``window`` seconds, whichever the router
+    was configured with, and each awaiting caller receives its own row or
+    ``None`` when the key does not exist.
+    """
+
+    def __init__(
+        self,
+        load_many: LOAD_MANY,  # type: ignore
+        window: float = 0.0,
+        max_batch_size: int = 500,
+    ) -> None:
+        self.load_many = load_many
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: Optional[Dict[K, "asyncio.Future[Optional[V]]"]] = None
+        self._handle: Optional[asyncio.Handle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def load(self, key: K) -> Optional[V]:
+        loop = asyncio.get_running_loop()
+
+        if self._pending is None:
+            self._pending = {}
+            self._handle = (
+                loop.call_later(self.window, self._dispatch)
+                if self.window > 0
+                else loop.call_soon(self._dispatch)
+            )
+
+        future = self._pending.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._pending[key] = future
+
+            if len(self._pending) >= self.max_batch_size:
+                self._dispatch()
+
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        pending, self._pending = self._pending, None
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+        if pending:
+            task = asyncio.get_running_loop().create_task(self._resolve(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, pending: Dict[K, "asyncio.Future[Optional[V]]"]) -> None:
+        try:
+            rows: Mapping[Any, V] = await self.load_many(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(rows.get(key))
+
+
+def loader_factory(
+    load_many: LOAD_MANY, batch: Union[bool, float]  # type: ignore
+) -> Optional[BatchLoader]:  # type: ignore
+    """
+    Creates the get_one batcher for a router. ``True`` batches per loop tick
+    and a number batches over a window of that many seconds.
+    """
+    if batch is False or batch is None:
+        return None
+
+    window = 0.0 if batch is True else float(batch)
+    return BatchLoader(load_many, window=window)
@@ -0,0 +1,239 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Sequence, Tuple, Type
+
+from fastapi.routing import APIRoute
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LABELS = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class _Shard:
+    """The metrics recorded by a single thread"""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self) -> None:
+        self.counters: Dict[Tuple[str, LABELS], float] = {}
+        self.histograms: Dict[Tuple[str, LABELS], List[float]] = {}
+
+
+class MetricsRegistry:
+    """
+    Counters and fixed-bucket histograms in the Prometheus text format. Each
+    thread records into its own shard, so recording takes no lock, and shards
+    are only summed when the metrics are collected. The registry is an ASGI
+    app serving the metrics, to be mounted with ``app.mount("/metrics", ...)``.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Sequence[float]] = {}
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._shards: List[_Shard] = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._shards_lock:
+                self._shards.append(shard)
+
+        return shard
+
+    def counter(self, name: str, description: str) -> None:
+        self._help[name] = ("counter", description)
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float]) -> None:
+        self._help[name] = ("histogram", description)
+        self._buckets[name] = tuple(buckets)
+
+    def inc(self, name: str, labels: LABELS, value: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: LABELS, value: float) -> None:
+        buckets = self._buckets[name]
+        histograms = self._shard().histograms
+        key = (name, labels)
+
+        counts = histograms.get(key)
+        if counts is None:
+            counts = histograms[key] = [0.0] * (len(buckets) + 2)
+
+        counts[bisect_left(buckets, value)] += 1
+        counts[-1] += value
+
+    def collect(self) -> str:
+        counters: Dict[Tuple[str, LABELS], float] = {}
+        histograms: Dict[Tuple[str, LABELS], List[float]] = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, counts in list(shard.histograms.items()):
+                total = histograms.setdefault(key, [0.0] * len(counts))
+                for i, count in enumerate(counts):
+                    total[i] += count
+
+        lines: List[str] = []
+        for name, (kind, description) in sorted(self._help.items()):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                continue
+
+            bounds = [_number(b) for b in self._buckets[name]] + ["+Inf"]
+            for (metric, labels), counts in sorted(histograms.items()):
+                if metric != name:
+                    continue
+
+                cumulative = 0.0
+                for bound, count in zip(bounds, counts):
+                    cumulative += count
+                    bucket = labels + (("le", bound),)
+                    lines.append(
+                        f"{name}_bucket{_labels(bucket)} {_number(cumulative)}"
+                    )
+
+                lines.append(f"{name}_sum{_labels(labels)} {_number(counts[-1])}")
+                lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = PlainTextResponse(
+            self.collect(), media_type="text/plain; version=0.0.4"
+        )
+        await response(scope, receive, send)
+
+
+def _labels(labels: LABELS) -> str:
+    if not labels:
+        return ""
+
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+REGISTRY = MetricsRegistry()
+
+
+def register_route_metrics(registry: MetricsRegistry) -> None:
+    registry.counter(
+        "crouton_requests_total", "Requests handled by generated routes, by status"
+    )
+    registry.histogram(
+        "crouton_request_duration_seconds",
+        "Time spent in generated routes",
+        LATENCY_BUCKETS,
+    )
+    registry.histogram("crouton_request_size_bytes", "Request body sizes", SIZE_BUCKETS)
+    registry.histogram(
+        "crouton_response_size_bytes",
+        "Response body sizes as sent, after any compression",
+        SIZE_BUCKETS,
+    )
+
+
+def metrics_app(
+    app: ASGIApp, registry: MetricsRegistry, prefix: str, route: str
+) -> ASGIApp:
+    """
+    Wraps the ASGI app of a route to record the status it sends, its latency
+    and the body bytes it receives and sends. Request validation and response
+    serialization run inside the route app, so their time and errors count.
+    Errors reaching the server are counted as 500.
+    """
+    labels = (("prefix", prefix), ("route", route))
+
+    async def metered(scope: Scope, receive: Receive, send: Send) -> None:
+        status = 500
+        started = False
+        received = sent = 0
+        start = time.perf_counter()
+
+        async def receive_body() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def send_body(message: Message) -> None:
+            nonlocal status, started, sent
+            if message["type"] == "http.response.start":
+                status, started = message["status"], True
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await app(scope, receive_body, send_body)
+        finally:
+            registry.observe(
+                "crouton_request_duration_seconds",
+                labels,
+                time.perf_counter() - start,
+            )
+            registry.inc("crouton_requests_total", labels + (("status", str(status)),))
+            if received or any(k == b"content-length" for k, _ in scope["headers"]):
+                registry.observe("crouton_request_size_bytes", labels, received)
+            if started:
+                registry.observe("crouton_response_size_bytes", labels, sent)
+
+    return metered
+
+
+def metrics_route_class(route_class: Type[APIRoute]) -> Type[APIRoute]:
+    """
+    A subclass of ``route_class`` metering the endpoints carrying their
+    metrics labels as ``crouton_metrics``. Routes keep their class when
+    included in an application, so the metering survives ``include_router``.
+    """
+
+    class MetricsRoute(route_class):  # type: ignore
+        def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+            super().__init__(path, endpoint, **kwargs)
+            metrics = getattr(endpoint, "crouton_metrics", None)
+            if metrics is not None:
+                self.app = metrics_app(self.app, *metrics)
+
+    return MetricsRoute
@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext
+from ._metrics import MetricsRegistry
+
+DEFAULT_NEGATIVE_TTL = 30.0
+DEFAULT_NEGATIVE_ENTRIES = 10_000
+DEFAULT_RESEED_INTERVAL = 300.0
+MIN_CAPACITY = 1024
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_RESULTS = (
+    "found",
+    "bloom_reject",
+    "cache_hit",
+    "false_positive",
+    "deleted",
+    "missing",
+)
+
+
+class LookupReport(BaseModel):
+    counts: Dict[str, int]
+    false_positive_rate: Optional[float]
+    expected_false_positive_rate: Optional[float]
+    keys: Optional[int]
+    missing: int
+
+
+class BloomFilter:
+    """
+    A fixed size Bloom filter sized for ``capacity`` keys at ``error_rate``
+    false positives. Keys are hashed once with BLAKE2b and the bit positions
+    derived by double hashing.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, key: Any) -> List[int]:
+        digest = hashlib.blake2b(str(key).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: Any) -> None:
+        positions = self._positions(key)
+        with self._lock:
+            for position in positions:
+                self._bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key: Any) -> bool:
+        bits = self._bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+    @property
+    def error_rate(self) -> float:
+        """The expected false positive rate at the current number of keys"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class NegativeLookup:
+    """
+    Answers get_one for ids known not to exist without querying the database:
+    ids missing from a Bloom filter of the existing primary keys, and ids
+    that recently returned 404, for ``ttl`` seconds. The filter is seeded by
+    a primary key scan and only learns of rows created through the router,
+    so it must only be used when the router owns the writes of its table:
+    a row inserted by anything else answers 404 until the next scan, up to
+    ``reseed_interval`` seconds later. The filter is also rebuilt once it
+    holds more keys than it was sized for, and with no interval only then.
+    Once seeded, the filter is rebuilt in a background task and the current
+    one answers until it is replaced.
+
+    Bloom filters cannot forget keys, so the ids deleted through the router,
+    up to ``max_entries`` of them, are remembered to tell their 404s apart
+    from false positives.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_entries: int = DEFAULT_NEGATIVE_ENTRIES,
+        reseed_interval: Optional[float] = DEFAULT_RESEED_INTERVAL,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.reseed_interval = reseed_interval
+        self.bloom: Optional[BloomFilter] = None
+        self.seeded_at = 0.0
+        self.counts: Dict[str, int] = dict.fromkeys(LOOKUP_RESULTS, 0)
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._deleted: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seeding: Optional[asyncio.Lock] = None
+        self._reseeding: Optional["asyncio.Task[None]"] = None
+        self._pending: List[Any] = []
+
+    def needs_seed(self) -> bool:
+        if not self.seeded_at:
+            return True
+        elif self.bloom is not None and self.bloom.count > self.bloom.capacity:
+            return True
+
+        return (
+            self.reseed_interval is not None
+            and time.monotonic() - self.seeded_at > self.reseed_interval
+        )
+
+    async def seed(
+        self, load_ids: Callable[[], Awaitable[Optional[Iterable[Any]]]]
+    ) -> None:
+        """
+        Rebuilds the filter from the primary keys ``load_ids`` returns. When
+        it returns None only the negative cache is used.
+        """
+        if self._seeding is None:
+            self._seeding = asyncio.Lock()
+
+        async with self._seeding:
+            if not self.needs_seed():
+                return
+
+            self._pending = []
+            loaded = await load_ids()
+            self.seeded_at = time.monotonic()
+            if loaded is None:
+                return
+
+            ids = list(loaded)
+            bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(ids)))
+            for id_ in ids:
+                bloom.add(id_)
+
+            # Rows created while the scan ran may be missing from it
+            for id_ in self._pending:
+                bloom.add(id_)
+
+            self.bloom = bloom
+            self._pending = []
+
+    def reseed(
+        self, load_ids: Callable[[], Awaitable[Optional[Iterable[Any]]]]
+    ) -> None:
+        """Starts rebuilding the filter in the background, unless it already is"""
+        if self._reseeding is None or self._reseeding.done():
+            self._reseeding = asyncio.get_running_loop().create_task(
+                self._reseed(load_ids)
+            )
+
+    async def _reseed(
+        self, load_ids: Callable[[], Awaitable[Optional[Iterable[Any]]]]
+    ) -> None:
+        try:
+            await self.seed(load_ids)
+        except Exception:
+            # The current filter keeps answering, until the next interval
+            logger.exception("Could not reseed the negative lookup")
+            self.seeded_at = time.monotonic()
+
+    def absent(self, key: Any) -> Optional[str]:
+        """Why ``key`` is known not to exist, None when it may exist"""
+        if self.bloom is not None and key not in self.bloom:
+            return "bloom_reject"
+
+        with self._lock:
+            expiry = self._missing.get(str(key))
+            if expiry is None:
+                return None
+            elif expiry < time.monotonic():
+                del self._missing[str(key)]
+                return None
+
+        return "cache_hit"
+
+    def add(self, key: Any) -> None:
+        """Records a key created through the router"""
+        if self.bloom is not None:
+            self.bloom.add(key)
+
+        with self._lock:
+            self._missing.pop(str(key), None)
+            self._deleted.pop(str(key), None)
+            if self._seeding is not None and self._seeding.locked():
+                self._pending.append(key)
+
+    def clear(self) -> None:
+        """Records that the table was emptied"""
+        if self.bloom is not None:
+            self.bloom = BloomFilter(self.bloom.capacity)
+
+        with self._lock:
+            self._missing.clear()
+            self._deleted.clear()
+
+    def missing(self, key: Any) -> None:
+        """Records a key the database did not have"""
+        with self._lock:
+            self._missing[str(key)] = time.monotonic() + self.ttl
+            self._missing.move_to_end(str(key))
+            while len(self._missing) > self.max_entries:
+                self._missing.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        """Records a key deleted through the router"""
+        self.missing(key)
+        with self._lock:
+            self._deleted[str(key)] = None
+            self._deleted.move_to_end(str(key))
+            while len(self._deleted) > self.max_entries:
+                self._deleted.popitem(last=False)
+
+    def was_deleted(self, key: Any) -> bool:
+        """Whether ``key`` was deleted through the router since it was added"""
+        with self._lock:
+            return str(key) in self._deleted
+
+    def report(self) -> LookupReport:
+        bloom = self.bloom
+        rejected = self.counts["false_positive"] + self.counts["bloom_reject"]
+        return LookupReport(
+            counts=dict(self.counts),
+            false_positive_rate=(
+                self.counts["false_positive"] / rejected if rejected else None
+            ),
+            expected_false_positive_rate=bloom.error_rate if bloom else None,
+            keys=bloom.count if bloom else None,
+            missing=len(self._missing),
+        )
+
+
+def negative_lookup_hook(
+    lookup: NegativeLookup,
+    pk: str,
+    load_ids: Callable[[Dict[str, Any]], Awaitable[Optional[Iterable[Any]]]],
+    not_found: HTTPException,
+    registry: Optional[MetricsRegistry] = None,
+    prefix: str = "",
+) -> ROUTE_HOOK:
+    """
+    Route hook answering get_one from ``lookup``, and teaching it the keys of
+    rows created and deleted by the write routes
+    """
+    if registry is not None:
+        registry.counter(
+            "crouton_negative_lookups_total",
+            "get_one calls by negative lookup result; false_positive counts "
+            "Bloom filter hits the database did not have, deleted those of "
+            "rows deleted through the router",
+        )
+
+    def record(result: str) -> None:
+        lookup.counts[result] += 1
+        if registry is not None:
+            labels = (("prefix", prefix), ("result", result))
+            registry.inc("crouton_negative_lookups_total", labels)
+
+    async def get_one(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        key = ctx.params["item_id"]
+        if not lookup.seeded_at:
+            await lookup.seed(lambda: load_ids(ctx.params))  # type: ignore
+        elif lookup.needs_seed():
+            # The request's own session is closed before the scan ends
+            lookup.reseed(lambda: load_ids({}))  # type: ignore
+
+        reason = lookup.absent(key)
+        if reason is not None:
+            record(reason)
+            raise not_found
+
+        try:
+            result = await call_next()
+        except HTTPException as e:
+            if e.status_code == 404:
+                if lookup.bloom is None:
+                    record("missing")
+                elif lookup.was_deleted(key):
+                    record("deleted")
+                else:
+                    record("false_positive")
+                lookup.missing(key)
+            raise
+
+        record("found")
+        return result
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        if ctx.route == "get_one":
+            return await get_one(ctx, call_next)
+
+        result = await call_next()
+        if ctx.route == "create":
+            lookup.add(getattr(result, pk))
+        elif ctx.route == "upsert":
+            for row in result:
+                lookup.add(getattr(row, pk))
+        elif ctx.route == "delete_one":
+            lookup.delete(getattr(result, pk))
+        elif ctx.route == "delete_all":
+            lookup.clear()
+        elif ctx.route == "bulk_delete" and not result["dry_run"]:
+            for id_ in result["ids"]:
+                lookup.delete(id_)
+        elif ctx.route == "batch":
+            for operation in result:
+                if operation["status"] >= 300:
+                    continue
+                elif operation["op"] == "create":
+                    lookup.add(operation["id"])
+                elif operation["op"] == "delete":
+                    lookup.delete(operation["id"])
+
+        return result
+
+    return hook
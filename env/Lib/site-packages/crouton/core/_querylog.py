@@ -0,0 +1,272 @@
+import threading
+import time
+import weakref
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+
+from ._hooks import CALL_NEXT, ROUTE_HOOK, RouteContext
+
+try:
+    from sqlalchemy import event, text
+    from sqlalchemy.dialects import registry
+except ImportError:
+    registry = None
+
+DEFAULT_SLOW_QUERY_ENTRIES = 100
+
+_EXPLAIN = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+# Statements EXPLAIN accepts; explaining anything else, such as SAVEPOINT or
+# DDL, fails and on PostgreSQL aborts the transaction of the caller
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+_EXPLAIN_SAVEPOINT = "crouton_explain"
+_PLAN_WARNINGS = (
+    ("SCAN ", "full table scan"),
+    ("Seq Scan", "full table scan"),
+    ("USE TEMP B-TREE FOR ORDER BY", "unindexed ORDER BY"),
+    ("Sort Key", "unindexed ORDER BY"),
+)
+
+
+class SlowQuery(BaseModel):
+    statement: str
+    parameters: Any
+    duration: float
+    prefix: str
+    route: str
+    plan: List[str]
+    warnings: List[str]
+    timestamp: float
+
+
+class SlowQueryLog:
+    """
+    Ring buffer of the statements of a router that ran for at least
+    ``threshold`` seconds, with the query plan captured when they ran
+    """
+
+    def __init__(
+        self, threshold: float, max_entries: int = DEFAULT_SLOW_QUERY_ENTRIES
+    ) -> None:
+        self.threshold = threshold
+        self._entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+
+    def record(
+        self,
+        statement: str,
+        parameters: Any,
+        duration: float,
+        route: Tuple[str, str],
+        plan: List[str],
+    ) -> None:
+        self._entries.append(
+            SlowQuery(
+                statement=statement,
+                parameters=_jsonable_parameters(parameters),
+                duration=duration,
+                prefix=route[0],
+                route=route[1],
+                plan=plan,
+                warnings=plan_warnings(plan),
+                timestamp=time.time(),
+            )
+        )
+
+    def entries(self) -> List[SlowQuery]:
+        """The logged statements, most recent first"""
+        return list(reversed(self._entries))
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_current: ContextVar[Optional[Tuple[SlowQueryLog, Tuple[str, str]]]] = ContextVar(
+    "crouton_slow_query_route", default=None
+)
+
+
+def query_log_hook(log: SlowQueryLog, prefix: str) -> ROUTE_HOOK:
+    """Attributes the statements run by a route call to the route"""
+
+    async def hook(ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        token = _current.set((log, (prefix, ctx.route)))
+        try:
+            return await call_next()
+        finally:
+            _current.reset(token)
+
+    return hook
+
+
+def plan_warnings(plan: Sequence[str]) -> List[str]:
+    """Flags full table scans and sorts the plan could not take from an index"""
+    found = []
+    for pattern, warning in _PLAN_WARNINGS:
+        if warning not in found and any(pattern in line for line in plan):
+            found.append(warning)
+
+    return found
+
+
+def _jsonable_parameters(parameters: Any) -> Any:
+    if isinstance(parameters, dict):
+        return {str(k): _jsonable_parameters(v) for k, v in parameters.items()}
+    elif isinstance(parameters, (list, tuple)):
+        return [_jsonable_parameters(v) for v in parameters]
+    elif parameters is None or isinstance(parameters, (int, float, str, bool)):
+        return parameters
+
+    return repr(parameters)
+
+
+def _plan_lines(rows: Sequence[Sequence[Any]]) -> List[str]:
+    return [str(row[-1]) for row in rows]
+
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip()[:6].upper().startswith(_EXPLAINABLE)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("crouton_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, many: bool
+) -> None:
+    current = _current.get()
+    starts = conn.info.get("crouton_query_start")
+    if current is None or not starts:
+        return
+
+    duration = time.perf_counter() - starts.pop()
+    log, route = current
+    if duration < log.threshold:
+        return
+
+    plan: List[str] = []
+    explain = _EXPLAIN.get(conn.dialect.name)
+    if explain and not many and _explainable(statement):
+        # On PostgreSQL a failed EXPLAIN would abort the transaction of the
+        # statement, so it runs in a savepoint of its own
+        savepoint = conn.dialect.name == "postgresql" and conn.in_transaction()
+        explain_cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                explain_cursor.execute(f"SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+            try:
+                explain_cursor.execute(explain + statement, parameters)
+                plan = _plan_lines(explain_cursor.fetchall())
+            except Exception as e:
+                plan = [f"EXPLAIN failed: {e}"]
+                if savepoint:
+                    explain_cursor.execute(
+                        f"ROLLBACK TO SAVEPOINT {_EXPLAIN_SAVEPOINT}"
+                    )
+            if savepoint:
+                explain_cursor.execute(f"RELEASE SAVEPOINT {_EXPLAIN_SAVEPOINT}")
+        finally:
+            explain_cursor.close()
+
+    log.record(statement, parameters, duration, route, plan)
+
+
+_instrumented: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_instrumented_lock = threading.Lock()
+
+
+def instrument_engine(engine: Any) -> None:
+    """
+    Times the statements of a SQLAlchemy engine. Only statements run within
+    a route of a router keeping a slow query log are looked at. Engines are
+    instrumented once, however many routers use them.
+    """
+    if engine in _instrumented:
+        return
+
+    with _instrumented_lock:
+        if engine not in _instrumented:
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+            _instrumented.add(engine)
+
+
+class TimedDatabase:
+    """
+    Proxy of a ``databases.Database`` timing the statements run through it
+    and logging the slow ones of the current route
+    """
+
+    def __init__(self, database: Any) -> None:
+        self._database = database
+        # Compiles with the database's dialect, with named parameters so
+        # that the statement can be rebound for EXPLAIN
+        self._dialect = registry.load(database.url.dialect)(paramstyle="named")
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+    async def _timed(self, method: str, query: Any, *args: Any, **kwargs: Any) -> Any:
+        current = _current.get()
+        if current is None:
+            return await getattr(self._database, method)(query, *args, **kwargs)
+
+        start = time.perf_counter()
+        result = await getattr(self._database, method)(query, *args, **kwargs)
+        duration = time.perf_counter() - start
+
+        log, route = current
+        if duration >= log.threshold:
+            statement, parameters = _compile(query, self._dialect)
+            plan = await self._explain(query)
+            log.record(statement, parameters, duration, route, plan)
+
+        return result
+
+    async def _explain(self, query: Any) -> List[str]:
+        explain = _EXPLAIN.get(self._database.url.dialect)
+        if not explain or isinstance(query, str):
+            return []
+
+        statement, parameters = _compile(query, self._dialect)
+        if not _explainable(statement):
+            return []
+
+        query = text(explain + statement).bindparams(**parameters)
+        try:
+            if self._database.url.dialect != "postgresql":
+                return _plan_lines(await self._database.fetch_all(query))
+
+            # A savepoint within the transaction of the caller, so that a
+            # failed EXPLAIN does not abort it
+            async with self._database.transaction():
+                return _plan_lines(await self._database.fetch_all(query))
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+
+    async def fetch_all(self, query: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetch_all", query, *args, **kwargs)
+
+    async def fetch_one(self, query: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetch_one", query, *args, **kwargs)
+
+    async def fetch_val(self, query: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("fetch_val", query, *args, **kwargs)
+
+    async def execute(self, query: Any, *args: Any, **kwargs: Any) -> Any:
+        return await self._timed("execute", query, *args, **kwargs)
+
+
+def _compile(query: Any, dialect: Any) -> Tuple[str, Any]:
+    if isinstance(query, str):
+        return query, {}
+
+    compiled = query.compile(
+        dialect=dialect, compile_kwargs={"render_postcompile": True}
+    )
+    return str(compiled), compiled.params
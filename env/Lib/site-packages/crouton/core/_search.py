@@ -0,0 +1,164 @@
+import threading
+from typing import Any, List, Sequence
+
+from fastapi import HTTPException
+
+from ._utils import SearchQuery
+
+try:
+    from sqlalchemy import Integer, and_, func, inspect, literal_column, or_, select
+    from sqlalchemy import column as sql_column, table as sql_table, text
+    from sqlalchemy.sql.schema import Table
+    from sqlalchemy.sql.selectable import Select
+except ImportError:
+    Table = None  # type: ignore
+    Select = None  # type: ignore
+
+
+class FullTextIndex:
+    """
+    Full-text index over string columns of a table. On SQLite it is an FTS5
+    external content table kept in sync by triggers, which needs an integer
+    primary key as its rowid. On PostgreSQL it is a GIN index on a tsvector
+    expression. The index is installed at startup, or by ``rebuild``, and
+    filled from the existing rows when it is created.
+    """
+
+    def __init__(self, table: "Table", pk: str, fields: Sequence[str]) -> None:
+        unknown = [f for f in fields if f not in table.c]
+        assert not unknown, f"Cannot search on {', '.join(unknown)}"
+
+        self.table = table
+        self.pk = pk
+        self.fields = list(fields)
+        self.name = f"{table.name}_fts"
+        self.installed = False
+        self._lock = threading.Lock()
+
+    def install(self, bind: Any) -> None:
+        """Creates the index and its triggers, unless they already exist"""
+        if self.installed:
+            return
+
+        with self._lock:
+            if self.installed:
+                return
+
+            dialect = bind.dialect.name
+            if dialect == "sqlite":
+                self._install_fts5(bind)
+            elif dialect == "postgresql":
+                self._install_tsvector(bind)
+            else:
+                return
+
+            self.installed = True
+
+    def check(self, dialect: str) -> None:
+        """Raises unless searches can run on ``dialect``"""
+        if dialect not in ("sqlite", "postgresql"):
+            raise HTTPException(501, f"Search is not supported on {dialect}")
+        elif not self.installed:
+            raise HTTPException(503, "Search index not installed before startup")
+
+    def rebuild(self, bind: Any) -> None:
+        """Rebuilds the index from the rows of the table"""
+        self.install(bind)
+        self.check(bind.dialect.name)
+        with bind.begin() as conn:
+            if bind.dialect.name == "sqlite":
+                name = bind.dialect.identifier_preparer.quote(self.name)
+                conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+            else:
+                conn.execute(text(f"REINDEX INDEX {self._index_name(bind)}"))
+
+    def statement(self, dialect: str, search: SearchQuery, source: Any) -> "Select":
+        """
+        Selects ``source`` and the rank of the rows matching the search, best
+        first, starting after the cursor of the search
+        """
+        pk = self.table.c[self.pk]
+        if dialect == "sqlite":
+            fts = sql_table(self.name, sql_column("rowid"), sql_column("rank"))
+            rank = fts.c.rank
+            stmt = (
+                select(source, rank.label("rank"))
+                .join(fts, fts.c.rowid == pk)
+                .where(literal_column(f'"{self.name}"').op("MATCH")(search.fts5()))
+            )
+        else:
+            vector = self._tsvector()
+            query = func.to_tsquery(literal_column("'simple'"), search.tsquery())
+            rank = -func.ts_rank(vector, query)
+            stmt = select(source, rank.label("rank")).where(vector.op("@@")(query))
+
+        if search.after is not None:
+            after_rank, after_pk = search.after
+            stmt = stmt.where(
+                or_(rank > after_rank, and_(rank == after_rank, pk > after_pk))
+            )
+
+        return stmt.order_by(rank, pk)
+
+    def _install_fts5(self, bind: Any) -> None:
+        if not isinstance(self.table.c[self.pk].type, Integer):
+            raise ValueError(
+                f"Cannot search {self.table.name} on SQLite, FTS5 needs an "
+                f"integer primary key but {self.pk} is "
+                f"{self.table.c[self.pk].type}"
+            )
+
+        quote = bind.dialect.identifier_preparer.quote
+        table, fts, pk = quote(self.table.name), quote(self.name), quote(self.pk)
+        columns = ", ".join(quote(f) for f in self.fields)
+        new = ", ".join(f"new.{quote(f)}" for f in self.fields)
+        old = ", ".join(f"old.{quote(f)}" for f in self.fields)
+        insert = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.{pk}, {new});"
+        delete = (
+            f"INSERT INTO {fts}({fts}, rowid, {columns}) "
+            f"VALUES ('delete', old.{pk}, {old});"
+        )
+
+        created = not inspect(bind).has_table(self.name)
+        statements: List[str] = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, "
+            f"content={table}, content_rowid={pk})",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(self.name + '_ai')} "
+            f"AFTER INSERT ON {table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(self.name + '_ad')} "
+            f"AFTER DELETE ON {table} BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(self.name + '_au')} "
+            f"AFTER UPDATE ON {table} BEGIN {delete} {insert} END",
+        ]
+        if created:
+            statements.append(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+        with bind.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+
+    def _tsvector(self) -> Any:
+        # Literal constants, so that searches use the same expression as the
+        # index rather than one with bound parameters
+        empty = literal_column("''")
+        values = [func.coalesce(self.table.c[f], empty) for f in self.fields]
+        document = values[0]
+        for value in values[1:]:
+            document = document + literal_column("' '") + value
+
+        return func.to_tsvector(literal_column("'simple'::regconfig"), document)
+
+    def _install_tsvector(self, bind: Any) -> None:
+        table = bind.dialect.identifier_preparer.quote(self.table.name)
+        document = self._tsvector().compile(dialect=bind.dialect)
+        with bind.begin() as conn:
+            conn.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS {self._index_name(bind)} "
+                    f"ON {table} USING GIN (({document}))"
+                )
+            )
+
+    def _index_name(self, bind: Any) -> str:
+        quote = bind.dialect.identifier_preparer.quote
+        return quote(f"ix_{self.table.name}_search")
@@ -0,0 +1,124 @@
+from typing import Any, Callable, Dict, List, Sequence
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from ._types import AGGREGATION
+from ._utils import Selection
+
+try:
+    from sqlalchemy import delete, func, select
+    from sqlalchemy.sql.schema import Table
+    from sqlalchemy.sql.dml import Delete, Insert
+    from sqlalchemy.sql.selectable import Select
+except ImportError:
+    Table = None  # type: ignore
+    Insert = None  # type: ignore
+    Delete = None  # type: ignore
+    Select = None  # type: ignore
+
+
+def upsert_rows(
+    models: Sequence[BaseModel], table: "Table", pk: str
+) -> List[Dict[str, Any]]:
+    """
+    Converts the upserted models into insert values. Only table columns are
+    kept and, as a statement may not touch the same row twice, the last model
+    wins when a primary key is repeated.
+    """
+    rows: Dict[Any, Dict[str, Any]] = {}
+    for model in models:
+        row = {k: v for k, v in model.dict().items() if k in table.c}
+        rows[row[pk]] = row
+
+    return list(rows.values())
+
+
+def upsert_statement(
+    table: "Table", dialect: str, pk: str, rows: List[Dict[str, Any]]
+) -> "Insert":
+    """
+    Builds a dialect native INSERT ... ON CONFLICT (pk) DO UPDATE ... RETURNING
+    statement for SQLite and PostgreSQL.
+    """
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert  # type: ignore
+    else:
+        raise HTTPException(501, f"Upsert is not supported on {dialect}")
+
+    stmt = insert(table).values(rows)
+    update = {
+        name: stmt.excluded[name] for name in rows[0] if name != pk  # type: ignore
+    }
+
+    if update:
+        stmt = stmt.on_conflict_do_update(index_elements=[table.c[pk]], set_=update)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=[table.c[pk]])
+
+    return stmt.returning(*table.columns)  # type: ignore
+
+
+def aggregate_statement(
+    source: Any, column: Callable[[str], Any], aggregation: AGGREGATION
+) -> "Select":
+    """
+    Compiles an aggregation into a single SELECT ... GROUP BY statement over
+    ``source``, ``column`` resolving field names to columns
+    """
+    group_by, metrics = aggregation
+    values = [
+        (func.count() if name is None else getattr(func, aggregate)(column(name)))
+        for _, aggregate, name in metrics
+    ]
+
+    stmt = select(
+        *(column(name).label(name) for name in group_by),
+        *(value.label(label) for value, (label, _, _) in zip(values, metrics)),
+    ).select_from(source)
+
+    if group_by:
+        keys = [column(name) for name in group_by]
+        stmt = stmt.group_by(*keys).order_by(*keys)
+
+    return stmt
+
+
+def chunk_end_statement(table: "Table", pk: str, after: Any, size: int) -> "Select":
+    """
+    Selects the primary key ending the chunk of ``size`` rows following
+    ``after``, None when fewer rows are left
+    """
+    column = table.c[pk]
+    stmt = select(column).order_by(column).offset(size - 1).limit(1)
+
+    return stmt if after is None else stmt.where(column > after)
+
+
+def delete_range_statement(table: "Table", pk: str, after: Any, end: Any) -> "Delete":
+    """Deletes the rows with a primary key in (``after``, ``end``]"""
+    column = table.c[pk]
+    stmt = delete(table)
+    if after is not None:
+        stmt = stmt.where(column > after)
+    if end is not None:
+        stmt = stmt.where(column <= end)
+
+    return stmt
+
+
+def selection_clauses(table: "Table", selection: Selection) -> List[Any]:
+    """The WHERE clauses of the rows selected by a bulk route"""
+    clauses = []
+    for name, value in selection.filters.items():
+        if name not in table.c:
+            raise HTTPException(422, f"Cannot filter on {name}")
+
+        clauses.append(table.c[name] == value)
+
+    if selection.ids is not None:
+        clauses.append(table.c[selection.pk].in_(selection.ids))
+
+    return clauses
@@ -0,0 +1,391 @@
+import time
+import weakref
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from ._types import AGGREGATION
+
+try:
+    from sqlalchemy import (
+        Boolean,
+        Column,
+        Float,
+        Integer,
+        MetaData,
+        String,
+        Table,
+        and_,
+        case,
+        select,
+    )
+    from sqlalchemy.exc import IntegrityError
+except ImportError:
+    Table = None  # type: ignore
+
+STATS_TABLE = "crouton_stats"
+
+# Row changes, as +1 for an added row or -1 for a removed one and its values
+CHANGES = List[Tuple[int, Dict[str, Any]]]
+
+# The values of the rows an update overwrites, collected for the statistics
+# hook by the backends while it runs
+replaced_rows: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "replaced_rows", default=None
+)
+
+
+class TableStats:
+    """
+    Running statistics of a table, kept up to date by the writes of its
+    router: the row count, the count, sum, min and max of numeric fields and
+    the number of rows per value of string fields. Removing the current min
+    or max of a field makes it stale until it is recomputed from the table.
+    """
+
+    def __init__(self, numeric: Sequence[str], categories: Sequence[str]) -> None:
+        self.numeric = list(numeric)
+        self.categories = list(categories)
+        self.stale: Set[str] = set()
+        self.reset()
+        # Unknown until loaded from the side table or rebuilt from the table
+        self.ready = False
+
+    def reset(self) -> None:
+        """Sets the statistics of an empty table"""
+        self.count = 0
+        self.fields: Dict[str, List[Any]] = {
+            field: [0, 0, None, None] for field in self.numeric
+        }
+        self.counts: Dict[str, Dict[str, int]] = {f: {} for f in self.categories}
+        self.stale.clear()
+        self.ready = True
+
+    def values(self, row: Any) -> Dict[str, Any]:
+        """The tracked fields of a row"""
+        return {f: getattr(row, f) for f in self.numeric + self.categories}
+
+    def add(self, values: Dict[str, Any]) -> None:
+        self.count += 1
+        for field, state in self.fields.items():
+            value = values[field]
+            if value is None:
+                continue
+
+            state[0] += 1
+            state[1] += value
+            if state[2] is None or value < state[2]:
+                state[2] = value
+            if state[3] is None or value > state[3]:
+                state[3] = value
+
+        for field, counts in self.counts.items():
+            key = str(values[field])
+            counts[key] = counts.get(key, 0) + 1
+
+    def remove(self, values: Dict[str, Any]) -> None:
+        self.count -= 1
+        for field, state in self.fields.items():
+            value = values[field]
+            if value is None:
+                continue
+
+            state[0] -= 1
+            state[1] -= value
+            if state[0] == 0:
+                state[1:] = [0, None, None]
+            elif value == state[2] or value == state[3]:
+                self.stale.add(field)
+
+        for field, counts in self.counts.items():
+            key = str(values[field])
+            counts[key] = counts.get(key, 0) - 1
+            if counts[key] <= 0:
+                del counts[key]
+
+    def totals_aggregation(self, fields: Sequence[str]) -> AGGREGATION:
+        metrics: List[Tuple[str, str, Optional[str]]] = [("count", "count", None)]
+        for field in fields:
+            metrics += [
+                (f"count_{field}", "count", field),
+                (f"sum_{field}", "sum", field),
+                (f"min_{field}", "min", field),
+                (f"max_{field}", "max", field),
+            ]
+
+        return [], metrics
+
+    def load_totals(self, row: Dict[str, Any], fields: Sequence[str]) -> None:
+        self.count = row["count"]
+        for field in fields:
+            self.fields[field] = [
+                row[f"count_{field}"],
+                row[f"sum_{field}"] or 0,
+                row[f"min_{field}"],
+                row[f"max_{field}"],
+            ]
+            self.stale.discard(field)
+
+    def load_counts(self, field: str, rows: List[Dict[str, Any]]) -> None:
+        self.counts[field] = {str(row[field]): row["count"] for row in rows}
+
+    def apply(self, changes: Optional[CHANGES]) -> None:
+        """Applies row changes, or forgets the statistics when None"""
+        if changes is None:
+            self.ready = False
+        elif self.ready:
+            for sign, values in changes:
+                (self.add if sign > 0 else self.remove)(values)
+
+    def load_rows(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Loads statistics persisted by ``save_stats``. They stay unknown when
+        they were never built or a tracked field has no row yet.
+        """
+        self.reset()
+        built = set()
+        for row in rows:
+            kind, field = row["kind"], row["field"]
+            if kind == "rows":
+                self.count = row["count"]
+                built.add("")
+            elif kind == "field" and field in self.fields:
+                self.fields[field] = [
+                    row["count"],
+                    row["total"] or 0,
+                    row["minimum"],
+                    row["maximum"],
+                ]
+                if row["stale"]:
+                    self.stale.add(field)
+                built.add(field)
+            elif kind == "field" and field in self.counts:
+                built.add(field)
+            elif kind == "value" and field in self.counts and row["count"] > 0:
+                self.counts[field][row["value"]] = row["count"]
+
+        self.ready = built >= {"", *self.numeric, *self.categories}
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """The statistics as rows of the side table"""
+        rows = [_row("rows", "", "", self.count)]
+        for field, (count, total, minimum, maximum) in self.fields.items():
+            rows.append(_row("field", field, "", count, total, minimum, maximum))
+        for field, counts in self.counts.items():
+            rows.append(_row("field", field, "", 0))
+            rows += [_row("value", field, k, v) for k, v in counts.items()]
+
+        return rows
+
+    def report(self) -> Dict[str, Any]:
+        fields: Dict[str, Any] = {}
+        for field, (count, total, minimum, maximum) in self.fields.items():
+            fields[field] = {
+                "count": count,
+                "sum": total,
+                "avg": total / count if count else None,
+                "min": minimum,
+                "max": maximum,
+            }
+
+        for field, counts in self.counts.items():
+            fields[field] = {"counts": dict(sorted(counts.items()))}
+
+        return {"count": self.count, "fields": fields}
+
+
+def _row(
+    kind: str,
+    field: str,
+    value: str,
+    count: int,
+    total: Any = None,
+    minimum: Any = None,
+    maximum: Any = None,
+) -> Dict[str, Any]:
+    return {
+        "kind": kind,
+        "field": field,
+        "value": value,
+        "count": count,
+        "total": total,
+        "minimum": minimum,
+        "maximum": maximum,
+        "stale": False,
+    }
+
+
+_metadata = MetaData() if Table is not None else None
+# One row for the row count, one per tracked field holding the aggregates of
+# numeric fields, and one per value of string fields
+_stats_table = (
+    Table(
+        STATS_TABLE,
+        _metadata,
+        Column("table_name", String(255), primary_key=True),
+        Column("kind", String(8), primary_key=True),
+        Column("field", String(255), primary_key=True),
+        Column("value", String(255), primary_key=True),
+        Column("count", Integer, nullable=False),
+        Column("total", Float),
+        Column("minimum", Float),
+        Column("maximum", Float),
+        Column("stale", Boolean, nullable=False),
+        Column("updated_at", Float, nullable=False),
+    )
+    if Table is not None
+    else None
+)
+_created: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def _create_table(bind: Any) -> None:
+    if bind not in _created:
+        _stats_table.create(bind, checkfirst=True)  # type: ignore
+        _created.add(bind)
+
+
+def load_stats(bind: Any, table: str) -> List[Dict[str, Any]]:
+    """Reads the persisted statistics of ``table`` from the side table"""
+    _create_table(bind)
+    c = _stats_table.c  # type: ignore
+    with bind.connect() as conn:
+        rows = conn.execute(
+            select(_stats_table).where(c.table_name == table)  # type: ignore
+        )
+        return [dict(row) for row in rows.mappings()]
+
+
+def save_stats(
+    bind: Any, table: str, stats: TableStats, fields: Optional[Sequence[str]] = None
+) -> None:
+    """
+    Persists the statistics of ``table``, replacing them, or only the
+    recomputed extremes of ``fields``
+    """
+    _create_table(bind)
+    now = time.time()
+    with bind.begin() as conn:
+        if fields is None:
+            rows = [{**r, "table_name": table, "updated_at": now} for r in stats.rows()]
+            conn.execute(_delete(table))
+            conn.execute(_stats_table.insert(), rows)  # type: ignore
+            return
+
+        for field in fields:
+            _, _, minimum, maximum = stats.fields[field]
+            conn.execute(
+                _stats_table.update()  # type: ignore
+                .where(_key(table, "field", field))
+                .values(minimum=minimum, maximum=maximum, stale=False, updated_at=now)
+            )
+
+
+def increment_stats(
+    bind: Any, table: str, stats: TableStats, changes: Optional[CHANGES]
+) -> None:
+    """
+    Adds row changes to the persisted statistics of ``table`` with relative
+    updates, so that the routers of several processes can share them. Nothing
+    is written while they are not built, and None drops them, the next read
+    rebuilding them from the table.
+    """
+    _create_table(bind)
+    c = _stats_table.c  # type: ignore
+    now = time.time()
+    with bind.begin() as conn:
+        if changes is None:
+            conn.execute(_delete(table))
+            return
+
+        count = sum(sign for sign, _ in changes)
+        built = conn.execute(
+            _stats_table.update()  # type: ignore
+            .where(_key(table, "rows", ""))
+            .values(count=c.count + count, updated_at=now)
+        ).rowcount
+        if not built:
+            return
+
+        for field in stats.numeric:
+            added = _field_values(changes, field, 1)
+            removed = _field_values(changes, field, -1)
+            if sorted(added) == sorted(removed):
+                continue
+
+            values: Dict[str, Any] = {
+                "count": c.count + len(added) - len(removed),
+                "total": c.total + (sum(added) - sum(removed)),
+                "updated_at": now,
+            }
+            if added:
+                low, high = min(added), max(added)
+                values["minimum"] = case(
+                    (c.minimum.is_(None) | (c.minimum > low), low), else_=c.minimum
+                )
+                values["maximum"] = case(
+                    (c.maximum.is_(None) | (c.maximum < high), high), else_=c.maximum
+                )
+            if removed:
+                # Removing an extreme leaves it unknown until it is recomputed
+                low, high = min(removed), max(removed)
+                values["stale"] = case(
+                    ((c.minimum >= low) | (c.maximum <= high), True), else_=c.stale
+                )
+
+            conn.execute(
+                _stats_table.update()  # type: ignore
+                .where(_key(table, "field", field))
+                .values(**values)
+            )
+
+        for field in stats.categories:
+            deltas: Dict[str, int] = {}
+            for sign, v in changes:
+                deltas[str(v[field])] = deltas.get(str(v[field]), 0) + sign
+
+            for value, delta in deltas.items():
+                if delta:
+                    _increment_value(conn, table, field, value, delta, now)
+
+
+def _field_values(changes: CHANGES, field: str, sign: int) -> List[Any]:
+    return [v[field] for s, v in changes if s == sign and v[field] is not None]
+
+
+def _increment_value(
+    conn: Any, table: str, field: str, value: str, delta: int, now: float
+) -> None:
+    c = _stats_table.c  # type: ignore
+    increment = (
+        _stats_table.update()  # type: ignore
+        .where(_key(table, "value", field, value))
+        .values(count=c.count + delta, updated_at=now)
+    )
+    if conn.execute(increment).rowcount:
+        return
+
+    try:
+        with conn.begin_nested():
+            conn.execute(
+                _stats_table.insert().values(  # type: ignore
+                    **_row("value", field, value, delta),
+                    table_name=table,
+                    updated_at=now,
+                )
+            )
+    except IntegrityError:
+        # Another process inserted the value first
+        conn.execute(increment)
+
+
+def _delete(table: str) -> Any:
+    return _stats_table.delete().where(  # type: ignore
+        _stats_table.c.table_name == table  # type: ignore
+    )
+
+
+def _key(table: str, kind: str, field: str, value: str = "") -> Any:
+    c = _stats_table.c  # type: ignore
+    return and_(
+        c.table_name == table, c.kind == kind, c.field == field, c.value == value
+    )
@@ -0,0 +1,229 @@
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+try:
+    from sqlalchemy import (
+        BigInteger,
+        Boolean,
+        Column,
+        Index,
+        Integer,
+        MetaData,
+        String,
+        Table,
+        select,
+        text,
+    )
+    from sqlalchemy.sql.selectable import Select
+except ImportError:
+    Table = None  # type: ignore
+    Select = None  # type: ignore
+
+CHANGES_TABLE = "crouton_changes"
+
+_metadata = MetaData() if Table is not None else None
+_changes_table = (
+    Table(
+        CHANGES_TABLE,
+        _metadata,
+        Column("table_name", String(255), primary_key=True),
+        Column("row_id", String(255), primary_key=True),
+        Column("seq", Integer, nullable=False),
+        Column("deleted", Boolean, nullable=False),
+        Column("xid", BigInteger),
+        Index(f"ix_{CHANGES_TABLE}_seq", "table_name", "seq", unique=True),
+        Index(f"ix_{CHANGES_TABLE}_xid", "table_name", "xid", "seq"),
+    )
+    if Table is not None
+    else None
+)
+
+
+class ChangeTracker:
+    """
+    Stamps every row of a table with an increasing sequence number on each
+    write, in a side table kept by triggers. Deleted rows stay in the side
+    table as tombstones, so a client can fetch everything that changed since
+    the last sequence number it saw with a range scan of the side table.
+
+    Sequence numbers are allocated by the writing transaction. SQLite
+    serializes writers, so they are committed in order and the sequence
+    number is the sync position. On PostgreSQL a transaction committing late
+    may expose a number below one already synced, so changes are also stamped
+    with the id of their transaction, which is their position: only those of
+    transactions older than every running one are returned, in transaction
+    then sequence order, so none can appear behind a position once synced.
+    """
+
+    def __init__(self, table: "Table", pk: str) -> None:
+        self.table = table
+        self.pk = pk
+        self.installed = False
+        self._lock = threading.Lock()
+
+    def install(self, bind: Any) -> None:
+        """
+        Creates the side table and the triggers, stamping the existing rows
+        the first time
+        """
+        if self.installed:
+            return
+
+        with self._lock:
+            if self.installed:
+                return
+
+            dialect = bind.dialect.name
+            if dialect not in ("sqlite", "postgresql"):
+                return
+
+            _changes_table.create(bind, checkfirst=True)  # type: ignore
+            changes = _changes_table.c  # type: ignore
+            with bind.begin() as conn:
+                tracked = conn.execute(
+                    select(changes.seq)
+                    .where(changes.table_name == self.table.name)
+                    .limit(1)
+                ).first()
+                statements = (
+                    self._sqlite_triggers(bind)
+                    if dialect == "sqlite"
+                    else self._postgresql_triggers(bind)
+                )
+                if tracked is None:
+                    statements.append(self._stamp_existing(bind))
+
+                for statement in statements:
+                    conn.execute(text(statement))
+
+            self.installed = True
+
+    def check(self, dialect: str) -> None:
+        """Raises unless changes can be synced on ``dialect``"""
+        if dialect not in ("sqlite", "postgresql"):
+            raise HTTPException(501, f"Sync is not supported on {dialect}")
+        elif not self.installed:
+            raise HTTPException(503, "Change tracking not installed before startup")
+
+    def statement(
+        self,
+        dialect: str,
+        since: int,
+        limit: Optional[int] = None,
+        through: Optional[int] = None,
+    ) -> "Select":
+        """
+        The changes following position ``since``, up to ``through``, as
+        ``row_id``, ``position`` and ``deleted`` in position order
+        """
+        changes = _changes_table.c  # type: ignore
+        if dialect == "postgresql":
+            position = changes.xid
+            horizon = text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+            order = [changes.xid, changes.seq]
+        else:
+            position = changes.seq
+            horizon = None
+            order = [changes.seq]
+
+        stmt = select(
+            changes.row_id, position.label("position"), changes.deleted
+        ).where(changes.table_name == self.table.name, position > since)
+        if horizon is not None:
+            stmt = stmt.where(position < horizon)
+        if through is not None:
+            stmt = stmt.where(position <= through)
+
+        return stmt.order_by(*order).limit(limit)
+
+    def _stamp_existing(self, bind: Any) -> str:
+        quote = bind.dialect.identifier_preparer.quote
+        table, pk = quote(self.table.name), quote(self.pk)
+        number = (
+            f"nextval('{CHANGES_TABLE}_seq')"
+            if bind.dialect.name == "postgresql"
+            else f"ROW_NUMBER() OVER (ORDER BY {pk})"
+        )
+        return (
+            f"INSERT INTO {CHANGES_TABLE} (table_name, row_id, seq, deleted, xid) "
+            f"SELECT '{self.table.name}', CAST({pk} AS TEXT), {number}, false, "
+            f"{_xid(bind)} FROM {table}"
+        )
+
+    def _upsert(self, bind: Any, row: str, deleted: str, seq: str) -> str:
+        pk = bind.dialect.identifier_preparer.quote(self.pk)
+        return (
+            f"INSERT INTO {CHANGES_TABLE} (table_name, row_id, seq, deleted, xid) "
+            f"VALUES ('{self.table.name}', CAST({row}.{pk} AS TEXT), {seq}, "
+            f"{deleted}, {_xid(bind)}) ON CONFLICT (table_name, row_id) "
+            f"DO UPDATE SET seq = excluded.seq, deleted = excluded.deleted, "
+            f"xid = excluded.xid;"
+        )
+
+    def _sqlite_triggers(self, bind: Any) -> List[str]:
+        quote = bind.dialect.identifier_preparer.quote
+        table = quote(self.table.name)
+        seq = (
+            f"(SELECT COALESCE(MAX(seq), 0) + 1 FROM {CHANGES_TABLE} "
+            f"WHERE table_name = '{self.table.name}')"
+        )
+        name = f"{CHANGES_TABLE}_{self.table.name}"
+        written = self._upsert(bind, "new", "false", seq)
+        deleted = self._upsert(bind, "old", "true", seq)
+
+        return [
+            f"CREATE TRIGGER IF NOT EXISTS {quote(name + '_ai')} "
+            f"AFTER INSERT ON {table} BEGIN {written} END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(name + '_au')} "
+            f"AFTER UPDATE ON {table} BEGIN {written} END",
+            f"CREATE TRIGGER IF NOT EXISTS {quote(name + '_ad')} "
+            f"AFTER DELETE ON {table} BEGIN {deleted} END",
+        ]
+
+    def _postgresql_triggers(self, bind: Any) -> List[str]:
+        quote = bind.dialect.identifier_preparer.quote
+        table = quote(self.table.name)
+        sequence = f"{CHANGES_TABLE}_seq"
+        seq = f"nextval('{sequence}')"
+        name = quote(f"{CHANGES_TABLE}_{self.table.name}")
+
+        written = self._upsert(bind, "NEW", "false", seq)
+        deleted = self._upsert(bind, "OLD", "true", seq)
+
+        return [
+            f"CREATE SEQUENCE IF NOT EXISTS {sequence}",
+            f"CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$ BEGIN "
+            f"IF TG_OP = 'DELETE' THEN {deleted} RETURN OLD; END IF; "
+            f"{written} RETURN NEW; END $$ LANGUAGE plpgsql",
+            f"DROP TRIGGER IF EXISTS {name} ON {table}",
+            f"CREATE TRIGGER {name} AFTER INSERT OR UPDATE OR DELETE ON {table} "
+            f"FOR EACH ROW EXECUTE FUNCTION {name}()",
+        ]
+
+
+def _xid(bind: Any) -> str:
+    """The id of the writing transaction, on PostgreSQL 13 and later"""
+    if bind.dialect.name == "postgresql":
+        return "pg_current_xact_id()::text::bigint"
+
+    return "NULL"
+
+
+def complete_page(
+    changes: List[Any], limit: int, load: Callable[[int], List[Any]]
+) -> Tuple[List[Any], bool]:
+    """
+    Cuts a page of ``limit`` changes out of ``changes``, fetched one past the
+    limit, so that it does not end in the middle of a position. Positions are
+    transactions on PostgreSQL, the page then ends before the transaction the
+    limit splits, or holds all of it as returned by ``load`` when it is the
+    first one. Returns the page and whether more changes follow.
+    """
+    if len(changes) <= limit:
+        return changes, False
+
+    boundary = changes[limit].position
+    page = [change for change in changes[:limit] if change.position != boundary]
+    return page or load(boundary), True
@@ -1,9 +1,11 @@
-from typing import Dict, TypeVar, Optional, Sequence
+from typing import Dict, List, Tuple, TypeVar, Optional, Sequence
 
 from fastapi.params import Depends
 from pydantic import BaseModel
 
 PAGINATION = Dict[str, Optional[int]]
+SORT = List[Tuple[str, bool]]
+AGGREGATION = Tuple[List[str], List[Tuple[str, str, Optional[str]]]]
 PYDANTIC_SCHEMA = BaseModel
 
 T = TypeVar("T", bound=BaseModel)
@@ -1,8 +1,30 @@
-from typing import Optional, Type, Any
-from fastapi import Depends, HTTPException
-from pydantic import create_model
+import base64
+import inspect
+import json
+import re
+from decimal import Decimal
+from typing import (
+    Any,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
 
-from ._types import T, PAGINATION, PYDANTIC_SCHEMA
+from fastapi import Body, Depends, Header, HTTPException, Query, Request, Response
+from pydantic import BaseModel, conlist, create_model, validator
+from pydantic.errors import NoneIsNotAllowedError
+
+from ._types import T, AGGREGATION, PAGINATION, PYDANTIC_SCHEMA, SORT
+
+AGGREGATES = ("count", "sum", "avg", "min", "max")
+_METRIC = re.compile(r"^(\w+)(?:\((\w*)\))?$")
 
 
 class AttrDict(dict):  # type: ignore
@@ -40,6 +62,118 @@ def schema_factory(
     return schema
 
 
+def partial_schema_factory(
+    schema_cls: Type[T], pk_field_name: str = "id", name: str = "Patch"
+) -> Type[T]:
+    """
+    Creates a schema without the primary key field where every field may be
+    omitted, for partial updates parsed with ``exclude_unset``. Fields that
+    are not nullable in ``schema_cls`` still reject an explicit null.
+    """
+    fields = {
+        name: (Optional[f.annotation], None)  # type: ignore
+        for name, f in schema_cls.__fields__.items()
+        if name != pk_field_name
+    }
+    not_null = [
+        name
+        for name, f in schema_cls.__fields__.items()
+        if name != pk_field_name and not f.allow_none
+    ]
+    validators = {}
+    if not_null:
+        validators["not_null"] = validator(*not_null, pre=True, allow_reuse=True)(
+            _not_none
+        )
+
+    name = schema_cls.__name__ + name
+    schema: Type[T] = create_model(  # type: ignore
+        __model_name=name, __validators__=validators, **fields
+    )
+    return schema
+
+
+def _not_none(value: Any) -> Any:
+    if value is None:
+        raise NoneIsNotAllowedError()
+
+    return value
+
+
+def get_many_schema_factory(schema_cls: Type[T], pk_type: Any) -> Type[BaseModel]:
+    """
+    Creates the response schema of the get_many route, the found items in
+    request order along with the ids that do not exist.
+    """
+    name = schema_cls.__name__ + "Many"
+    schema: Type[BaseModel] = create_model(  # type: ignore
+        __model_name=name,
+        items=(List[schema_cls], ...),  # type: ignore
+        missing=(List[pk_type], ...),  # type: ignore
+    )
+    return schema
+
+
+def batch_schema_factory(
+    schema_cls: Type[T], pk_type: Any, max_operations: Optional[int] = None
+) -> Tuple[Type[BaseModel], Type[BaseModel]]:
+    """
+    Creates the request and per operation result schemas of the batch route.
+    """
+    name = schema_cls.__name__ + "Batch"
+    operation: Type[BaseModel] = create_model(  # type: ignore
+        __model_name=name + "Operation",
+        op=(Literal["create", "update", "delete"], ...),
+        id=(Optional[pk_type], None),
+        data=(Optional[Dict[str, Any]], None),
+    )
+    request: Type[BaseModel] = create_model(  # type: ignore
+        __model_name=name,
+        mode=(Literal["atomic", "best_effort"], "atomic"),
+        operations=(conlist(operation, min_items=1, max_items=max_operations), ...),
+    )
+    result: Type[BaseModel] = create_model(  # type: ignore
+        __model_name=name + "Result",
+        op=(str, ...),
+        status=(int, ...),
+        id=(Optional[pk_type], None),
+        data=(Optional[schema_cls], None),
+        detail=(Optional[Any], None),
+    )
+    return request, result
+
+
+def sync_schema_factory(schema_cls: Type[T], pk_type: Any) -> Type[BaseModel]:
+    """
+    Creates the response schema of the sync route, a page of changed rows and
+    tombstones in sequence order
+    """
+    name = schema_cls.__name__ + "Sync"
+    change: Type[BaseModel] = create_model(  # type: ignore
+        __model_name=name + "Change",
+        seq=(int, ...),
+        id=(pk_type, ...),
+        deleted=(bool, ...),
+        data=(Optional[schema_cls], None),
+    )
+    return create_model(  # type: ignore
+        __model_name=name,
+        changes=(List[change], ...),  # type: ignore
+        seq=(int, ...),
+        more=(bool, ...),
+    )
+
+
+def bulk_result_schema_factory(schema_cls: Type[T], pk_type: Any) -> Type[BaseModel]:
+    """Creates the response schema of the bulk delete and update routes"""
+    return create_model(  # type: ignore
+        __model_name=schema_cls.__name__ + "BulkResult",
+        count=(int, ...),
+        ids=(List[pk_type], ...),  # type: ignore
+        dry_run=(bool, ...),
+    )
+
+
 def create_query_validation_exception(field: str, msg: str) -> HTTPException:
     return HTTPException(
         422,
@@ -77,3 +211,351 @@ def pagination_factory(max_limit: Optional[int] = None) -> Any:
         return {"skip": skip, "limit": limit}
 
     return Depends(pagination)
+
+
+def sort_factory(fields: Sequence[str], pk: str = "id") -> Any:
+    """
+    Creates the sort dependency of list routes, parsing ``sort=-mass,id``
+    into (field, descending) pairs. Only ``fields`` may be sorted on, and the
+    primary key always ends the order so that pagination is stable.
+    """
+    def sort(
+        sort: Optional[str] = Query(
+            None,
+            description="Comma separated fields to sort on, prefixed with - "
+            "for descending order",
+        )
+    ) -> SORT:
+        order: SORT = []
+        for name in (sort or "").split(","):
+            name = name.strip()
+            descending = name.startswith("-")
+            name = name.lstrip("-")
+
+            if not name or name in (field for field, _ in order):
+                continue
+            elif name not in fields:
+                raise create_query_validation_exception(
+                    field="sort",
+                    msg=f"cannot sort on {name}, sortable fields are "
+                    + ", ".join(fields),
+                )
+
+            order.append((name, descending))
+
+        if pk not in (field for field, _ in order):
+            order.append((pk, False))
+
+        return order
+
+    return Depends(sort)
+
+
+def sort_strings(sort: SORT) -> List[str]:
+    """The ``-field`` notation of a sort, as used by Tortoise and Ormar"""
+    return [("-" if descending else "") + field for field, descending in sort]
+
+
+class SearchQuery:
+    """
+    A full-text search of a list route: the words of ``q``, matched as
+    prefixes, and the keyset cursor of the page to start after
+    """
+
+    def __init__(
+        self, terms: List[str], after: Optional[Tuple[float, Any]], response: Response
+    ) -> None:
+        self.terms = terms
+        self.after = after
+        self.response = response
+
+    def fts5(self) -> str:
+        return " ".join('"' + term.replace('"', '""') + '"*' for term in self.terms)
+
+    def tsquery(self) -> str:
+        return " & ".join(term + ":*" for term in self.terms)
+
+    def next_page(self, rank: float, pk: Any) -> None:
+        """Sets the cursor of the page following the current one"""
+        cursor = json.dumps([rank, pk], separators=(",", ":")).encode()
+        self.response.headers["X-Next-Cursor"] = base64.urlsafe_b64encode(
+            cursor
+        ).decode()
+
+
+def search_factory(enabled: bool = False) -> Any:
+    """
+    Creates the dependency parsing the ``q`` and ``after`` search parameters
+    of list routes. Without a search index, or without ``q``, there is no
+    search and the list route behaves as usual.
+    """
+    def no_search() -> None:
+        return None
+
+    def search(
+        response: Response,
+        q: Optional[str] = Query(None, description="Words to search for"),
+        after: Optional[str] = Query(
+            None, description="The X-Next-Cursor header of the previous page"
+        ),
+    ) -> Optional[SearchQuery]:
+        if q is None:
+            return None
+
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            raise create_query_validation_exception(
+                field="q", msg="q must contain a word to search for"
+            )
+
+        cursor = None
+        if after is not None:
+            try:
+                rank, pk = json.loads(base64.urlsafe_b64decode(after.encode()))
+                cursor = float(rank), pk
+            except (TypeError, ValueError):
+                raise create_query_validation_exception(
+                    field="after", msg="invalid cursor"
+                ) from None
+
+        return SearchQuery(terms, cursor, response)
+
+    return Depends(search if enabled else no_search)
+
+
+def _scalar_type(annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+
+    return annotation
+
+
+def aggregate_fields(schema_cls: Type[PYDANTIC_SCHEMA]) -> Tuple[List[str], List[str]]:
+    """The numeric and the string fields of a schema"""
+    numeric, strings = [], []
+    for name, field in schema_cls.__fields__.items():
+        type_ = _scalar_type(field.annotation)
+        if not isinstance(type_, type) or issubclass(type_, bool):
+            continue
+        elif issubclass(type_, (int, float, Decimal)):
+            numeric.append(name)
+        elif issubclass(type_, str):
+            strings.append(name)
+
+    return numeric, strings
+
+
+def aggregate_factory(schema_cls: Type[PYDANTIC_SCHEMA]) -> Any:
+    """
+    Creates the dependency parsing the aggregate route query, such as
+    ``group_by=color&metrics=avg(mass),max(thickness),count``. Only numeric
+    and string fields can be grouped on and aggregated, and sums and
+    averages need numeric fields.
+    """
+    numeric, strings = aggregate_fields(schema_cls)
+
+    def aggregate(
+        group_by: Optional[str] = Query(
+            None, description="Comma separated fields to group on"
+        ),
+        metrics: str = Query(
+            "count",
+            description="Comma separated metrics among count, count(field), "
+            "sum(field), avg(field), min(field) and max(field)",
+        ),
+    ) -> AGGREGATION:
+        fields = [f.strip() for f in (group_by or "").split(",") if f.strip()]
+        for name in fields:
+            if name not in numeric and name not in strings:
+                raise create_query_validation_exception(
+                    field="group_by", msg=f"cannot group on {name}"
+                )
+
+        parsed: List[Tuple[str, str, Optional[str]]] = []
+        for metric in (m.strip() for m in metrics.split(",") if m.strip()):
+            match = _METRIC.match(metric)
+            func, name = (match.group(1), match.group(2)) if match else (metric, None)
+            name = name or None
+
+            if func not in AGGREGATES or (name is None and func != "count"):
+                raise create_query_validation_exception(
+                    field="metrics", msg=f"invalid metric {metric}"
+                )
+            elif name is not None and name not in (
+                numeric if func in ("sum", "avg") else numeric + strings
+            ):
+                raise create_query_validation_exception(
+                    field="metrics", msg=f"cannot compute {func} of {name}"
+                )
+
+            label = func if name is None else f"{func}_{name}"
+            if label not in (existing for existing, _, _ in parsed):
+                parsed.append((label, func, name))
+
+        if not parsed:
+            raise create_query_validation_exception(
+                field="metrics", msg="at least one metric is required"
+            )
+
+        return fields, parsed
+
+    return Depends(aggregate)
+
+
+def item_ids_factory(pk_type: Any, max_ids: Optional[int] = None) -> Any:
+    """
+    Creates the dependency parsing the ids of the get_many route. Duplicate
+    ids are dropped, keeping the order of their first occurrence.
+    """
+    def item_ids(ids: List[pk_type] = Query(...)) -> List[Any]:  # type: ignore
+        ids = list(dict.fromkeys(ids))
+
+        if max_ids and max_ids < len(ids):
+            raise create_query_validation_exception(
+                field="ids",
+                msg=f"ids query parameter must contain at most {max_ids} ids",
+            )
+
+        return ids
+
+    return Depends(item_ids)
+
+
+def upsert_body_factory(schema_cls: Type[T], max_items: Optional[int] = None) -> Any:
+    """
+    Creates the dependency parsing the list body of the upsert route.
+    """
+    def upsert_body(models: List[schema_cls] = Body(...)) -> List[T]:  # type: ignore
+        if not models or (max_items and max_items < len(models)):
+            msg = "body must contain at least one item"
+            if max_items:
+                msg = f"body must contain between 1 and {max_items} items"
+
+            raise HTTPException(
+                422, detail=[{"loc": ["body"], "msg": msg, "type": "value_error.list"}]
+            )
+
+        return models
+
+    return Depends(upsert_body)
+
+
+class Selection:
+    """
+    The rows a bulk route applies to: those with one of ``ids``, when given,
+    and equal to every value of ``filters``
+    """
+
+    def __init__(
+        self,
+        pk: str,
+        ids: Optional[List[Any]],
+        filters: Dict[str, Any],
+        dry_run: bool = False,
+    ) -> None:
+        self.pk = pk
+        self.ids = ids
+        self.filters = filters
+        self.dry_run = dry_run
+
+    def matches(self, row: Any) -> bool:
+        if self.ids is not None and getattr(row, self.pk) not in self.ids:
+            return False
+
+        return all(getattr(row, k) == v for k, v in self.filters.items())
+
+
+def selection_factory(
+    schema_cls: Type[PYDANTIC_SCHEMA],
+    pk: str,
+    pk_type: Any,
+    max_ids: Optional[int] = None,
+) -> Any:
+    """
+    Creates the dependency parsing the selection of the bulk routes, such as
+    ``ids=1&ids=2`` or ``color=red&type=russet``. Scalar fields can be
+    filtered on for equality. Unknown query parameters are rejected rather
+    than ignored, as ignoring a misspelt filter would widen the selection.
+    """
+    fields: Dict[str, type] = {}
+    for name, field in schema_cls.__fields__.items():
+        type_ = _scalar_type(field.annotation)
+        if name in (pk, "ids", "dry_run") or not isinstance(type_, type):
+            continue
+        elif issubclass(type_, (bool, int, float, Decimal, str)):
+            fields[name] = type_
+
+    def selection(request: Request, **params: Any) -> Selection:
+        for name in request.query_params:
+            if name not in params:
+                raise create_query_validation_exception(
+                    field=name, msg=f"unknown query parameter {name}"
+                )
+
+        ids, dry_run = params.pop("ids"), params.pop("dry_run")
+        if ids is not None:
+            ids = list(dict.fromkeys(ids))
+            if max_ids and max_ids < len(ids):
+                raise create_query_validation_exception(
+                    field="ids",
+                    msg=f"ids query parameter must contain at most {max_ids} ids",
+                )
+
+        filters = {k: v for k, v in params.items() if v is not None}
+        return Selection(pk, ids, filters, dry_run)
+
+    parameters = [
+        inspect.Parameter(
+            "request", inspect.Parameter.KEYWORD_ONLY, annotation=Request
+        ),
+        inspect.Parameter(
+            "ids",
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Query(None, description="Ids of the rows to apply to"),
+            annotation=Optional[List[pk_type]],  # type: ignore
+        ),
+        inspect.Parameter(
+            "dry_run",
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Query(False, description="Only count the selected rows"),
+            annotation=bool,
+        ),
+    ]
+    parameters += [
+        inspect.Parameter(
+            name,
+            inspect.Parameter.KEYWORD_ONLY,
+            default=Query(None),
+            annotation=Optional[type_],
+        )
+        for name, type_ in fields.items()
+    ]
+    selection.__signature__ = inspect.Signature(parameters)  # type: ignore
+
+    return Depends(selection)
+
+
+def if_match_factory(enabled: bool = False) -> Any:
+    """
+    Creates the dependency mapping the If-Match header of write routes to the
+    expected item version. ``*`` or no header means no expectation. When the
+    router has no version column the dependency takes no parameters, leaving
+    the routes and their OpenAPI schema unchanged.
+    """
+    def no_version() -> None:
+        return None
+
+    def if_match(if_match: Optional[str] = Header(None)) -> Optional[int]:
+        if if_match is None or if_match.strip() == "*":
+            return None
+
+        tag = if_match.strip()
+        tag = tag[2:] if tag.startswith("W/") else tag
+        try:
+            return int(tag.strip('"'))
+        except ValueError:
+            raise HTTPException(412, "Item version does not match") from None
+
+    return Depends(if_match if enabled else no_version)
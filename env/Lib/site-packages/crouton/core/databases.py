@@ -1,6 +1,9 @@
+from contextlib import asynccontextmanager
 from typing import (
     Any,
+    AsyncIterator,
     Callable,
+    Dict,
     List,
     Mapping,
     Type,
@@ -11,11 +14,23 @@ from typing import (
 
 from fastapi import HTTPException
 
-from . import CRUDGenerator, NOT_FOUND
-from ._types import PAGINATION, PYDANTIC_SCHEMA, DEPENDENCIES
-from ._utils import AttrDict, get_pk_type
+from . import CRUDGenerator, NOT_FOUND, PRECONDITION_FAILED
+from ._types import AGGREGATION, PAGINATION, PYDANTIC_SCHEMA, DEPENDENCIES, SORT
+from ._loader import loader_factory
+from ._querylog import SlowQueryLog, TimedDatabase
+from ._sql import (
+    aggregate_statement,
+    chunk_end_statement,
+    delete_range_statement,
+    selection_clauses,
+    upsert_rows,
+    upsert_statement,
+)
+from ._stats import replaced_rows
+from ._utils import AttrDict, Selection, get_pk_type
 
 try:
+    from sqlalchemy import func, select, text
     from sqlalchemy.sql.schema import Table
     from databases.core import Database
 except ImportError:
@@ -28,6 +43,7 @@ else:
 Model = Mapping[Any, Any]
 CALLABLE = Callable[..., Coroutine[Any, Any, Model]]
 CALLABLE_LIST = Callable[..., Coroutine[Any, Any, List[Model]]]
+CALLABLE_MANY = Callable[..., Coroutine[Any, Any, Dict[str, List[Model]]]]
 
 
 def pydantify_record(
@@ -56,17 +72,41 @@ class DatabasesCRUDRouter(CRUDGenerator[PYDANTIC_SCHEMA]):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        aggregate_route: Union[bool, DEPENDENCIES] = False,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        batch_route: Union[bool, DEPENDENCIES] = False,
+        upsert_route: Union[bool, DEPENDENCIES] = False,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
+        batch_get_one: Union[bool, float] = False,
+        version_column: Optional[str] = None,
+        slow_query_threshold: Optional[float] = None,
+        delete_all_chunk_size: Optional[int] = None,
         **kwargs: Any
     ) -> None:
         assert (
             databases_installed
         ), "Databases and SQLAlchemy must be installed to use the DatabasesCRUDRouter."
+        if bulk_route and delete_all_chunk_size:
+            # The bulk delete takes over DELETE on the collection, so the
+            # chunked delete_all would never run
+            raise ValueError(
+                "delete_all_chunk_size has no effect with bulk_route, whose "
+                "DELETE on the collection is capped by bulk_limit instead"
+            )
 
         self.table = table
         self.db = database
+        self.delete_all_chunk_size = delete_all_chunk_size
+        if slow_query_threshold is not None:
+            self.slow_query_log = SlowQueryLog(slow_query_threshold)
+            self.db = TimedDatabase(database)
         self._pk = table.primary_key.columns.values()[0].name
         self._pk_col = self.table.c[self._pk]
+        self._table_name = table.name
+        self._version_col = version_column
         self._pk_type: type = get_pk_type(schema, self._pk)
+        self._loader = loader_factory(self._load_many, batch_get_one)
 
         super().__init__(
             schema=schema,
@@ -81,24 +121,40 @@ class DatabasesCRUDRouter(CRUDGenerator[PYDANTIC_SCHEMA]):
             update_route=update_route,
             delete_one_route=delete_one_route,
             delete_all_route=delete_all_route,
+            get_many_route=get_many_route,
+            aggregate_route=aggregate_route,
+            patch_route=patch_route,
+            batch_route=batch_route,
+            upsert_route=upsert_route,
+            bulk_route=bulk_route,
             **kwargs
         )
 
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         async def route(
             pagination: PAGINATION = self.pagination,
+            sort: SORT = self.sort,
         ) -> List[Model]:
             skip, limit = pagination.get("skip"), pagination.get("limit")
+            self._record_query(sort=[field for field, _ in sort])
 
-            query = self.table.select().limit(limit).offset(skip)
+            query = (
+                self.table.select()
+                .order_by(*self._order_by(sort))
+                .limit(limit)
+                .offset(skip)
+            )
             return pydantify_record(await self.db.fetch_all(query))  # type: ignore
 
         return route
 
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(item_id: self._pk_type) -> Model:  # type: ignore
-            query = self.table.select().where(self._pk_col == item_id)
-            model = await self.db.fetch_one(query)
+            if self._loader:
+                model = await self._loader.load(item_id)
+            else:
+                query = self.table.select().where(self._pk_col == item_id)
+                model = await self.db.fetch_one(query)
 
             if model:
                 return pydantify_record(model)  # type: ignore
@@ -107,6 +163,15 @@ class DatabasesCRUDRouter(CRUDGenerator[PYDANTIC_SCHEMA]):
 
         return route
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> CALLABLE_MANY:
+        async def route(
+            item_ids: List[Any] = self.item_ids,
+        ) -> Dict[str, List[Model]]:
+            models = await self._load_many(item_ids)
+            return self._get_many_response(item_ids, models)
+
+        return route
+
     def _create(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(
             schema: self.create_schema,  # type: ignore
@@ -124,35 +189,355 @@ class DatabasesCRUDRouter(CRUDGenerator[PYDANTIC_SCHEMA]):
 
         return route
 
+    def _upsert(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        async def route(
+            models: List[PYDANTIC_SCHEMA] = self.upsert_body,
+        ) -> List[Model]:
+            rows = upsert_rows(models, self.table, self._pk)
+            stmt = upsert_statement(self.table, self.db.url.dialect, self._pk, rows)
+
+            try:
+                upserted = {
+                    row[self._pk]: pydantify_record(row)
+                    for row in await self.db.fetch_all(stmt)
+                }
+            except Exception as e:
+                self._raise(e)
+
+            item_ids = [row[self._pk] for row in rows]
+            return [upserted[id_] for id_ in item_ids if id_ in upserted]
+
+        return route
+
     def _update(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(
-            item_id: self._pk_type, schema: self.update_schema  # type: ignore
+            item_id: self._pk_type,  # type: ignore
+            schema: self.update_schema,  # type: ignore
+            expected_version: Optional[int] = self.if_match,
         ) -> Model:
+            if self._version_col:
+                values = schema.dict(exclude={self._pk})
+                return await self._update_values(item_id, values, expected_version)
+
             query = self.table.update().where(self._pk_col == item_id)
 
             try:
-                await self.db.fetch_one(
-                    query=query, values=schema.dict(exclude={self._pk})
-                )
+                async with self._replacing_row(item_id):
+                    await self.db.fetch_one(
+                        query=query, values=schema.dict(exclude={self._pk})
+                    )
                 return await self._get_one()(item_id)
             except Exception as e:
                 raise NOT_FOUND from e
 
         return route
 
+    def _aggregate(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        async def route(
+            aggregation: AGGREGATION = self.aggregation,
+        ) -> List[Dict[str, Any]]:
+            self._record_query(sort=aggregation[0])
+            stmt = aggregate_statement(
+                self.table, lambda name: self.table.c[name], aggregation
+            )
+
+            return [dict(row) for row in await self.db.fetch_all(stmt)]
+
+        return route
+
+    def _batch(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        async def route(
+            batch: self.batch_schema,  # type: ignore
+        ) -> List[Any]:
+            atomic = batch.mode == "atomic"
+            results = []
+
+            async with self.db.transaction():
+                for index, operation in enumerate(batch.operations):
+                    try:
+                        if atomic:
+                            data = await self._batch_execute(operation)
+                        else:
+                            async with self.db.transaction():
+                                data = await self._batch_execute(operation)
+                    except HTTPException as e:
+                        if atomic:
+                            raise self._batch_error(index, e) from None
+
+                        result = self._batch_result(
+                            operation, e.status_code, detail=e.detail
+                        )
+                        results.append(result)
+                    else:
+                        results.append(self._batch_result(operation, data=data))
+
+            return results
+
+        return route
+
+    async def _batch_execute(self, operation: Any) -> Model:
+        model = self._batch_data(operation)
+
+        if operation.op == "create":
+            try:
+                rid = await self.db.execute(
+                    query=self.table.insert(), values=model.dict()
+                )
+            except Exception:
+                raise HTTPException(422, "Key already exists") from None
+
+            if type(rid) is not self._pk_type:
+                rid = getattr(model, self._pk, rid)
+
+            return await self._fetch_one(rid)
+
+        row = await self._fetch_one(operation.id)
+        if operation.op == "update":
+            if self._version_col:
+                values = model.dict(exclude={self._pk})  # type: ignore
+                return await self._update_values(operation.id, values)
+
+            query = self.table.update().where(self._pk_col == operation.id)
+            try:
+                await self.db.execute(
+                    query=query, values=model.dict(exclude={self._pk})
+                )
+            except Exception as e:
+                self._raise(e)
+
+            return await self._fetch_one(operation.id)
+
+        await self.db.execute(self.table.delete().where(self._pk_col == operation.id))
+        return row
+
+    async def _fetch_one(self, item_id: Any) -> Model:
+        # Bypasses the get_one batcher, whose queries run outside the
+        # connection holding the batch transaction
+        query = self.table.select().where(self._pk_col == item_id)
+        row = await self.db.fetch_one(query)
+
+        if row is None:
+            raise NOT_FOUND
+
+        return pydantify_record(row)  # type: ignore
+
+    def _patch(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        async def route(
+            item_id: self._pk_type,  # type: ignore
+            model: self.patch_schema,  # type: ignore
+            expected_version: Optional[int] = self.if_match,
+        ) -> Model:
+            values = model.dict(exclude_unset=True, exclude={self._pk})
+            if not values:
+                row = await self._get_one()(item_id)
+                self._replacing(row)
+                return row
+
+            return await self._update_values(item_id, values, expected_version)
+
+        return route
+
+    async def _update_values(
+        self,
+        item_id: Any,
+        values: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> Model:
+        """
+        Updates the given columns of a row, with a single UPDATE ... RETURNING
+        statement on SQLite and PostgreSQL. With a version column the statement
+        also requires the expected version, taken from If-Match or else the
+        body, and bumps it. Other dialects tell whether it matched from the
+        number of rows it changed.
+        """
+        query = self.table.update().where(self._pk_col == item_id)
+        values = {
+            k: v for k, v in values.items() if k in self.table.c and k != self._pk
+        }
+        returning = self.db.url.dialect in ("sqlite", "postgresql")
+
+        if self._version_col:
+            version = self.table.c[self._version_col]
+            if expected_version is None:
+                expected_version = values.get(self._version_col)
+            if expected_version is not None:
+                query = query.where(version == expected_version)
+
+            values[self._version_col] = version + 1
+
+        query = query.values(values)
+        try:
+            async with self._replacing_row(item_id):
+                if returning:
+                    row = await self.db.fetch_one(query.returning(*self.table.c))
+                elif expected_version is not None:
+                    # The version is bumped, so a matched row is always changed
+                    changed = await self._execute_counted(query)
+                else:
+                    await self.db.execute(query)
+        except Exception as e:
+            self._raise(e)
+
+        if not returning:
+            if expected_version is not None and not changed:
+                await self._raise_missing(item_id, expected_version)
+
+            return await self._get_one()(item_id)
+        elif row is None:
+            await self._raise_missing(item_id, expected_version)
+
+        return pydantify_record(row)  # type: ignore
+
+    @asynccontextmanager
+    async def _replacing_row(self, item_id: Any) -> AsyncIterator[None]:
+        """
+        Hands the row an update overwrites to the statistics hook, read in the
+        transaction of the update with the row locked where the database can
+        """
+        if replaced_rows.get() is None:
+            yield
+            return
+
+        async with self.db.transaction():
+            query = self.table.select().where(self._pk_col == item_id)
+            row = await self.db.fetch_one(query.with_for_update())
+            if row is not None:
+                self._replacing(pydantify_record(row))
+            yield
+
+    async def _execute_counted(self, query: Any) -> int:
+        """
+        Runs a write and returns the number of rows it changed, which MySQL
+        only reports through ROW_COUNT() on the same connection
+        """
+        async with self.db.connection() as connection:
+            await connection.execute(query)
+            return await connection.fetch_val(text("SELECT ROW_COUNT()"))
+
+    async def _raise_missing(
+        self, item_id: Any, expected_version: Optional[int]
+    ) -> None:
+        query = self.table.select().where(self._pk_col == item_id)
+        if expected_version is not None and await self.db.fetch_one(query):
+            raise PRECONDITION_FAILED
+
+        raise NOT_FOUND
+
     def _delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         async def route() -> List[Model]:
-            query = self.table.delete()
-            await self.db.execute(query=query)
+            size = self.delete_all_chunk_size
+            if not size:
+                await self.db.execute(query=self.table.delete())
+                return []
+
+            # Each statement commits on its own, so other writers are only
+            # blocked for one chunk
+            after = None
+            while True:
+                end = await self.db.fetch_val(
+                    query=chunk_end_statement(self.table, self._pk, after, size)
+                )
+                await self.db.execute(
+                    query=delete_range_statement(self.table, self._pk, after, end)
+                )
+
+                if end is None:
+                    return []
 
-            return await self._get_all()(pagination={"skip": 0, "limit": None})
+                after = end
 
         return route
 
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(selection: Selection = self.selection) -> Dict[str, Any]:
+            return await self._bulk_write(selection, self.table.delete())
+
+        return route
+
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(
+            model: self.patch_schema,  # type: ignore
+            selection: Selection = self.selection,
+        ) -> Dict[str, Any]:
+            values = self._bulk_values(model)
+            if self._version_col:
+                values[self._version_col] = self.table.c[self._version_col] + 1
+
+            query = self.table.update().values(values)
+            return await self._bulk_write(selection, query)
+
+        return route
+
+    async def _bulk_write(self, selection: Selection, query: Any) -> Dict[str, Any]:
+        """
+        Runs a bulk DELETE or UPDATE as a single statement returning the
+        affected ids, rolled back when it affects more rows than allowed
+        """
+        where = selection_clauses(self.table, selection)
+
+        if selection.dry_run:
+            count = await self.db.fetch_val(
+                select(func.count()).select_from(self.table).where(*where)
+            )
+            rows = await self.db.fetch_all(
+                select(self._pk_col)
+                .where(*where)
+                .order_by(self._pk_col)
+                .limit(self.bulk_limit)
+            )
+            ids = [row[self._pk] for row in rows]
+            return self._bulk_result(ids, dry_run=True, count=count)
+
+        try:
+            async with self.db.transaction():
+                if self.db.url.dialect in ("sqlite", "postgresql"):
+                    query = query.where(*where).returning(self._pk_col)
+                    ids = [row[self._pk] for row in await self.db.fetch_all(query)]
+                else:
+                    stmt = select(self._pk_col).where(*where)
+                    ids = [row[self._pk] for row in await self.db.fetch_all(stmt)]
+                    self._check_bulk_limit(len(ids))
+                    await self.db.execute(query.where(self._pk_col.in_(ids)))
+
+                self._check_bulk_limit(len(ids))
+        except HTTPException:
+            raise
+        except Exception as e:
+            self._raise(e)
+
+        return self._bulk_result(ids)
+
     def _delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
-        async def route(item_id: self._pk_type) -> Model:  # type: ignore
+        async def route(
+            item_id: self._pk_type,  # type: ignore
+            expected_version: Optional[int] = self.if_match,
+        ) -> Model:
             query = self.table.delete().where(self._pk_col == item_id)
 
+            if self._version_col and expected_version is not None:
+                query = query.where(self.table.c[self._version_col] == expected_version)
+                if self.db.url.dialect in ("sqlite", "postgresql"):
+                    row = await self.db.fetch_one(query.returning(*self.table.c))
+                    if row is None:
+                        await self._raise_missing(item_id, expected_version)
+
+                    return pydantify_record(row)  # type: ignore
+
+                # The locked row is only read for the response, whether the
+                # version matches is decided by the DELETE itself
+                async with self.db.transaction():
+                    row = await self.db.fetch_one(
+                        self.table.select()
+                        .where(self._pk_col == item_id)
+                        .with_for_update()
+                    )
+                    if row is None:
+                        raise NOT_FOUND
+                    if not await self._execute_counted(query):
+                        raise PRECONDITION_FAILED
+
+                return pydantify_record(row)  # type: ignore
+
             try:
                 row = await self._get_one()(item_id)
                 await self.db.execute(query=query)
@@ -161,3 +546,17 @@ class DatabasesCRUDRouter(CRUDGenerator[PYDANTIC_SCHEMA]):
                 raise NOT_FOUND from e
 
         return route
+
+    def _order_by(self, sort: SORT) -> List[Any]:
+        columns = [(self.table.c[field], desc) for field, desc in sort]
+        return [column.desc() if desc else column.asc() for column, desc in columns]
+
+    async def _load_ids(self, params: Dict[str, Any]) -> Optional[List[Any]]:
+        rows = await self.db.fetch_all(select(self._pk_col))
+        return [row[0] for row in rows]
+
+    async def _load_many(self, item_ids: List[Any]) -> Dict[Any, Model]:
+        query = self.table.select().where(self._pk_col.in_(item_ids))
+        rows = await self.db.fetch_all(query)
+
+        return {row[self._pk]: row for row in rows}
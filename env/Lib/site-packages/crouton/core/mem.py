@@ -1,10 +1,24 @@
-from typing import Any, Callable, List, Type, cast, Optional, Union
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple, Type, cast, Optional, Union
+
+from fastapi import HTTPException
 
 from . import CRUDGenerator, NOT_FOUND
-from ._types import DEPENDENCIES, PAGINATION, PYDANTIC_SCHEMA as SCHEMA
+from ._utils import Selection
+from ._types import (
+    AGGREGATION,
+    DEPENDENCIES,
+    PAGINATION,
+    PYDANTIC_SCHEMA as SCHEMA,
+    SORT,
+)
 
 CALLABLE = Callable[..., SCHEMA]
 CALLABLE_LIST = Callable[..., List[SCHEMA]]
+CALLABLE_MANY = Callable[..., Dict[str, List[SCHEMA]]]
+
+MAX_SORTED_INDEXES = 8
 
 
 class MemoryCRUDRouter(CRUDGenerator[SCHEMA]):
@@ -22,6 +36,11 @@ class MemoryCRUDRouter(CRUDGenerator[SCHEMA]):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        aggregate_route: Union[bool, DEPENDENCIES] = False,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        batch_route: Union[bool, DEPENDENCIES] = False,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
         **kwargs: Any
     ) -> None:
         super().__init__(
@@ -37,41 +56,64 @@ class MemoryCRUDRouter(CRUDGenerator[SCHEMA]):
             update_route=update_route,
             delete_one_route=delete_one_route,
             delete_all_route=delete_all_route,
+            get_many_route=get_many_route,
+            aggregate_route=aggregate_route,
+            patch_route=patch_route,
+            batch_route=batch_route,
+            bulk_route=bulk_route,
             **kwargs
         )
 
         self.models: List[SCHEMA] = []
+        self._index: Dict[int, SCHEMA] = {}
+        self._sorted: "OrderedDict[Tuple[Tuple[str, bool], ...], SortedIndex]" = (
+            OrderedDict()
+        )
         self._id = 1
 
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
-        def route(pagination: PAGINATION = self.pagination) -> List[SCHEMA]:
+        def route(
+            pagination: PAGINATION = self.pagination, sort: SORT = self.sort
+        ) -> List[SCHEMA]:
             skip, limit = pagination.get("skip"), pagination.get("limit")
             skip = cast(int, skip)
+            models = self._sorted_models(sort)
 
-            return (
-                self.models[skip:]
-                if limit is None
-                else self.models[skip : skip + limit]
-            )
+            return models[skip:] if limit is None else models[skip : skip + limit]
 
         return route
 
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(item_id: int) -> SCHEMA:
-            for model in self.models:
-                if model.id == item_id:  # type: ignore
-                    return model
+            if item_id in self._index:
+                return self._index[item_id]
 
             raise NOT_FOUND
 
         return route
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> CALLABLE_MANY:
+        def route(item_ids: List[Any] = self.item_ids) -> Dict[str, List[SCHEMA]]:
+            return self._get_many_response(item_ids, self._index)
+
+        return route
+
+    def _aggregate(self, *args: Any, **kwargs: Any) -> Callable[..., List[Any]]:
+        def route(
+            aggregation: AGGREGATION = self.aggregation,
+        ) -> List[Dict[str, Any]]:
+            return _aggregate(self.models, aggregation)
+
+        return route
+
     def _create(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(model: self.create_schema) -> SCHEMA:  # type: ignore
             model_dict = model.dict()
             model_dict["id"] = self._get_next_id()
             ready_model = self.schema(**model_dict)
             self.models.append(ready_model)
+            self._index[ready_model.id] = ready_model  # type: ignore
+            self._reindex(None, ready_model)
             return ready_model
 
         return route
@@ -80,9 +122,63 @@ class MemoryCRUDRouter(CRUDGenerator[SCHEMA]):
         def route(item_id: int, model: self.update_schema) -> SCHEMA:  # type: ignore
             for ind, model_ in enumerate(self.models):
                 if model_.id == item_id:  # type: ignore
+                    self._replacing(model_)
                     self.models[ind] = self.schema(
                         **model.dict(), id=model_.id  # type: ignore
                     )
+                    self._index[item_id] = self.models[ind]
+                    self._reindex(model_, self.models[ind])
+                    return self.models[ind]
+
+            raise NOT_FOUND
+
+        return route
+
+    def _batch(self, *args: Any, **kwargs: Any) -> Callable[..., List[Any]]:
+        def route(batch: self.batch_schema) -> List[Any]:  # type: ignore
+            atomic = batch.mode == "atomic"
+            snapshot = list(self.models), dict(self._index), self._id
+            results = []
+
+            for index, operation in enumerate(batch.operations):
+                try:
+                    data = self._batch_execute(operation)
+                except HTTPException as e:
+                    if atomic:
+                        self.models, self._index, self._id = snapshot
+                        self._sorted.clear()
+                        raise self._batch_error(index, e) from None
+
+                    results.append(
+                        self._batch_result(operation, e.status_code, detail=e.detail)
+                    )
+                else:
+                    results.append(self._batch_result(operation, data=data))
+
+            return results
+
+        return route
+
+    def _batch_execute(self, operation: Any) -> SCHEMA:
+        model = self._batch_data(operation)
+
+        if operation.op == "create":
+            return self._create()(model)
+        elif operation.op == "update":
+            return self._update()(operation.id, model)
+        else:
+            return self._delete_one()(operation.id)
+
+    def _patch(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        def route(item_id: int, model: self.patch_schema) -> SCHEMA:  # type: ignore
+            for ind, model_ in enumerate(self.models):
+                if model_.id == item_id:  # type: ignore
+                    self._replacing(model_)
+                    self.models[ind] = model_.copy(
+                        update=model.dict(exclude_unset=True, exclude={"id"})
+                    )
+                    self._index[item_id] = self.models[ind]
+                    self._reindex(model_, self.models[ind])
                     return self.models[ind]
 
             raise NOT_FOUND
@@ -92,23 +188,199 @@ class MemoryCRUDRouter(CRUDGenerator[SCHEMA]):
     def _delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         def route() -> List[SCHEMA]:
             self.models = []
+            self._index = {}
+            self._sorted.clear()
             return self.models
 
         return route
 
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Dict[str, Any]]:
+        def route(selection: Selection = self.selection) -> Dict[str, Any]:
+            ids = self._select(selection)
+            if selection.dry_run:
+                return self._bulk_result(
+                    ids[: self.bulk_limit], dry_run=True, count=len(ids)
+                )
+
+            self._check_bulk_limit(len(ids))
+            selected = set(ids)
+            self.models = [
+                m for m in self.models if m.id not in selected  # type: ignore
+            ]
+            for id_ in ids:
+                del self._index[id_]
+            self._sorted.clear()
+
+            return self._bulk_result(ids)
+
+        return route
+
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Dict[str, Any]]:
+        def route(
+            model: self.patch_schema,  # type: ignore
+            selection: Selection = self.selection,
+        ) -> Dict[str, Any]:
+            values = self._bulk_values(model)
+            ids = self._select(selection)
+            if selection.dry_run:
+                return self._bulk_result(
+                    ids[: self.bulk_limit], dry_run=True, count=len(ids)
+                )
+
+            self._check_bulk_limit(len(ids))
+            selected = set(ids)
+            for ind, model_ in enumerate(self.models):
+                if model_.id in selected:  # type: ignore
+                    self.models[ind] = model_.copy(update=values)
+                    self._index[model_.id] = self.models[ind]  # type: ignore
+            self._sorted.clear()
+
+            return self._bulk_result(ids)
+
+        return route
+
+    def _select(self, selection: Selection) -> List[Any]:
+        return [m.id for m in self.models if selection.matches(m)]  # type: ignore
+
     def _delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(item_id: int) -> SCHEMA:
             for ind, model in enumerate(self.models):
                 if model.id == item_id:  # type: ignore
                     del self.models[ind]
+                    del self._index[item_id]
+                    self._reindex(model, None)
                     return model
 
             raise NOT_FOUND
 
         return route
 
+    def _sorted_models(self, sort: SORT) -> List[SCHEMA]:
+        """
+        The models in the given order. Ids only grow, so the models are kept in
+        primary key order. Other orders are sorted once and then kept sorted
+        by the writes, for the ``MAX_SORTED_INDEXES`` most recently read.
+        """
+        key = tuple(sort)
+        if key == ((self._pk, False),):
+            return self.models
+
+        index = self._sorted.get(key)
+        if index is None:
+            index = self._sorted[key] = SortedIndex(sort, self.models)
+            if len(self._sorted) > MAX_SORTED_INDEXES:
+                self._sorted.popitem(last=False)
+        else:
+            self._sorted.move_to_end(key)
+
+        return index.models
+
+    def _reindex(self, old: Optional[SCHEMA], new: Optional[SCHEMA]) -> None:
+        """Moves a written model within the sorted indexes"""
+        for index in self._sorted.values():
+            if old is not None:
+                index.remove(old)
+            if new is not None:
+                index.add(new)
+
     def _get_next_id(self) -> int:
         id_ = self._id
         self._id += 1
 
         return id_
+
+
+def _sort_key(value: Any) -> Tuple[bool, Any]:
+    """Sorts None first, as SQL databases do in ascending order"""
+    return value is not None, value
+
+
+class _Descending:
+    """Reverses the order of a sort key"""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key: Any) -> None:
+        self.key = key
+
+    def __eq__(self, other: Any) -> bool:
+        return bool(self.key == other.key)
+
+    def __lt__(self, other: Any) -> bool:
+        return bool(other.key < self.key)
+
+
+class SortedIndex:
+    """
+    Models kept in the order of ``sort`` as they are written. The primary key
+    ends every sort, so each model has a distinct key and is found by bisection.
+    """
+
+    def __init__(self, sort: SORT, models: List[Any]) -> None:
+        self._sort = list(sort)
+        self.models = sorted(models, key=self._key)
+        self._keys = [self._key(model) for model in self.models]
+
+    def _key(self, model: Any) -> Tuple[Any, ...]:
+        return tuple(
+            _Descending(_sort_key(getattr(model, field)))
+            if descending
+            else _sort_key(getattr(model, field))
+            for field, descending in self._sort
+        )
+
+    def add(self, model: Any) -> None:
+        key = self._key(model)
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self.models.insert(position, model)
+
+    def remove(self, model: Any) -> None:
+        position = bisect_left(self._keys, self._key(model))
+        del self._keys[position], self.models[position]
+
+
+def _aggregate(models: List[SCHEMA], aggregation: AGGREGATION) -> List[Dict[str, Any]]:
+    """
+    Computes every metric of every group in a single pass over the models,
+    ignoring None values as SQL aggregates do
+    """
+    group_by, metrics = aggregation
+    groups: Dict[Tuple[Any, ...], List[Any]] = {}
+
+    for model in models:
+        key = tuple(getattr(model, field) for field in group_by)
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [[0, None] for _ in metrics]
+
+        for state, (_, aggregate, field) in zip(states, metrics):
+            value = 1 if field is None else getattr(model, field)
+            if value is None:
+                continue
+
+            state[0] += 1
+            if aggregate in ("sum", "avg"):
+                state[1] = value if state[1] is None else state[1] + value
+            elif aggregate == "min" and (state[1] is None or value < state[1]):
+                state[1] = value
+            elif aggregate == "max" and (state[1] is None or value > state[1]):
+                state[1] = value
+
+    if not group_by and not groups:
+        groups[()] = [[0, None] for _ in metrics]
+
+    rows = []
+    for key in sorted(groups, key=lambda k: tuple(_sort_key(v) for v in k)):
+        row = dict(zip(group_by, key))
+        for (label, aggregate, _), (count, value) in zip(metrics, groups[key]):
+            if aggregate == "count":
+                row[label] = count
+            elif aggregate == "avg":
+                row[label] = value / count if count else None
+            else:
+                row[label] = value
+
+        rows.append(row)
+
+    return rows
@@ -1,6 +1,7 @@
 from typing import (
     Any,
     Callable,
+    Dict,
     List,
     Optional,
     Type,
@@ -12,7 +13,9 @@ from typing import (
 from fastapi import HTTPException
 
 from . import CRUDGenerator, NOT_FOUND, _utils
-from ._types import DEPENDENCIES, PAGINATION
+from ._loader import loader_factory
+from ._utils import Selection
+from ._types import DEPENDENCIES, PAGINATION, SORT
 
 try:
     from ormar import Model, NoMatch
@@ -25,6 +28,7 @@ else:
 
 CALLABLE = Callable[..., Coroutine[Any, Any, Model]]
 CALLABLE_LIST = Callable[..., Coroutine[Any, Any, List[Optional[Model]]]]
+CALLABLE_MANY = Callable[..., Coroutine[Any, Any, Dict[str, List[Model]]]]
 
 
 class OrmarCRUDRouter(CRUDGenerator[Model]):
@@ -42,12 +46,18 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
+        batch_get_one: Union[bool, float] = False,
         **kwargs: Any
     ) -> None:
         assert ormar_installed, "Ormar must be installed to use the OrmarCRUDRouter."
 
         self._pk: str = schema.Meta.pkname
+        self._table_name = schema.Meta.tablename
         self._pk_type: type = _utils.get_pk_type(schema, self._pk)
+        self._loader = loader_factory(self._load_many, batch_get_one)
 
         super().__init__(
             schema=schema,
@@ -62,6 +72,9 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
             update_route=update_route,
             delete_one_route=delete_one_route,
             delete_all_route=delete_all_route,
+            get_many_route=get_many_route,
+            patch_route=patch_route,
+            bulk_route=bulk_route,
             **kwargs
         )
 
@@ -70,9 +83,13 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         async def route(
             pagination: PAGINATION = self.pagination,
+            sort: SORT = self.sort,
         ) -> List[Optional[Model]]:
             skip, limit = pagination.get("skip"), pagination.get("limit")
-            query = self.schema.objects.offset(cast(int, skip))
+            self._record_query(sort=[field for field, _ in sort])
+
+            query = self.schema.objects.order_by(_utils.sort_strings(sort))
+            query = query.offset(cast(int, skip))
             if limit:
                 query = query.limit(limit)
             return await query.all()  # type: ignore
@@ -81,6 +98,13 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
 
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(item_id: self._pk_type) -> Model:  # type: ignore
+            if self._loader:
+                model = await self._loader.load(item_id)
+                if model is None:
+                    raise NOT_FOUND
+
+                return model
+
             try:
                 filter_ = {self._pk: item_id}
                 model = await self.schema.objects.filter(
@@ -92,6 +116,15 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
 
         return route
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> CALLABLE_MANY:
+        async def route(
+            item_ids: List[Any] = self.item_ids,
+        ) -> Dict[str, List[Model]]:
+            models = await self._load_many(item_ids)
+            return self._get_many_response(item_ids, models)
+
+        return route
+
     def _create(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(model: self.create_schema) -> Model:  # type: ignore
             model_dict = model.dict()
@@ -120,13 +153,94 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
 
         return route
 
+    def _patch(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        async def route(
+            item_id: self._pk_type,  # type: ignore
+            model: self.patch_schema,  # type: ignore
+        ) -> Model:
+            filter_ = {self._pk: item_id}
+            values = model.dict(exclude_unset=True, exclude={self._pk})
+            if values:
+                try:
+                    updated = await self.schema.objects.filter(
+                        _exclude=False, **filter_
+                    ).update(**values)
+                except self._INTEGRITY_ERROR as e:
+                    self._raise(e)
+
+                if not updated:
+                    raise NOT_FOUND
+
+            return await self._get_one()(item_id)
+
+        return route
+
     def _delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         async def route() -> List[Optional[Model]]:
             await self.schema.objects.delete(each=True)
-            return await self._get_all()(pagination={"skip": 0, "limit": None})
+            return []
 
         return route
 
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(selection: Selection = self.selection) -> Dict[str, Any]:
+            if selection.dry_run:
+                return await self._dry_run(selection)
+
+            async with self.schema.Meta.database.transaction():
+                ids = await self._select(selection)
+                self._check_bulk_limit(len(ids))
+                if ids:
+                    await self._selected(ids).delete()
+
+            return self._bulk_result(ids)
+
+        return route
+
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(
+            model: self.patch_schema,  # type: ignore
+            selection: Selection = self.selection,
+        ) -> Dict[str, Any]:
+            values = self._bulk_values(model)
+            if selection.dry_run:
+                return await self._dry_run(selection)
+
+            async with self.schema.Meta.database.transaction():
+                ids = await self._select(selection)
+                self._check_bulk_limit(len(ids))
+                if ids:
+                    await self._selected(ids).update(**values)
+
+            return self._bulk_result(ids)
+
+        return route
+
+    def _selection(self, selection: Selection) -> Any:
+        query = self.schema.objects.filter(**selection.filters)
+        if selection.ids is not None:
+            query = query.filter(**{f"{self._pk}__in": selection.ids})
+
+        return query.order_by(self._pk)
+
+    async def _select(self, selection: Selection) -> List[Any]:
+        # Ormar has no RETURNING, so the ids are selected first and the write
+        # applies to them, in the transaction of the caller
+        query = self._selection(selection)
+        return list(await query.values_list(self._pk, flatten=True))
+
+    async def _dry_run(self, selection: Selection) -> Dict[str, Any]:
+        query = self._selection(selection)
+        count = await query.count()
+        if self.bulk_limit is not None:
+            query = query.limit(self.bulk_limit)
+
+        ids = list(await query.values_list(self._pk, flatten=True))
+        return self._bulk_result(ids, dry_run=True, count=count)
+
+    def _selected(self, ids: List[Any]) -> Any:
+        return self.schema.objects.filter(**{f"{self._pk}__in": ids})
+
     def _delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(item_id: self._pk_type) -> Model:  # type: ignore
             model = await self._get_one()(item_id)
@@ -135,6 +249,15 @@ class OrmarCRUDRouter(CRUDGenerator[Model]):
 
         return route
 
+    async def _load_ids(self, params: Dict[str, Any]) -> Optional[List[Any]]:
+        return list(await self.schema.objects.values_list(self._pk, flatten=True))
+
+    async def _load_many(self, item_ids: List[Any]) -> Dict[Any, Model]:
+        filter_ = {f"{self._pk}__in": item_ids}
+        models = await self.schema.objects.filter(_exclude=False, **filter_).all()
+
+        return {getattr(model, self._pk): model for model in models}
+
     def _get_integrity_error_type(self) -> Type[Exception]:
         """Imports the Integrity exception based on the used backend"""
         backend = self.schema.db_backend_name()
@@ -1,17 +1,63 @@
-from typing import Any, Callable, List, Type, Generator, Optional, Union
+import threading
+from contextlib import contextmanager
+from types import GeneratorType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Type,
+    Generator,
+    Optional,
+    Sequence,
+    Union,
+)
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 
-from . import CRUDGenerator, NOT_FOUND, _utils
-from ._types import DEPENDENCIES, PAGINATION, PYDANTIC_SCHEMA as SCHEMA
+from . import CRUDGenerator, NOT_FOUND, PRECONDITION_FAILED, _utils
+from ._cache import TableGeneration
+from ._hooks import CALL_NEXT, RouteContext
+from ._querylog import SlowQueryLog, instrument_engine
+from ._search import FullTextIndex
+from ._sync import ChangeTracker, complete_page
+from ._sql import (
+    aggregate_statement,
+    chunk_end_statement,
+    delete_range_statement,
+    selection_clauses,
+    upsert_rows,
+    upsert_statement,
+)
+from ._stats import (
+    CHANGES,
+    increment_stats,
+    load_stats,
+    replaced_rows,
+    save_stats,
+)
+from ._utils import AttrDict, SearchQuery, Selection
+from ._types import (
+    AGGREGATION,
+    DEPENDENCIES,
+    PAGINATION,
+    PYDANTIC_SCHEMA as SCHEMA,
+    SORT,
+)
 
 try:
+    from sqlalchemy import delete, event, func, inspect, select, update
     from sqlalchemy.orm import Session
+    from sqlalchemy.orm import Session as ORMSession, sessionmaker
     from sqlalchemy.ext.declarative import DeclarativeMeta as Model
     from sqlalchemy.exc import IntegrityError
 except ImportError:
     Model = None
     Session = None
+    ORMSession = None
+    sessionmaker = None
     IntegrityError = None
     sqlalchemy_installed = False
 else:
@@ -20,6 +66,7 @@ else:
 
 CALLABLE = Callable[..., Model]
 CALLABLE_LIST = Callable[..., List[Model]]
+CALLABLE_MANY = Callable[..., Dict[str, List[Model]]]
 
 
 class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
@@ -39,16 +86,56 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        aggregate_route: Union[bool, DEPENDENCIES] = False,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        batch_route: Union[bool, DEPENDENCIES] = False,
+        upsert_route: Union[bool, DEPENDENCIES] = False,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
+        track_flushes: Union[bool, "sessionmaker"] = False,
+        version_column: Optional[str] = None,
+        slow_query_threshold: Optional[float] = None,
+        search_fields: Optional[List[str]] = None,
+        change_tracking: bool = False,
+        delete_all_chunk_size: Optional[int] = None,
         **kwargs: Any
     ) -> None:
         assert (
             sqlalchemy_installed
         ), "SQLAlchemy must be installed to use the SQLAlchemyCRUDRouter."
+        if bulk_route and delete_all_chunk_size:
+            # The bulk delete takes over DELETE on the collection, so the
+            # chunked delete_all would never run
+            raise ValueError(
+                "delete_all_chunk_size has no effect with bulk_route, whose "
+                "DELETE on the collection is capped by bulk_limit instead"
+            )
 
         self.db_model = db_model
         self.db_func = db
+        self.delete_all_chunk_size = delete_all_chunk_size
         self._pk: str = db_model.__table__.primary_key.columns.keys()[0]
         self._pk_type: type = _utils.get_pk_type(schema, self._pk)
+        self._table_name: str = db_model.__tablename__
+        version_col = inspect(db_model).version_id_col
+        self._version_col = version_column or (
+            version_col.key if version_col is not None else None
+        )
+        if slow_query_threshold is not None:
+            self.slow_query_log = SlowQueryLog(slow_query_threshold)
+            self._add_route_hook(self._instrument_session, self.get_routes())
+
+        self.search_index = (
+            FullTextIndex(db_model.__table__, self._pk, search_fields)
+            if search_fields
+            else None
+        )
+        self.search = _utils.search_factory(enabled=self.search_index is not None)
+        if change_tracking:
+            self.change_tracker = ChangeTracker(db_model.__table__, self._pk)
+        self._tracked_session: Optional[type] = None
+        if track_flushes is True:
+            self._add_route_hook(self._track_session, self.get_routes())
 
         super().__init__(
             schema=schema,
@@ -63,19 +150,39 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
             update_route=update_route,
             delete_one_route=delete_one_route,
             delete_all_route=delete_all_route,
+            get_many_route=get_many_route,
+            aggregate_route=aggregate_route,
+            patch_route=patch_route,
+            batch_route=batch_route,
+            upsert_route=upsert_route,
+            bulk_route=bulk_route,
             **kwargs
         )
 
+        if isinstance(track_flushes, sessionmaker):
+            track_session_writes(track_flushes.class_, db_model, self._generation)
+
+        if self.search_index is not None:
+            self.add_event_handler("startup", self._install_search_index)
+        if self.change_tracker is not None:
+            self.add_event_handler("startup", self._install_change_tracker)
+
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         def route(
             db: Session = Depends(self.db_func),
             pagination: PAGINATION = self.pagination,
+            sort: SORT = self.sort,
+            search: Optional[SearchQuery] = self.search,
         ) -> List[Model]:
             skip, limit = pagination.get("skip"), pagination.get("limit")
+            if search is not None:
+                return self._search(db, search, skip, limit)
+
+            self._record_query(sort=[field for field, _ in sort])
 
             db_models: List[Model] = (
                 db.query(self.db_model)
-                .order_by(getattr(self.db_model, self._pk))
+                .order_by(*self._order_by(sort))
                 .limit(limit)
                 .offset(skip)
                 .all()
@@ -84,6 +191,59 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _search(
+        self,
+        db: Session,
+        search: SearchQuery,
+        skip: Optional[int],
+        limit: Optional[int],
+    ) -> List[Model]:
+        """
+        Lists the rows matching a search, best ranked first. Following pages
+        start after the cursor set in the X-Next-Cursor header.
+        """
+        bind = db.get_bind()
+        self.search_index.check(bind.dialect.name)  # type: ignore
+        stmt = self.search_index.statement(  # type: ignore
+            bind.dialect.name, search, self.db_model
+        )
+
+        rows = db.execute(stmt.limit(limit).offset(skip)).all()
+        if limit is not None and len(rows) == limit:
+            last, rank = rows[-1]
+            search.next_page(rank, getattr(last, self._pk))
+
+        return [model for model, _ in rows]
+
+    def _install_search_index(self) -> None:
+        with self._session() as db:
+            self.search_index.install(db.get_bind())  # type: ignore
+
+    def _install_change_tracker(self) -> None:
+        with self._session() as db:
+            self.change_tracker.install(db.get_bind())  # type: ignore
+
+    @contextmanager
+    def _session(self) -> Iterator["ORMSession"]:
+        """A session from ``db_func`` outside of any request, for startup tasks"""
+        sessions = self.db_func()
+        if not isinstance(sessions, GeneratorType):
+            yield sessions
+            return
+
+        try:
+            yield next(sessions)
+        finally:
+            sessions.close()
+
+    def rebuild_search_index(self, bind: Any) -> None:
+        """
+        Rebuilds the full-text index from the rows of the table, for rows
+        written around the triggers maintaining it
+        """
+        assert self.search_index is not None, "The router has no search_fields"
+        self.search_index.rebuild(bind)
+
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(
             item_id: self._pk_type, db: Session = Depends(self.db_func)  # type: ignore
@@ -97,6 +257,15 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> CALLABLE_MANY:
+        def route(
+            item_ids: List[Any] = self.item_ids,
+            db: Session = Depends(self.db_func),
+        ) -> Dict[str, List[Model]]:
+            return self._get_many_response(item_ids, self._load_many(db, item_ids))
+
+        return route
+
     def _create(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(
             model: self.create_schema,  # type: ignore
@@ -114,14 +283,44 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _upsert(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
+        def route(
+            models: List[SCHEMA] = self.upsert_body,
+            db: Session = Depends(self.db_func),
+        ) -> List[Model]:
+            table = self.db_model.__table__
+            rows = upsert_rows(models, table, self._pk)
+            stmt = upsert_statement(table, db.get_bind().dialect.name, self._pk, rows)
+
+            try:
+                upserted = {
+                    row[self._pk]: AttrDict(row)
+                    for row in db.execute(stmt).mappings()
+                }
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                self._raise(e)
+
+            item_ids = [row[self._pk] for row in rows]
+            return [upserted[id_] for id_ in item_ids if id_ in upserted]
+
+        return route
+
     def _update(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(
             item_id: self._pk_type,  # type: ignore
             model: self.update_schema,  # type: ignore
             db: Session = Depends(self.db_func),
+            expected_version: Optional[int] = self.if_match,
         ) -> Model:
+            if self._version_col:
+                values = model.dict(exclude={self._pk})
+                return self._update_values(db, item_id, values, expected_version)
+
             try:
                 db_model: Model = self._get_one()(item_id, db)
+                self._replacing(db_model)
 
                 for key, value in model.dict(exclude={self._pk}).items():
                     if hasattr(db_model, key):
@@ -137,23 +336,448 @@ class SQLAlchemyCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _aggregate(self, *args: Any, **kwargs: Any) -> Callable[..., List[Any]]:
+        def route(
+            aggregation: AGGREGATION = self.aggregation,
+            db: Session = Depends(self.db_func),
+        ) -> List[Dict[str, Any]]:
+            self._record_query(sort=aggregation[0])
+            stmt = aggregate_statement(
+                self.db_model, lambda name: getattr(self.db_model, name), aggregation
+            )
+
+            return [dict(row) for row in db.execute(stmt).mappings()]
+
+        return route
+
+    def _sync(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        def route(
+            since: int = Query(0, ge=0, description="The seq of the last sync"),
+            limit: int = Query(500, gt=0, le=10_000),
+            db: Session = Depends(self.db_func),
+        ) -> Dict[str, Any]:
+            tracker: ChangeTracker = self.change_tracker  # type: ignore
+            dialect = db.get_bind().dialect.name
+            tracker.check(dialect)
+            changes, more = complete_page(
+                db.execute(tracker.statement(dialect, since, limit + 1)).all(),
+                limit,
+                lambda position: db.execute(
+                    tracker.statement(dialect, since, through=position)
+                ).all(),
+            )
+
+            ids = [self._pk_type(change.row_id) for change in changes]
+            live = [id_ for id_, change in zip(ids, changes) if not change.deleted]
+            rows = self._load_many(db, live)
+
+            return {
+                "changes": [
+                    {
+                        "seq": change.position,
+                        "id": id_,
+                        "deleted": change.deleted,
+                        "data": rows.get(id_),
+                    }
+                    for id_, change in zip(ids, changes)
+                ],
+                "seq": changes[-1].position if changes else since,
+                "more": more,
+            }
+
+        return route
+
+    def _stats(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(db: Session = Depends(self.db_func)) -> Dict[str, Any]:
+            return await self._read_stats({"db": db})
+
+        return route
+
+    async def _load_stats(self, params: Dict[str, Any]) -> None:
+        bind = params["db"].get_bind()
+        rows = await run_in_threadpool(load_stats, bind, self._table_name)
+        self.stats.load_rows(rows)  # type: ignore
+
+    async def _save_stats(
+        self, params: Dict[str, Any], fields: Optional[Sequence[str]]
+    ) -> None:
+        bind = params["db"].get_bind()
+        await run_in_threadpool(
+            save_stats, bind, self._table_name, self.stats, fields
+        )
+
+    async def _apply_stats(
+        self, params: Dict[str, Any], changes: Optional[CHANGES]
+    ) -> None:
+        bind = params["db"].get_bind()
+        await run_in_threadpool(
+            increment_stats, bind, self._table_name, self.stats, changes
+        )
+
+    async def _load_ids(self, params: Dict[str, Any]) -> Optional[List[Any]]:
+        query = select(getattr(self.db_model, self._pk))
+
+        def load() -> List[Any]:
+            if "db" in params:
+                return params["db"].execute(query).scalars().all()
+
+            with self._session() as db:
+                return db.execute(query).scalars().all()
+
+        return await run_in_threadpool(load)
+
+    def _batch(self, *args: Any, **kwargs: Any) -> Callable[..., List[Any]]:
+        def route(
+            batch: self.batch_schema,  # type: ignore
+            db: Session = Depends(self.db_func),
+        ) -> List[Any]:
+            atomic = batch.mode == "atomic"
+            results = []
+
+            for index, operation in enumerate(batch.operations):
+                try:
+                    if atomic:
+                        data = self._batch_execute(db, operation)
+                    else:
+                        with db.begin_nested():
+                            data = self._batch_execute(db, operation)
+                except (HTTPException, IntegrityError) as e:
+                    if isinstance(e, IntegrityError):
+                        e = HTTPException(422, "Key already exists")
+
+                    if atomic:
+                        db.rollback()
+                        raise self._batch_error(index, e) from None
+
+                    results.append(
+                        self._batch_result(operation, e.status_code, detail=e.detail)
+                    )
+                else:
+                    results.append(self._batch_result(operation, data=data))
+
+            db.commit()
+            return results
+
+        return route
+
+    def _batch_execute(self, db: Session, operation: Any) -> AttrDict:
+        model = self._batch_data(operation)
+
+        if operation.op == "create":
+            db_model: Model = self.db_model(**model.dict())  # type: ignore
+            db.add(db_model)
+        else:
+            db_model = db.get(self.db_model, operation.id)
+            if db_model is None:
+                raise NOT_FOUND
+
+            if operation.op == "update":
+                values = model.dict(exclude={self._pk})  # type: ignore
+                if self._version_col:
+                    self._bump_version(db_model, values.pop(self._version_col, None))
+
+                for key, value in values.items():
+                    if hasattr(db_model, key):
+                        setattr(db_model, key, value)
+            else:
+                data = self._snapshot(db_model)
+                db.delete(db_model)
+                db.flush()
+                return data
+
+        db.flush()
+        return self._snapshot(db_model)
+
+    def _bump_version(self, db_model: Model, expected_version: Optional[int]) -> None:
+        version = getattr(db_model, self._version_col)  # type: ignore
+        if expected_version is not None and version != expected_version:
+            raise PRECONDITION_FAILED
+
+        if inspect(self.db_model).version_id_col is None:
+            setattr(db_model, self._version_col, version + 1)  # type: ignore
+
+    def _snapshot(self, db_model: Model) -> AttrDict:
+        # Column values are copied before the commit expires the instance, so
+        # returning them does not trigger a refresh per operation
+        return AttrDict(
+            {
+                attr.key: getattr(db_model, attr.key)
+                for attr in inspect(self.db_model).column_attrs
+            }
+        )
+
+    def _patch(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        def route(
+            item_id: self._pk_type,  # type: ignore
+            model: self.patch_schema,  # type: ignore
+            db: Session = Depends(self.db_func),
+            expected_version: Optional[int] = self.if_match,
+        ) -> Model:
+            values = model.dict(exclude_unset=True, exclude={self._pk})
+            if not values:
+                db_model = self._get_one()(item_id, db)
+                self._replacing(db_model)
+                return db_model
+
+            return self._update_values(db, item_id, values, expected_version)
+
+        return route
+
+    def _update_values(
+        self,
+        db: Session,
+        item_id: Any,
+        values: Dict[str, Any],
+        expected_version: Optional[int] = None,
+    ) -> Model:
+        """
+        Updates the given columns of a row with a single UPDATE ... RETURNING
+        statement. With a version column the statement also requires the
+        expected version, taken from If-Match or else the body, and bumps it.
+        """
+        table = self.db_model.__table__
+        stmt = update(table).where(table.c[self._pk] == item_id)
+        values = {k: v for k, v in values.items() if k in table.c and k != self._pk}
+
+        if self._version_col:
+            version = table.c[self._version_col]
+            if expected_version is None:
+                expected_version = values.get(self._version_col)
+            if expected_version is not None:
+                stmt = stmt.where(version == expected_version)
+
+            values[self._version_col] = version + 1
+
+        stmt = stmt.values(**values)
+        returning = db.get_bind().dialect.update_returning
+
+        try:
+            if replaced_rows.get() is not None:
+                # The overwritten values are read in the transaction of the
+                # update, with the row locked where the database can
+                old = db.execute(
+                    select(table).where(table.c[self._pk] == item_id).with_for_update()
+                ).first()
+                if old is not None:
+                    self._replacing(old)
+
+            if returning:
+                row = db.execute(stmt.returning(*table.columns)).mappings().first()
+                found = row is not None
+            else:
+                found = db.execute(stmt).rowcount > 0
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            self._raise(e)
+
+        if not found:
+            self._raise_missing(db, item_id, expected_version)
+
+        return AttrDict(row) if returning else self._get_one()(item_id, db)
+
+    def _raise_missing(
+        self, db: Session, item_id: Any, expected_version: Optional[int]
+    ) -> None:
+        if expected_version is not None and db.get(self.db_model, item_id):
+            raise PRECONDITION_FAILED
+
+        raise NOT_FOUND
+
     def _delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         def route(db: Session = Depends(self.db_func)) -> List[Model]:
-            db.query(self.db_model).delete()
-            db.commit()
+            if self.delete_all_chunk_size:
+                self._delete_chunks(db, self.delete_all_chunk_size)
+            else:
+                db.query(self.db_model).delete()
+                db.commit()
+
+            return []
+
+        return route
 
-            return self._get_all()(db=db, pagination={"skip": 0, "limit": None})
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Dict[str, Any]]:
+        def route(
+            selection: Selection = self.selection,
+            db: Session = Depends(self.db_func),
+        ) -> Dict[str, Any]:
+            table = self.db_model.__table__
+            return self._bulk_write(db, selection, delete(table))
 
         return route
 
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Dict[str, Any]]:
+        def route(
+            model: self.patch_schema,  # type: ignore
+            selection: Selection = self.selection,
+            db: Session = Depends(self.db_func),
+        ) -> Dict[str, Any]:
+            table = self.db_model.__table__
+            values: Dict[str, Any] = self._bulk_values(model)
+            if self._version_col:
+                values[self._version_col] = table.c[self._version_col] + 1
+
+            return self._bulk_write(db, selection, update(table).values(values))
+
+        return route
+
+    def _bulk_write(
+        self, db: Session, selection: Selection, stmt: Any
+    ) -> Dict[str, Any]:
+        """
+        Runs a bulk DELETE or UPDATE as a single statement returning the
+        affected ids, rolled back when it affects more rows than allowed
+        """
+        table = self.db_model.__table__
+        pk = table.c[self._pk]
+        where = selection_clauses(table, selection)
+
+        if selection.dry_run:
+            count = db.execute(
+                select(func.count()).select_from(table).where(*where)
+            ).scalar()
+            ids = db.execute(
+                select(pk).where(*where).order_by(pk).limit(self.bulk_limit)
+            ).scalars()
+            return self._bulk_result(list(ids), dry_run=True, count=count)
+
+        try:
+            if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+                ids = list(db.execute(stmt.where(*where).returning(pk)).scalars())
+            else:
+                ids = list(db.execute(select(pk).where(*where)).scalars())
+                self._check_bulk_limit(len(ids))
+                db.execute(stmt.where(pk.in_(ids)))
+
+            self._check_bulk_limit(len(ids))
+        except (HTTPException, IntegrityError) as e:
+            db.rollback()
+            if isinstance(e, IntegrityError):
+                self._raise(e)
+            raise
+
+        db.commit()
+        return self._bulk_result(ids)
+
+    def _delete_chunks(self, db: Session, size: int) -> None:
+        """
+        Deletes the rows in primary key ranges of ``size`` rows, committing
+        after each so that other writers are only blocked for one chunk
+        """
+        table = self.db_model.__table__
+        after = None
+        while True:
+            end = db.execute(chunk_end_statement(table, self._pk, after, size)).scalar()
+            db.execute(delete_range_statement(table, self._pk, after, end))
+            db.commit()
+
+            if end is None:
+                break
+
+            after = end
+
     def _delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         def route(
-            item_id: self._pk_type, db: Session = Depends(self.db_func)  # type: ignore
+            item_id: self._pk_type,  # type: ignore
+            db: Session = Depends(self.db_func),
+            expected_version: Optional[int] = self.if_match,
         ) -> Model:
             db_model: Model = self._get_one()(item_id, db)
+
+            if self._version_col and expected_version is not None:
+                table = self.db_model.__table__
+                stmt = delete(table).where(
+                    table.c[self._pk] == item_id,
+                    table.c[self._version_col] == expected_version,
+                )
+                data = self._snapshot(db_model)
+                if not db.execute(stmt).rowcount:
+                    db.rollback()
+                    raise PRECONDITION_FAILED
+
+                db.commit()
+                return data
+
             db.delete(db_model)
             db.commit()
 
             return db_model
 
         return route
+
+    def _order_by(self, sort: SORT) -> List[Any]:
+        columns = [(getattr(self.db_model, field), desc) for field, desc in sort]
+        return [column.desc() if desc else column.asc() for column, desc in columns]
+
+    def _load_many(self, db: Session, item_ids: List[Any]) -> Dict[Any, Model]:
+        pk = getattr(self.db_model, self._pk)
+        models: List[Model] = db.query(self.db_model).filter(pk.in_(item_ids)).all()
+
+        return {getattr(model, self._pk): model for model in models}
+
+    async def _track_session(self, ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        """
+        Route hook tracking the writes of every session of the class the
+        router is given, which is the class of the application's sessionmaker
+        """
+        db = ctx.params.get("db")
+        if db is not None and type(db) is not self._tracked_session:
+            self._tracked_session = type(db)
+            track_session_writes(type(db), self.db_model, self._generation)
+
+        return await call_next()
+
+    async def _instrument_session(self, ctx: RouteContext, call_next: CALL_NEXT) -> Any:
+        """Route hook timing the statements of the engine of the router's session"""
+        db = ctx.params.get("db")
+        if db is not None:
+            instrument_engine(db.get_bind(self.db_model).engine)
+
+        return await call_next()
+
+
+_tracked_models: Dict[type, Dict[Any, TableGeneration]] = {}
+_tracked_models_lock = threading.Lock()
+
+
+def track_session_writes(
+    session_cls: type, db_model: Model, generation: TableGeneration
+) -> None:
+    """
+    Bumps ``generation`` whenever a session of ``session_cls`` commits
+    changes to ``db_model``, so that writes made outside the router are
+    caught too. The listeners are registered once per session class, such as
+    the class of a sessionmaker, and shared by the models tracked on it.
+    """
+    with _tracked_models_lock:
+        models = _tracked_models.get(session_cls)
+        if models is None:
+            models = _tracked_models[session_cls] = {}
+            _listen_for_writes(session_cls, models)
+
+        models[db_model] = generation
+
+
+def _listen_for_writes(session_cls: type, models: Dict[Any, TableGeneration]) -> None:
+    def after_flush(session: "ORMSession", flush_context: Any) -> None:
+        # Writes count against the generation only once committed, so that no
+        # reader sees a newer generation than the data it read
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            for db_model, generation in list(models.items()):
+                if isinstance(obj, db_model):
+                    written = session.info.setdefault("crouton_written", set())
+                    written.add(generation)
+
+    def after_commit(session: "ORMSession") -> None:
+        for generation in session.info.pop("crouton_written", ()):
+            generation.bump()
+
+    def after_rollback(session: "ORMSession", previous_transaction: Any) -> None:
+        # A savepoint rolling back leaves the writes of its enclosing
+        # transaction to be committed
+        if previous_transaction.parent is None:
+            session.info.pop("crouton_written", None)
+
+    event.listen(session_cls, "after_flush", after_flush)
+    event.listen(session_cls, "after_commit", after_commit)
+    event.listen(session_cls, "after_soft_rollback", after_rollback)
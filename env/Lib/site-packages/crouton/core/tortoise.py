@@ -1,10 +1,23 @@
-from typing import Any, Callable, List, Type, cast, Coroutine, Optional, Union
-
-from . import CRUDGenerator, NOT_FOUND
-from ._types import DEPENDENCIES, PAGINATION, PYDANTIC_SCHEMA as SCHEMA
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Type,
+    cast,
+    Coroutine,
+    Optional,
+    Union,
+)
+
+from . import CRUDGenerator, NOT_FOUND, _utils
+from ._loader import loader_factory
+from ._utils import Selection
+from ._types import DEPENDENCIES, PAGINATION, PYDANTIC_SCHEMA as SCHEMA, SORT
 
 try:
     from tortoise.models import Model
+    from tortoise.transactions import in_transaction
 except ImportError:
     Model = None  # type: ignore
     tortoise_installed = False
@@ -14,6 +27,7 @@ else:
 
 CALLABLE = Callable[..., Coroutine[Any, Any, Model]]
 CALLABLE_LIST = Callable[..., Coroutine[Any, Any, List[Model]]]
+CALLABLE_MANY = Callable[..., Coroutine[Any, Any, Dict[str, List[Model]]]]
 
 
 class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
@@ -32,6 +46,10 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
         update_route: Union[bool, DEPENDENCIES] = True,
         delete_one_route: Union[bool, DEPENDENCIES] = True,
         delete_all_route: Union[bool, DEPENDENCIES] = True,
+        get_many_route: Union[bool, DEPENDENCIES] = False,
+        patch_route: Union[bool, DEPENDENCIES] = False,
+        bulk_route: Union[bool, DEPENDENCIES] = False,
+        batch_get_one: Union[bool, float] = False,
         **kwargs: Any
     ) -> None:
         assert (
@@ -40,6 +58,8 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
 
         self.db_model = db_model
         self._pk: str = db_model.describe()["pk_field"]["db_column"]
+        self._table_name = db_model._meta.db_table
+        self._loader = loader_factory(self._load_many, batch_get_one)
 
         super().__init__(
             schema=schema,
@@ -54,13 +74,21 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
             update_route=update_route,
             delete_one_route=delete_one_route,
             delete_all_route=delete_all_route,
+            get_many_route=get_many_route,
+            patch_route=patch_route,
+            bulk_route=bulk_route,
             **kwargs
         )
 
     def _get_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
-        async def route(pagination: PAGINATION = self.pagination) -> List[Model]:
+        async def route(
+            pagination: PAGINATION = self.pagination, sort: SORT = self.sort
+        ) -> List[Model]:
             skip, limit = pagination.get("skip"), pagination.get("limit")
-            query = self.db_model.all().offset(cast(int, skip))
+            self._record_query(sort=[field for field, _ in sort])
+
+            query = self.db_model.all().order_by(*_utils.sort_strings(sort))
+            query = query.offset(cast(int, skip))
             if limit:
                 query = query.limit(limit)
             return await query
@@ -69,7 +97,10 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
 
     def _get_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(item_id: int) -> Model:
-            model = await self.db_model.filter(id=item_id).first()
+            if self._loader:
+                model = await self._loader.load(item_id)
+            else:
+                model = await self.db_model.filter(id=item_id).first()
 
             if model:
                 return model
@@ -78,6 +109,15 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _get_many(self, *args: Any, **kwargs: Any) -> CALLABLE_MANY:
+        async def route(
+            item_ids: List[Any] = self.item_ids,
+        ) -> Dict[str, List[Model]]:
+            models = await self._load_many(item_ids)
+            return self._get_many_response(item_ids, models)
+
+        return route
+
     def _create(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(model: self.create_schema) -> Model:  # type: ignore
             db_model = self.db_model(**model.dict())
@@ -98,13 +138,84 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
 
         return route
 
+    def _patch(self, *args: Any, **kwargs: Any) -> CALLABLE:
+        async def route(
+            item_id: int, model: self.patch_schema  # type: ignore
+        ) -> Model:
+            values = model.dict(exclude_unset=True, exclude={self._pk})
+            if values and not await self.db_model.filter(id=item_id).update(**values):
+                raise NOT_FOUND
+
+            return await self._get_one()(item_id)
+
+        return route
+
     def _delete_all(self, *args: Any, **kwargs: Any) -> CALLABLE_LIST:
         async def route() -> List[Model]:
             await self.db_model.all().delete()
-            return await self._get_all()(pagination={"skip": 0, "limit": None})
+            return []
+
+        return route
+
+    def _bulk_delete(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(selection: Selection = self.selection) -> Dict[str, Any]:
+            if selection.dry_run:
+                return await self._dry_run(selection)
+
+            async with self._transaction() as connection:
+                ids = await self._select(selection, connection)
+                self._check_bulk_limit(len(ids))
+                await self.db_model.filter(pk__in=ids).using_db(connection).delete()
+
+            return self._bulk_result(ids)
 
         return route
 
+    def _bulk_update(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        async def route(
+            model: self.patch_schema,  # type: ignore
+            selection: Selection = self.selection,
+        ) -> Dict[str, Any]:
+            values = self._bulk_values(model)
+            if selection.dry_run:
+                return await self._dry_run(selection)
+
+            async with self._transaction() as connection:
+                ids = await self._select(selection, connection)
+                self._check_bulk_limit(len(ids))
+                await self.db_model.filter(pk__in=ids).using_db(connection).update(
+                    **values
+                )
+
+            return self._bulk_result(ids)
+
+        return route
+
+    def _transaction(self) -> Any:
+        # Tortoise has no RETURNING, so the ids are selected first and the
+        # write applies to them in the same transaction
+        return in_transaction(self.db_model._meta.default_connection)
+
+    def _selection(self, selection: Selection) -> Any:
+        query = self.db_model.filter(**selection.filters)
+        if selection.ids is not None:
+            query = query.filter(pk__in=selection.ids)
+
+        return query.order_by("pk")
+
+    async def _select(self, selection: Selection, connection: Any) -> List[Any]:
+        query = self._selection(selection).using_db(connection)
+        return list(await query.values_list("pk", flat=True))
+
+    async def _dry_run(self, selection: Selection) -> Dict[str, Any]:
+        query = self._selection(selection)
+        count = await query.count()
+        if self.bulk_limit is not None:
+            query = query.limit(self.bulk_limit)
+
+        ids = list(await query.values_list("pk", flat=True))
+        return self._bulk_result(ids, dry_run=True, count=count)
+
     def _delete_one(self, *args: Any, **kwargs: Any) -> CALLABLE:
         async def route(item_id: int) -> Model:
             model: Model = await self._get_one()(item_id)
@@ -113,3 +224,11 @@ class TortoiseCRUDRouter(CRUDGenerator[SCHEMA]):
             return model
 
         return route
+
+    async def _load_ids(self, params: Dict[str, Any]) -> Optional[List[Any]]:
+        return list(await self.db_model.all().values_list("pk", flat=True))
+
+    async def _load_many(self, item_ids: List[Any]) -> Dict[Any, Model]:
+        models = await self.db_model.filter(pk__in=item_ids)
+
+        return {model.pk: model for model in models}
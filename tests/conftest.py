@@ -0,0 +1,153 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import Column, Float, Integer, String, create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from crouton import MemoryCRUDRouter, SQLAlchemyCRUDRouter
+from crouton.core import CRUDGenerator
+
+Base = declarative_base()
+
+
+class PotatoCreate(BaseModel):
+    thickness: float
+    mass: float
+    color: str
+    type: str
+
+
+class Potato(PotatoCreate):
+    id: int
+
+    class Config:
+        orm_mode = True
+
+
+class PotatoModel(Base):
+    __tablename__ = "potatoes"
+    id = Column(Integer, primary_key=True, index=True)
+    thickness = Column(Float)
+    mass = Column(Float)
+    color = Column(String)
+    type = Column(String)
+
+
+def potato(i: int, color: str = "red", **kwargs: Any) -> Dict[str, Any]:
+    return {
+        "thickness": 0.1 * i,
+        "mass": float(i),
+        "color": color,
+        "type": "russet",
+        **kwargs,
+    }
+
+
+MAKE_CLIENT = Callable[..., Tuple[TestClient, CRUDGenerator]]
+
+
+class StubRouter(CRUDGenerator[Potato]):
+    """A third party backend implementing only the default routes"""
+
+    def _get_all(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda: []
+
+    def _get_one(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda item_id: None
+
+    def _create(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda: None
+
+    def _update(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda item_id: None
+
+    def _delete_one(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda item_id: None
+
+    def _delete_all(self, *args: Any, **kwargs: Any) -> Callable[..., Any]:
+        return lambda: []
+
+
+@pytest.fixture
+def engine(tmp_path: Any) -> Iterator[Engine]:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'app.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_local(engine: Engine) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def get_db(session_local: sessionmaker) -> Callable[[], Iterator[Any]]:
+    def get_db() -> Iterator[Any]:
+        session = session_local()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    return get_db
+
+
+@pytest.fixture
+def make_sa(get_db: Callable[[], Iterator[Any]]) -> MAKE_CLIENT:
+    def make(**kwargs: Any) -> Tuple[TestClient, CRUDGenerator]:
+        router = SQLAlchemyCRUDRouter(
+            schema=Potato,
+            create_schema=PotatoCreate,
+            db_model=PotatoModel,
+            db=get_db,
+            prefix="potato",
+            **kwargs,
+        )
+        app = FastAPI()
+        app.include_router(router)
+        return TestClient(app), router
+
+    return make
+
+
+@pytest.fixture
+def make_mem() -> MAKE_CLIENT:
+    def make(**kwargs: Any) -> Tuple[TestClient, CRUDGenerator]:
+        router = MemoryCRUDRouter(
+            schema=Potato, create_schema=PotatoCreate, prefix="potato", **kwargs
+        )
+        app = FastAPI()
+        app.include_router(router)
+        return TestClient(app), router
+
+    return make
+
+
+@pytest.fixture(params=["sqlalchemy", "memory"])
+def make_client(
+    request: Any, make_sa: MAKE_CLIENT, make_mem: MAKE_CLIENT
+) -> MAKE_CLIENT:
+    """Builds a client on each backend that runs here"""
+    return make_sa if request.param == "sqlalchemy" else make_mem
+
+
+@pytest.fixture
+def statements(engine: Engine) -> Iterator[List[str]]:
+    """The SQL statements run on the engine while the test runs"""
+    executed: List[str] = []
+
+    def record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
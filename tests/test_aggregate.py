@@ -0,0 +1,74 @@
+from typing import Any, Dict, List
+
+from fastapi.testclient import TestClient
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def fill(client: TestClient) -> None:
+    for i, color in enumerate(["red", "red", "blue"], 1):
+        client.post("/potato", json=potato(i, color=color))
+
+
+def aggregate(client: TestClient, **params: str) -> List[Dict[str, Any]]:
+    response = client.get("/potato/aggregate", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_aggregate(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(aggregate_route=True)
+    fill(client)
+
+    assert aggregate(client) == [{"count": 3}]
+    rows = aggregate(
+        client, group_by="color", metrics="count,avg(mass),max(mass),min(color)"
+    )
+    assert sorted(rows, key=lambda row: row["color"]) == [
+        {
+            "color": "blue",
+            "count": 1,
+            "avg_mass": 3.0,
+            "max_mass": 3.0,
+            "min_color": "blue",
+        },
+        {
+            "color": "red",
+            "count": 2,
+            "avg_mass": 1.5,
+            "max_mass": 2.0,
+            "min_color": "red",
+        },
+    ]
+
+
+def test_invalid_aggregations(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(aggregate_route=True)
+
+    for params in [
+        {"group_by": "bogus"},
+        {"metrics": "median(mass)"},
+        {"metrics": "sum(color)"},
+        {"metrics": "avg"},
+        {"metrics": ","},
+    ]:
+        response = client.get("/potato/aggregate", params=params)
+        assert response.status_code == 422, params
+
+
+def test_aggregate_cache(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client(aggregate_route=True, aggregate_cache=True)
+    fill(client)
+
+    assert aggregate(client, metrics="sum(mass)") == [{"sum_mass": 6.0}]
+    assert router.aggregate_cache.size > 0  # type: ignore
+
+    client.delete("/potato/3")
+    assert aggregate(client, metrics="sum(mass)") == [{"sum_mass": 3.0}]
+
+
+def test_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+
+    assert router.aggregation is None
+    assert "/potato/aggregate" not in {r.path for r in router.routes}  # type: ignore
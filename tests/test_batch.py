@@ -0,0 +1,64 @@
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_atomic_batch(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(batch_route=True)
+    operations = [
+        {"op": "create", "data": potato(1)},
+        {"op": "create", "data": potato(2)},
+        {"op": "update", "id": 1, "data": potato(5)},
+        {"op": "delete", "id": 2},
+    ]
+
+    res = client.post("/potato/_batch", json={"operations": operations})
+    assert res.status_code == 200
+    assert [r["status"] for r in res.json()] == [200] * 4
+    assert [r["id"] for r in res.json()] == [1, 2, 1, 2]
+    assert client.get("/potato").json() == [{**potato(5), "id": 1}]
+
+
+def test_atomic_batch_rolls_back(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(batch_route=True)
+    operations = [{"op": "create", "data": potato(1)}, {"op": "delete", "id": 99}]
+
+    res = client.post("/potato/_batch", json={"operations": operations})
+    assert res.status_code == 404
+    assert res.json()["detail"] == {"index": 1, "detail": "Item not found"}
+    assert client.get("/potato").json() == []
+
+
+def test_best_effort_batch(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(batch_route=True)
+    operations = [
+        {"op": "create", "data": potato(1)},
+        {"op": "delete", "id": 99},
+        {"op": "update", "id": 1, "data": {"mass": 2}},
+        {"op": "update", "data": potato(3)},
+    ]
+
+    res = client.post(
+        "/potato/_batch", json={"mode": "best_effort", "operations": operations}
+    )
+    assert res.status_code == 200
+    assert [r["status"] for r in res.json()] == [200, 404, 422, 422]
+    assert res.json()[3]["detail"] == "Operation id is required"
+    assert len(client.get("/potato").json()) == 1
+
+
+def test_batch_validation(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(batch_route=True, batch_limit=2)
+    create = {"op": "create", "data": potato(1)}
+
+    assert client.post("/potato/_batch", json={"operations": []}).status_code == 422
+    res = client.post("/potato/_batch", json={"operations": [create] * 3})
+    assert res.status_code == 422
+    res = client.post("/potato/_batch", json={"operations": [{"op": "merge"}]})
+    assert res.status_code == 422
+
+
+def test_batch_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    create = {"op": "create", "data": potato(1)}
+
+    res = client.post("/potato/_batch", json={"operations": [create]})
+    assert res.status_code == 405
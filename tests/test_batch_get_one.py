@@ -0,0 +1,94 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+
+from crouton.core._loader import BatchLoader, loader_factory
+
+
+def test_concurrent_loads_share_one_call() -> None:
+    calls: List[List[int]] = []
+
+    async def load_many(keys: List[int]) -> Dict[int, str]:
+        calls.append(sorted(keys))
+        return {key: f"row {key}" for key in keys if key != 3}
+
+    async def main() -> List[Any]:
+        loader = BatchLoader(load_many)
+        return await asyncio.gather(*(loader.load(key) for key in (1, 2, 2, 3)))
+
+    assert asyncio.run(main()) == ["row 1", "row 2", "row 2", None]
+    assert calls == [[1, 2, 3]]
+
+
+def test_window_and_batch_size() -> None:
+    calls: List[List[int]] = []
+
+    async def load_many(keys: List[int]) -> Dict[int, int]:
+        calls.append(sorted(keys))
+        return {key: key for key in keys}
+
+    async def main() -> None:
+        loader = BatchLoader(load_many, window=0.01, max_batch_size=2)
+        first = asyncio.gather(loader.load(1), loader.load(2))
+        await asyncio.sleep(0)
+        assert await first == [1, 2]
+
+        late = asyncio.ensure_future(loader.load(3))
+        await asyncio.sleep(0)
+        assert await asyncio.gather(late, loader.load(4)) == [3, 4]
+
+    asyncio.run(main())
+    assert calls == [[1, 2], [3, 4]]
+
+
+def test_errors_reach_every_caller() -> None:
+    async def load_many(keys: List[int]) -> Dict[int, int]:
+        raise RuntimeError("database is down")
+
+    async def main() -> List[Any]:
+        loader = BatchLoader(load_many)
+        return await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+
+    assert [str(e) for e in asyncio.run(main())] == ["database is down"] * 2
+
+
+def test_loader_factory() -> None:
+    async def load_many(keys: List[int]) -> Dict[int, int]:
+        return {}
+
+    assert loader_factory(load_many, False) is None
+    assert loader_factory(load_many, True).window == 0  # type: ignore
+    assert loader_factory(load_many, 0.5).window == 0.5  # type: ignore
+
+
+def test_databases_router_batches_get_one(tmp_path: Any) -> None:
+    pytest.importorskip("aiosqlite")
+    from databases import Database
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+
+    from crouton import DatabasesCRUDRouter
+
+    from .conftest import Base, Potato, PotatoCreate, potato
+
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    database = Database(url)
+    router = DatabasesCRUDRouter(
+        schema=Potato,
+        create_schema=PotatoCreate,
+        table=Base.metadata.tables["potatoes"],
+        database=database,
+        batch_get_one=True,
+    )
+    app = FastAPI(on_startup=[database.connect], on_shutdown=[database.disconnect])
+    app.include_router(router)
+
+    with TestClient(app) as client:
+        client.post("/potatoes", json=potato(1))
+        assert client.get("/potatoes/1").json()["mass"] == 1
+        assert client.get("/potatoes/2").status_code == 404
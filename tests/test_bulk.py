@@ -0,0 +1,114 @@
+from typing import Any
+
+import pytest
+
+from crouton import DatabasesCRUDRouter
+
+from .conftest import MAKE_CLIENT, Potato, PotatoModel, potato
+
+
+def test_bulk_delete_by_filter(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True)
+    for i in range(1, 5):
+        client.post("/potato", json=potato(i, color="red" if i % 2 else "gold"))
+
+    response = client.delete("/potato", params={"color": "red"})
+    assert response.status_code == 200
+    assert response.json() == {"count": 2, "ids": [1, 3], "dry_run": False}
+    assert [p["id"] for p in client.get("/potato").json()] == [2, 4]
+
+
+def test_bulk_update_by_ids(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True)
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+
+    response = client.patch(
+        "/potato", params={"ids": [1, 3, 1]}, json={"color": "gold"}
+    )
+    assert response.json() == {"count": 2, "ids": [1, 3], "dry_run": False}
+    colors = [p["color"] for p in client.get("/potato").json()]
+    assert colors == ["gold", "red", "gold"]
+
+
+def test_empty_selection_deletes_everything(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True)
+    for i in range(1, 3):
+        client.post("/potato", json=potato(i))
+
+    assert client.delete("/potato").json()["count"] == 2
+    assert client.get("/potato").json() == []
+
+
+def test_dry_run_is_capped_and_writes_nothing(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True, bulk_limit=2)
+    for i in range(1, 5):
+        client.post("/potato", json=potato(i))
+
+    response = client.delete("/potato", params={"dry_run": True})
+    assert response.json() == {"count": 4, "ids": [1, 2], "dry_run": True}
+    response = client.patch(
+        "/potato", params={"dry_run": True}, json={"color": "gold"}
+    )
+    assert response.json() == {"count": 4, "ids": [1, 2], "dry_run": True}
+    assert {p["color"] for p in client.get("/potato").json()} == {"red"}
+
+
+def test_selection_over_the_limit(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True, bulk_limit=2)
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+
+    assert client.delete("/potato").status_code == 422
+    response = client.patch("/potato", json={"color": "gold"})
+    assert response.status_code == 422
+    assert len(client.get("/potato").json()) == 3
+    assert {p["color"] for p in client.get("/potato").json()} == {"red"}
+
+
+def test_too_many_ids(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True, bulk_limit=2)
+
+    assert client.delete("/potato", params={"ids": [1, 2, 3]}).status_code == 422
+
+
+def test_unknown_filter(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(bulk_route=True)
+    client.post("/potato", json=potato(1))
+
+    assert client.delete("/potato", params={"colour": "red"}).status_code == 422
+    assert len(client.get("/potato").json()) == 1
+
+
+@pytest.mark.parametrize("body", [{}, {"id": 5}, {"mass": None}])
+def test_invalid_bulk_update(make_client: MAKE_CLIENT, body: Any) -> None:
+    client, _ = make_client(bulk_route=True)
+    client.post("/potato", json=potato(1))
+
+    assert client.patch("/potato", json=body).status_code == 422
+    assert client.get("/potato/1").json()["mass"] == 1.0
+
+
+def test_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    for i in range(1, 3):
+        client.post("/potato", json=potato(i))
+
+    # DELETE on the collection stays delete_all, which takes no selection
+    assert client.patch("/potato", json={"color": "gold"}).status_code == 405
+    assert client.delete("/potato", params={"color": "gold"}).json() == []
+    assert client.get("/potato").json() == []
+
+
+def test_chunked_delete_all_conflicts(make_sa: MAKE_CLIENT) -> None:
+    with pytest.raises(ValueError):
+        make_sa(bulk_route=True, delete_all_chunk_size=100)
+
+    with pytest.raises(ValueError):
+        DatabasesCRUDRouter(
+            schema=Potato,
+            table=PotatoModel.__table__,
+            database=None,
+            bulk_route=True,
+            delete_all_chunk_size=100,
+        )
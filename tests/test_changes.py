@@ -0,0 +1,112 @@
+import asyncio
+from typing import Any, List
+
+from crouton.core import ChangeHub
+from crouton.core._changes import RESYNC, sse_stream
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_subscribers_receive_their_table() -> None:
+    async def main() -> List[Any]:
+        hub = ChangeHub()
+        potatoes = hub.subscribe("potatoes")
+        every = hub.subscribe()
+        hub.publish("potatoes", "create", 1, {"id": 1})
+        hub.publish("carrots", "delete", 2)
+
+        received = [await potatoes.get(), await every.get(), await every.get()]
+        potatoes.close()
+        assert await potatoes.get() is None
+        return received
+
+    first, *every = asyncio.run(main())
+    assert first == {
+        "seq": 1,
+        "table": "potatoes",
+        "type": "create",
+        "id": 1,
+        "data": {"id": 1},
+    }
+    assert [e["table"] for e in every] == ["potatoes", "carrots"]
+
+
+def test_resume_after_a_sequence_number() -> None:
+    async def main() -> None:
+        hub = ChangeHub(history=3)
+        for id_ in range(5):
+            hub.publish("potatoes", "create", id_)
+
+        replayed = hub.subscribe("potatoes", after=3)
+        assert (await replayed.get())["seq"] == 4  # type: ignore
+        assert (await replayed.get())["seq"] == 5  # type: ignore
+
+        # Events 2 and 3 are no longer kept
+        missed = hub.subscribe("potatoes", after=1)
+        assert (await missed.get())["type"] == RESYNC  # type: ignore
+
+    asyncio.run(main())
+
+
+def test_slow_consumers_are_dropped() -> None:
+    async def main() -> None:
+        hub = ChangeHub(queue_size=2)
+        subscription = hub.subscribe()
+        for id_ in range(3):
+            hub.publish("potatoes", "create", id_)
+        await asyncio.sleep(0)
+
+        event = await subscription.get()
+        assert event == {"seq": 3, "table": None, "type": RESYNC}
+        assert await subscription.get() is None
+        assert subscription.closed
+
+    asyncio.run(main())
+
+
+def test_server_sent_events() -> None:
+    async def main() -> bytes:
+        hub = ChangeHub()
+        stream = sse_stream(hub.subscribe())
+        hub.publish("potatoes", "delete", 7)
+        message = await stream.__anext__()
+        await stream.aclose()
+        return message
+
+    assert asyncio.run(main()) == (
+        b"id: 1\nevent: delete\n"
+        b'data: {"seq":1,"table":"potatoes","type":"delete","id":7,"data":null}\n\n'
+    )
+
+
+def test_write_routes_publish(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client(change_feed=True)
+    client.post("/potato", json=potato(1))
+    client.put("/potato/1", json=potato(1, color="blue"))
+    client.delete("/potato/1")
+    # Failed writes are not published
+    assert client.delete("/potato/1").status_code == 404
+    client.delete("/potato")
+
+    with client.websocket_connect("/potato/changes?after=0") as websocket:
+        events = [websocket.receive_json() for _ in range(4)]
+
+    assert [(e["type"], e["id"]) for e in events] == [
+        ("create", 1),
+        ("update", 1),
+        ("delete", 1),
+        ("delete_all", None),
+    ]
+    assert events[1]["data"]["color"] == "blue"
+    assert router.change_hub.seq == 4  # type: ignore
+
+
+def test_invalid_cursor(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(change_feed=True)
+    assert client.get("/potato/changes", params={"after": "x"}).status_code == 422
+
+
+def test_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+    assert router.change_hub is None
+    assert client.get("/potato/changes").status_code == 422
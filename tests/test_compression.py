@@ -0,0 +1,85 @@
+import asyncio
+import gzip
+import json
+from typing import Any, List
+
+from crouton.core._compression import compress_body, compress_rows, negotiate_encoding
+
+from .conftest import MAKE_CLIENT, potato
+
+GZIP = {"Accept-Encoding": "gzip"}
+
+
+def raw_get(client: Any, url: str, headers: Any) -> Any:
+    with client.stream("GET", url, headers=headers) as res:
+        return res, b"".join(res.iter_raw())
+
+
+def test_large_lists_are_compressed(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(compress=True)
+    for i in range(30):
+        client.post("/potato", json=potato(i))
+
+    plain = client.get("/potato", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    res, raw = raw_get(client, "/potato", GZIP)
+    assert res.headers["content-encoding"] == "gzip"
+    assert res.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(raw) == plain.content
+    assert len(raw) < len(plain.content)
+
+
+def test_rendered_bodies_are_compressed(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(compress=True, page_cache=True, trusted_output=True)
+    for i in range(30):
+        client.post("/potato", json=potato(i))
+
+    plain = client.get("/potato")
+    for _ in range(2):
+        res, raw = raw_get(client, "/potato", GZIP)
+        assert res.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(raw)) == plain.json()
+
+
+def test_small_lists_and_errors_are_not_compressed(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(compress=4096)
+    client.post("/potato", json=potato(1))
+
+    res, raw = raw_get(client, "/potato", GZIP)
+    assert "content-encoding" not in res.headers
+    assert json.loads(raw) == [potato(1, id=1)]
+    res = client.get("/potato", params={"limit": 0}, headers=GZIP)
+    assert res.status_code == 422
+    assert "content-encoding" not in res.headers
+
+
+def test_compression_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    for i in range(30):
+        client.post("/potato", json=potato(i))
+
+    res, _ = raw_get(client, "/potato", GZIP)
+    assert "content-encoding" not in res.headers
+    assert "vary" not in res.headers
+
+
+def test_negotiate_encoding() -> None:
+    assert negotiate_encoding(None, ["gzip"]) is None
+    assert negotiate_encoding("br, gzip;q=0.5", ["gzip"]) == "gzip"
+    assert negotiate_encoding("gzip;q=0", ["gzip"]) is None
+    assert negotiate_encoding("*", ["zstd", "gzip"]) == "zstd"
+
+
+def test_compress_rows_and_body() -> None:
+    rows = list(range(1234))
+
+    async def encode(chunk: List[int]) -> bytes:
+        return json.dumps(chunk).encode()
+
+    async def main() -> bytes:
+        first = await encode(rows[:500])
+        return await compress_rows(first, rows, encode, "gzip")
+
+    assert json.loads(gzip.decompress(asyncio.run(main()))) == rows
+    body = json.dumps(rows).encode()
+    assert gzip.decompress(b"".join(compress_body(body, "gzip"))) == body
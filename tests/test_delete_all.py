@@ -0,0 +1,54 @@
+from typing import List
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_delete_all(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+
+    response = client.delete("/potato")
+    assert response.status_code == 200
+    assert response.json() == []
+    assert client.get("/potato").json() == []
+    assert client.get("/potato/1").status_code == 404
+
+
+def test_delete_all_does_not_list_rows(
+    make_sa: MAKE_CLIENT, statements: List[str]
+) -> None:
+    client, _ = make_sa()
+    client.post("/potato", json=potato(1))
+    statements.clear()
+
+    client.delete("/potato")
+    assert statements == ["DELETE FROM potatoes"]
+
+
+def test_delete_all_in_chunks(make_sa: MAKE_CLIENT, statements: List[str]) -> None:
+    client, _ = make_sa(delete_all_chunk_size=2)
+    for i in range(1, 6):
+        client.post("/potato", json=potato(i))
+    statements.clear()
+
+    assert client.delete("/potato").json() == []
+    deletes = [s for s in statements if s.startswith("DELETE")]
+    # Two full ranges, then the rows after the last one
+    assert len(deletes) == 3
+    assert "potatoes.id <= ?" in deletes[0] and "potatoes.id > ?" in deletes[2]
+    assert client.get("/potato").json() == []
+
+
+def test_chunks_of_an_empty_table(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(delete_all_chunk_size=2)
+
+    assert client.delete("/potato").json() == []
+
+
+def test_delete_all_route_can_be_disabled(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(delete_all_route=False)
+    client.post("/potato", json=potato(1))
+
+    assert client.delete("/potato").status_code == 405
+    assert len(client.get("/potato").json()) == 1
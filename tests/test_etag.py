@@ -0,0 +1,114 @@
+from typing import Any
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from .conftest import MAKE_CLIENT, PotatoModel, potato
+
+
+def test_conditional_get(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(etag=True)
+    client.post("/potato", json=potato(1))
+
+    res = client.get("/potato")
+    etag = res.headers["etag"]
+    assert etag.startswith('W/"')
+    assert client.get("/potato/1").headers["etag"] != etag
+
+    res = client.get("/potato", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.headers["etag"] == etag
+    res = client.get("/potato", headers={"If-None-Match": f'"other", {etag[2:]}'})
+    assert res.status_code == 304
+
+    client.post("/potato", json=potato(2))
+    res = client.get("/potato", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+    assert len(res.json()) == 2
+
+
+def test_failed_write_and_missing_row(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(etag=True)
+    client.post("/potato", json=potato(1))
+    etag = client.get("/potato").headers["etag"]
+
+    assert client.delete("/potato/9").status_code == 404
+    assert client.get("/potato/9").status_code == 404
+    # A failed write may still have changed the table, so it moves on
+    res = client.get("/potato", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+
+def test_etag_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+
+    assert "etag" not in client.get("/potato").headers
+    res = client.get("/potato", headers={"If-None-Match": "*"})
+    assert res.status_code == 200
+
+
+def test_track_flushes(make_sa: MAKE_CLIENT, session_local: sessionmaker) -> None:
+    client, _ = make_sa(etag=True, track_flushes=True)
+    etag = client.get("/potato").headers["etag"]
+
+    with session_local() as session:
+        session.add(PotatoModel(**potato(1)))
+        session.flush()
+        session.rollback()
+    assert client.get("/potato", headers={"If-None-Match": etag}).status_code == 304
+
+    with session_local() as session:
+        session.add(PotatoModel(**potato(1)))
+        session.commit()
+    assert client.get("/potato", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_track_flushes_across_savepoint_rollback(
+    make_sa: MAKE_CLIENT, session_local: sessionmaker
+) -> None:
+    client, _ = make_sa(etag=True, track_flushes=True)
+    etag = client.get("/potato").headers["etag"]
+
+    with session_local() as session:
+        session.add(PotatoModel(**potato(1)))
+        session.flush()
+        savepoint = session.begin_nested()
+        session.add(PotatoModel(id=1, **potato(2)))
+        try:
+            session.flush()
+        except IntegrityError:
+            savepoint.rollback()
+        session.commit()
+
+    res = client.get("/potato", headers={"If-None-Match": etag})
+    assert res.status_code == 200 and len(res.json()) == 1
+
+
+def test_track_flushes_is_scoped_to_the_sessionmaker(
+    make_sa: MAKE_CLIENT, session_local: sessionmaker, engine: Any
+) -> None:
+    client, _ = make_sa(etag=True, track_flushes=True)
+    etag = client.get("/potato").headers["etag"]
+
+    other = sessionmaker(bind=engine)
+    with other() as session:
+        session.add(PotatoModel(**potato(1)))
+        session.commit()
+    assert client.get("/potato", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_track_flushes_of_a_given_sessionmaker(
+    make_sa: MAKE_CLIENT, session_local: sessionmaker
+) -> None:
+    client, _ = make_sa(etag=True, track_flushes=session_local)
+    make_sa(etag=True, track_flushes=session_local)
+    etag = client.get("/potato").headers["etag"]
+
+    # Tracked from construction, before the router sees any request
+    with session_local() as session:
+        session.add(PotatoModel(**potato(1)))
+        session.commit()
+    res = client.get("/potato", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"].split("-")[1] == str(int(etag.split("-")[1]) + 1)
@@ -0,0 +1,75 @@
+import pytest
+
+from crouton.core._formats import (
+    COLUMNAR_JSON,
+    JSON,
+    MSGPACK,
+    accepted_media_types,
+    negotiate,
+)
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_columnar_json(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(binary_formats=True)
+    for i in range(1, 3):
+        client.post("/potato", json=potato(i))
+
+    res = client.get("/potato", headers={"Accept": COLUMNAR_JSON})
+    assert res.status_code == 200
+    assert res.headers["content-type"] == COLUMNAR_JSON
+    assert res.headers["vary"] == "Accept"
+    assert res.json() == {
+        "thickness": [0.1, 0.2],
+        "mass": [1.0, 2.0],
+        "color": ["red", "red"],
+        "type": ["russet", "russet"],
+        "id": [1, 2],
+    }
+
+    res = client.get("/potato", headers={"Accept": "text/html"})
+    assert res.headers["content-type"] == JSON
+    assert res.headers["vary"] == "Accept"
+    assert len(res.json()) == 2
+
+
+def test_msgpack(make_client: MAKE_CLIENT) -> None:
+    msgpack = pytest.importorskip("msgpack")
+    client, _ = make_client(binary_formats=True)
+    client.post("/potato", json=potato(1))
+
+    res = client.get("/potato", headers={"Accept": "application/x-msgpack"})
+    assert res.headers["content-type"] == MSGPACK
+    assert msgpack.unpackb(res.content) == [potato(1, id=1)]
+
+
+def test_formats_errors_and_cache(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(binary_formats=True, page_cache=True)
+    client.post("/potato", json=potato(1))
+
+    res = client.get("/potato", params={"limit": 0}, headers={"Accept": COLUMNAR_JSON})
+    assert res.status_code == 422
+    # Cached pages are kept apart per Accept header
+    assert client.get("/potato").json() == [potato(1, id=1)]
+    res = client.get("/potato", headers={"Accept": COLUMNAR_JSON})
+    assert res.json()["id"] == [1]
+
+
+def test_formats_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+
+    res = client.get("/potato", headers={"Accept": COLUMNAR_JSON})
+    assert res.headers["content-type"] == JSON
+    assert "vary" not in res.headers
+
+
+def test_negotiation() -> None:
+    offered = [JSON, COLUMNAR_JSON, MSGPACK]
+
+    assert accepted_media_types("a/b;q=0.5, c/d, e/f;q=0") == ["c/d", "a/b"]
+    assert negotiate(None, offered) == JSON
+    assert negotiate(f"{MSGPACK};q=0.9, {COLUMNAR_JSON}", offered) == COLUMNAR_JSON
+    assert negotiate("application/x-msgpack", offered) == MSGPACK
+    assert negotiate("*/*", offered) == JSON
+    assert negotiate("image/png", offered) == JSON
@@ -0,0 +1,36 @@
+import pytest
+
+from .conftest import MAKE_CLIENT, Potato, StubRouter, potato
+
+
+def test_get_many(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(get_many_route=True)
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+
+    res = client.get("/potato/_many", params={"ids": [3, 9, 1, 3]})
+    assert res.status_code == 200
+    body = res.json()
+    assert [item["id"] for item in body["items"]] == [3, 1]
+    assert body["missing"] == [9]
+
+
+def test_get_many_limit(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(get_many_route=True, get_many_limit=2)
+
+    assert client.get("/potato/_many", params={"ids": [1, 2, 2]}).status_code == 200
+    assert client.get("/potato/_many", params={"ids": [1, 2, 3]}).status_code == 422
+    assert client.get("/potato/_many").status_code == 422
+    assert client.get("/potato/_many", params={"ids": ["a"]}).status_code == 422
+
+
+def test_get_many_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+
+    # Falls through to get_one, whose id does not parse
+    assert client.get("/potato/_many", params={"ids": [1]}).status_code == 422
+
+
+def test_get_many_requires_backend_support() -> None:
+    with pytest.raises(NotImplementedError):
+        StubRouter(Potato, get_many_route=True)
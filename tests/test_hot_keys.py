@@ -0,0 +1,114 @@
+import random
+from collections import Counter
+
+import pytest
+
+from crouton.core._hotkeys import HyperLogLog, KeyTelemetry, SpaceSaving
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_hot_keys_route(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(hot_keys=1.0)
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+    for _ in range(3):
+        client.get("/potato/1")
+    client.put("/potato/1", json=potato(1))
+    client.get("/potato/2")
+    client.get("/potato/9")
+
+    report = client.get("/potato/_hot_keys", params={"limit": 2}).json()
+    assert report["reads"] == 5 and report["writes"] == 1
+    assert report["read_write_ratio"] == 5.0
+    assert report["cardinality"] == 3
+    assert report["hot_keys"][0] == {
+        "key": "1",
+        "count": 4.0,
+        "error": 0.0,
+        "reads": 3.0,
+        "writes": 1.0,
+    }
+    assert len(report["hot_keys"]) == 2
+
+
+def test_invalid_limit(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(hot_keys=True)
+
+    assert client.get("/potato/_hot_keys", params={"limit": 0}).status_code == 422
+
+
+def test_hot_keys_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+
+    assert router.key_telemetry is None
+    assert client.get("/potato/_hot_keys").status_code == 422
+
+
+def test_space_saving_matches_exact_counts_within_capacity() -> None:
+    counter = SpaceSaving(capacity=10)
+    keys = [str(random.randrange(10)) for _ in range(1000)]
+    for key in keys:
+        counter.add(key, read=True)
+
+    exact = Counter(keys)
+    assert {key: count for key, count, *_ in counter.top(10)} == exact
+
+
+def test_space_saving_eviction() -> None:
+    counter = SpaceSaving(capacity=2)
+    for key in "aab":
+        counter.add(key, read=False)
+
+    # c replaces b, the least counted key, inheriting its count as error
+    counter.add("c", read=True)
+    assert counter.top(2) == [["a", 2, 0, 0], ["c", 2, 1, 1]]
+
+    # Among equally counted keys, the one counted longest ago is replaced
+    counter.add("b", read=True)
+    assert counter.top(2) == [["b", 3, 2, 1], ["c", 2, 1, 1]]
+
+
+def test_space_saving_keeps_heavy_hitters() -> None:
+    random.seed(0)
+    counter = SpaceSaving(capacity=50)
+    keys = [str(int(random.paretovariate(1.2))) for _ in range(20_000)]
+    for key in keys:
+        counter.add(key, read=True)
+
+    exact = Counter(keys)
+    for key, count, error, _ in counter.top(5):
+        assert count - error <= exact[key] <= count
+
+    assert {key for key, *_ in counter.top(5)} == {k for k, _ in exact.most_common(5)}
+
+
+def test_hyperloglog_estimate() -> None:
+    hll = HyperLogLog()
+    for i in range(50_000):
+        hll.add(str(i))
+
+    assert hll.estimate() == pytest.approx(50_000, rel=0.05)
+    hll.clear()
+    assert hll.estimate() == 0
+
+
+def test_unsampled_calls_are_only_counted() -> None:
+    random.seed(0)
+    telemetry = KeyTelemetry(sample_rate=0.1)
+    for i in range(1000):
+        telemetry.record(i, read=i % 4 != 0)
+
+    report = telemetry.report(3)
+    assert report.reads == 750 and report.writes == 250
+    # Every key is called once, so about a tenth of them were sampled
+    assert 50 < report.cardinality < 150
+    assert all(key.count == 10 for key in report.hot_keys)
+
+    telemetry.clear()
+    assert telemetry.report(3).hot_keys == []
+
+
+def test_invalid_sample_rate() -> None:
+    with pytest.raises(AssertionError):
+        KeyTelemetry(sample_rate=0)
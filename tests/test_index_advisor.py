@@ -0,0 +1,67 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from crouton.core import IndexAdvisor
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_list_queries_are_recorded(make_sa: MAKE_CLIENT, engine: Engine) -> None:
+    advisor = IndexAdvisor()
+    client, _ = make_sa(index_advisor=advisor)
+    client.post("/potato", json=potato(1))
+    client.get("/potato")
+    client.get("/potato")
+
+    (report,) = advisor.report(engine)
+    assert report.table == "potatoes"
+    assert [(u.filters, u.sort, u.count) for u in report.usage] == [([], ["id"], 2)]
+    # Ordering by the primary key needs no index of its own
+    assert report.missing == []
+
+
+def test_missing_and_redundant_indexes(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_potatoes_color ON potatoes (color)"))
+        conn.execute(
+            text("CREATE INDEX ix_potatoes_color_mass ON potatoes (color, mass)")
+        )
+
+    advisor = IndexAdvisor()
+    advisor.record("potatoes", filters=["color"], sort=["mass"])
+    advisor.record("potatoes", filters=["type"], sort=["mass", "id"])
+    advisor.record("potatoes", sort=["thickness"])
+
+    (report,) = advisor.report(engine)
+    assert report.missing == [["type", "mass"], ["thickness"]]
+    assert {r.name: r.reason for r in report.redundant} == {
+        "ix_potatoes_id": "duplicates the primary key",
+        "ix_potatoes_color": "covered by ix_potatoes_color_mass",
+    }
+
+
+def test_create_indexes(engine: Engine) -> None:
+    advisor = IndexAdvisor()
+    advisor.record("potatoes", filters=["color"], sort=["mass"])
+
+    assert advisor.create_indexes(engine) == ["ix_potatoes_color_mass"]
+    names = {index["name"] for index in inspect(engine).get_indexes("potatoes")}
+    assert "ix_potatoes_color_mass" in names
+    assert advisor.report(engine)[0].missing == []
+    assert advisor.create_indexes(engine) == []
+
+
+def test_queries_without_columns_are_not_recorded(engine: Engine) -> None:
+    advisor = IndexAdvisor()
+    advisor.record("potatoes")
+    assert advisor.report(engine)[0].usage == []
+
+    advisor.record("potatoes", sort=["mass"])
+    advisor.clear()
+    assert advisor.report(engine)[0].usage == []
+
+
+def test_off_by_default(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa()
+    assert router.index_advisor is None
+    assert client.get("/potato").status_code == 200
@@ -0,0 +1,87 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from crouton.core import MetricsRegistry
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_route_metrics(make_client: MAKE_CLIENT) -> None:
+    registry = MetricsRegistry()
+    client, _ = make_client(metrics=registry)
+
+    client.post("/potato", json=potato(1))
+    client.get("/potato/1")
+    client.get("/potato/1")
+    assert client.get("/potato/9").status_code == 404
+    # Rejected by request validation, inside the route
+    assert client.get("/potato/nine").status_code == 422
+
+    text = registry.collect()
+    labels = 'prefix="/potato",route="get_one"'
+    assert f"crouton_requests_total{{{labels},status=\"200\"}} 2" in text
+    assert f"crouton_requests_total{{{labels},status=\"404\"}} 1" in text
+    assert f"crouton_requests_total{{{labels},status=\"422\"}} 1" in text
+    assert 'route="create",status="200"} 1' in text
+    assert f"crouton_request_duration_seconds_count{{{labels}}} 4" in text
+    assert 'crouton_request_size_bytes_count{prefix="/potato",route="create"} 1' in text
+    assert f"crouton_request_size_bytes_count{{{labels}}}" not in text
+
+
+def test_response_sizes_as_sent(make_client: MAKE_CLIENT) -> None:
+    registry = MetricsRegistry()
+    client, _ = make_client(metrics=registry)
+    client.post("/potato", json=potato(1))
+
+    body = client.get("/potato").content
+    text = registry.collect()
+    labels = 'prefix="/potato",route="get_all"'
+    assert f"crouton_response_size_bytes_sum{{{labels}}} {len(body)}" in text
+    assert f"crouton_response_size_bytes_count{{{labels}}} 1" in text
+
+
+def test_metrics_survive_include_router(make_client: MAKE_CLIENT) -> None:
+    registry = MetricsRegistry()
+    _, router = make_client(metrics=registry)
+    app = FastAPI()
+    app.include_router(router, prefix="/v1")
+
+    assert TestClient(app).get("/v1/potato").status_code == 200
+    assert 'route="get_all",status="200"} 1' in registry.collect()
+
+
+def test_registry_is_an_asgi_app() -> None:
+    registry = MetricsRegistry()
+    registry.counter("jobs_total", "Jobs")
+    registry.histogram("job_seconds", "Job time", (0.1, 1.0))
+    registry.inc("jobs_total", (("queue", 'a"b'),))
+    registry.observe("job_seconds", (), 0.5)
+    registry.observe("job_seconds", (), 2.0)
+
+    worker = threading.Thread(target=registry.inc, args=("jobs_total", ()))
+    worker.start()
+    worker.join()
+
+    app = FastAPI()
+    app.mount("/metrics", registry)
+    res = TestClient(app).get("/metrics/")
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = res.text.splitlines()
+    assert 'jobs_total{queue="a\\"b"} 1' in lines
+    assert "jobs_total 1" in lines
+    assert 'job_seconds_bucket{le="0.1"} 0' in lines
+    assert 'job_seconds_bucket{le="1"} 1' in lines
+    assert 'job_seconds_bucket{le="+Inf"} 2' in lines
+    assert "job_seconds_sum 2.5" in lines
+
+    registry.clear()
+    assert "jobs_total 1" not in registry.collect()
+
+
+def test_metrics_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+    client.get("/potato")
+
+    assert not hasattr(router, "metrics")
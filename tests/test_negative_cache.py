@@ -0,0 +1,145 @@
+import time
+from typing import Any, Dict, List
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from .conftest import MAKE_CLIENT, PotatoModel, potato
+
+
+def insert_outside_router(session_local: sessionmaker, id_: int) -> None:
+    with session_local() as session:
+        session.add(PotatoModel(id=id_, **potato(id_)))
+        session.commit()
+
+
+def test_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+
+    assert router.negative_lookup is None
+    assert client.get("/potato/1").status_code == 404
+
+
+def test_seeded_at_startup(make_sa: MAKE_CLIENT, statements: List[str]) -> None:
+    plain, _ = make_sa()
+    plain.post("/potato", json=potato(1))
+    client, router = make_sa(negative_cache=True)
+
+    with client:
+        assert router.negative_lookup.bloom is not None
+        statements.clear()
+
+        assert client.get("/potato/2").status_code == 404
+        assert statements == []
+        assert client.get("/potato/1").status_code == 200
+
+    counts = router.negative_lookup.counts
+    assert counts["bloom_reject"] == 1 and counts["found"] == 1
+
+
+def test_seeded_by_first_read_without_startup(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa(negative_cache=True)
+    client.post("/potato", json=potato(1))
+    assert router.negative_lookup.bloom is None
+
+    assert client.get("/potato/1").status_code == 200
+    assert client.get("/potato/2").status_code == 404
+    assert router.negative_lookup.counts["bloom_reject"] == 1
+
+
+def test_created_rows_are_found(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa(negative_cache=True)
+    with client:
+        id_ = client.post("/potato", json=potato(1)).json()["id"]
+
+        assert client.get(f"/potato/{id_}").status_code == 200
+        assert router.negative_lookup.counts["found"] == 1
+
+
+def test_missing_ids_are_cached(make_mem: MAKE_CLIENT) -> None:
+    # The memory router cannot scan its keys, so only the cache is used
+    client, router = make_mem(negative_cache=True)
+
+    assert client.get("/potato/1").status_code == 404
+    assert client.get("/potato/1").status_code == 404
+    counts = router.negative_lookup.counts
+    assert counts["missing"] == 1 and counts["cache_hit"] == 1
+
+    client.post("/potato", json=potato(1))
+    assert client.get("/potato/1").status_code == 200
+
+
+def test_deleted_ids_are_not_false_positives(make_sa: MAKE_CLIENT) -> None:
+    # A tiny ttl lets the 404 of the deleted id reach the database
+    client, router = make_sa(negative_cache=1e-9)
+    with client:
+        client.post("/potato", json=potato(1))
+        assert client.delete("/potato/1").status_code == 200
+
+        assert client.get("/potato/1").status_code == 404
+
+    counts = router.negative_lookup.counts
+    assert counts["deleted"] == 1 and counts["false_positive"] == 0
+
+
+def test_rows_inserted_elsewhere_wait_for_reseed(
+    make_sa: MAKE_CLIENT, session_local: sessionmaker
+) -> None:
+    client, _ = make_sa(negative_cache=True, negative_reseed=None)
+    with client:
+        insert_outside_router(session_local, 1)
+
+        assert client.get("/potato/1").status_code == 404
+
+
+def test_reseed_interval(make_sa: MAKE_CLIENT, session_local: sessionmaker) -> None:
+    client, router = make_sa(negative_cache=True, negative_reseed=0.0)
+    lookup = router.negative_lookup
+    assert lookup.reseed_interval == 0.0
+    with client:
+        bloom = lookup.bloom
+        insert_outside_router(session_local, 1)
+
+        # The current filter answers while the next one is built
+        assert client.get("/potato/1").status_code == 404
+        deadline = time.monotonic() + 5
+        while lookup.bloom is bloom and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        lookup.reseed_interval = None
+        assert client.get("/potato/1").status_code == 200
+
+
+def test_report_route(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(negative_cache=True)
+    with client:
+        client.post("/potato", json=potato(1))
+        client.get("/potato/1")
+        client.get("/potato/2")
+
+        report = client.get("/potato/_negative_lookups").json()
+
+    assert report["counts"]["found"] == 1 and report["counts"]["bloom_reject"] == 1
+    assert report["false_positive_rate"] == 0.0
+    assert report["keys"] == 1 and report["missing"] == 0
+
+
+def test_report_route_off(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(negative_cache=True, negative_lookup_route=False)
+
+    assert client.get("/potato/_negative_lookups").status_code == 422
+
+
+def test_failed_startup_seed_is_logged(
+    make_sa: MAKE_CLIENT, caplog: pytest.LogCaptureFixture
+) -> None:
+    client, router = make_sa(negative_cache=True)
+
+    async def load_ids(params: Dict[str, Any]) -> List[Any]:
+        raise RuntimeError("database not connected")
+
+    router._load_ids = load_ids
+    with client:
+        assert router.negative_lookup.bloom is None
+
+    assert "Could not seed the negative lookup" in caplog.text
@@ -0,0 +1,159 @@
+import asyncio
+from typing import List, Tuple
+
+import httpx
+from fastapi.testclient import TestClient
+
+from crouton.core._cache import PageCache
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_pages_are_served_from_the_cache(
+    make_sa: MAKE_CLIENT, statements: List[str]
+) -> None:
+    client, router = make_sa(page_cache=True)
+    client.post("/potato", json=potato(1))
+
+    first = client.get("/potato", params={"limit": 5})
+    statements.clear()
+    second = client.get("/potato", params={"limit": 5})
+    assert statements == []
+    assert second.content == first.content
+    assert second.headers["content-type"] == "application/json"
+
+    # Another page, or the same one once the table changed, is read again
+    client.get("/potato", params={"limit": 5, "skip": 1})
+    assert len(statements) == 1
+    client.post("/potato", json=potato(2))
+    assert len(client.get("/potato", params={"limit": 5}).json()) == 2
+    assert router.page_cache.size > 0  # type: ignore
+
+
+def test_errors_are_not_cached(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client(page_cache=True)
+
+    assert client.get("/potato", params={"limit": -1}).status_code == 422
+    assert router.page_cache.size == 0  # type: ignore
+
+
+def test_page_cache_off_by_default(
+    make_sa: MAKE_CLIENT, statements: List[str]
+) -> None:
+    client, router = make_sa()
+
+    client.get("/potato")
+    client.get("/potato")
+    assert router.page_cache is None
+    assert len(statements) == 2
+
+
+def test_cache_is_bounded_in_bytes() -> None:
+    cache = PageCache(max_bytes=10)
+    cache.set("a", 0, b"12345", [])
+    cache.set("b", 0, b"12345", [])
+    cache.get("a", 0)
+    cache.set("c", 0, b"123", [])
+
+    assert cache.get("a", 0)[0] is not None
+    assert cache.get("b", 0)[0] is None
+    assert cache.size == 8
+
+    cache.set("d", 0, b"x" * 11, [])
+    assert cache.get("d", 0)[0] is None
+    assert cache.get("a", 1) == (None, False)
+
+
+def requests(client: TestClient, count: int) -> List[httpx.Response]:
+    """``count`` concurrent reads of the first page"""
+
+    async def main() -> List[httpx.Response]:
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            calls = [c.get("/potato") for _ in range(count)]
+            return list(await asyncio.gather(*calls))
+
+    return asyncio.run(main())
+
+
+def test_one_request_refreshes_a_stale_page(
+    make_sa: MAKE_CLIENT, statements: List[str]
+) -> None:
+    client, _ = make_sa(page_cache=True)
+    client.get("/potato")
+    client.post("/potato", json=potato(1))
+    statements.clear()
+
+    responses = requests(client, 10)
+    assert all(len(response.json()) == 1 for response in responses)
+    assert len([s for s in statements if s.startswith("SELECT")]) == 1
+
+
+def test_stale_page_is_served_while_refreshing(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa(page_cache=True, cache_stale=60.0, etag=True)
+    etag = client.get("/potato").headers["etag"]
+    client.post("/potato", json=potato(1))
+
+    async def main() -> Tuple[httpx.Response, httpx.Response]:
+        transport = httpx.ASGITransport(app=client.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as c:
+            async with router.page_cache.refresh("/potato?"):  # type: ignore
+                stale = await c.get("/potato")
+            return stale, await c.get("/potato", headers={"If-None-Match": etag})
+
+    stale, fresh = asyncio.run(main())
+    # The stale page keeps the ETag it was read at, so it is not stored under
+    # the tag of the current generation
+    assert stale.json() == [] and stale.headers["etag"] == etag
+    assert fresh.status_code == 200 and len(fresh.json()) == 1
+    assert fresh.headers["etag"] != etag
+
+
+def test_stale_pages_are_not_served_by_default() -> None:
+    cache = PageCache()
+    cache.set("a", 0, b"page", [])
+
+    assert cache.get("a", 1) == (None, False)
+
+
+def test_stale_window() -> None:
+    cache = PageCache(stale=60.0)
+    cache.set("a", 0, b"page", [])
+
+    entry, fresh = cache.get("a", 1)
+    assert entry is not None and entry.body == b"page" and not fresh
+
+    cache.stale = 0.0
+    assert cache.get("a", 1) == (None, False)
+
+
+def test_ttl() -> None:
+    cache = PageCache(ttl=0.0)
+    cache.set("a", 0, b"page", [])
+
+    assert cache.get("a", 0) == (None, False)
+
+
+def test_early_expiry() -> None:
+    cache = PageCache(ttl=60.0, beta=1e9)
+    cache.set("slow", 0, b"page", [], delta=1.0)
+    cache.set("fast", 0, b"page", [], delta=0.0)
+
+    # An entry that took time to compute is refreshed before its ttl, unless
+    # the caller already holds the refresh lock
+    assert cache.get("slow", 0)[1] is False
+    assert cache.get("slow", 0, early=False)[1] is True
+    assert cache.get("fast", 0)[1] is True
+
+
+def test_refresh_lock() -> None:
+    cache = PageCache()
+
+    async def main() -> None:
+        assert not cache.refreshing("a")
+        async with cache.refresh("a"):
+            assert cache.refreshing("a") and not cache.refreshing("b")
+
+        assert not cache.refreshing("a")
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+from typing import Optional
+
+import pytest
+from pydantic import BaseModel, ValidationError
+
+from crouton.core._utils import partial_schema_factory
+
+from .conftest import MAKE_CLIENT, Potato, StubRouter, potato
+
+
+def test_patch(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(patch_route=True)
+    client.post("/potato", json=potato(1))
+
+    res = client.patch("/potato/1", json={"mass": 42, "id": 7})
+    assert res.status_code == 200
+    assert res.json() == potato(1, mass=42.0, id=1)
+    assert client.patch("/potato/1", json={}).json() == res.json()
+    assert client.get("/potato/1").json() == res.json()
+
+
+def test_patch_errors(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(patch_route=True)
+    client.post("/potato", json=potato(1))
+
+    assert client.patch("/potato/9", json={"mass": 1}).status_code == 404
+    assert client.patch("/potato/1", json={"mass": "heavy"}).status_code == 422
+    res = client.patch("/potato/1", json={"color": None})
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == "type_error.none.not_allowed"
+    assert client.get("/potato/1").json() == potato(1, id=1)
+
+
+def test_patch_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    client.post("/potato", json=potato(1))
+
+    assert client.patch("/potato/1", json={"mass": 1}).status_code == 405
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    note: Optional[str]
+
+
+def test_partial_schema_nulls() -> None:
+    schema = partial_schema_factory(Item)
+
+    assert "id" not in schema.__fields__
+    assert schema().dict(exclude_unset=True) == {}
+    assert schema(note=None).dict(exclude_unset=True) == {"note": None}
+    with pytest.raises(ValidationError):
+        schema(name=None)
+
+
+def test_patch_requires_backend_support() -> None:
+    with pytest.raises(NotImplementedError):
+        StubRouter(Potato, patch_route=True)
@@ -0,0 +1,129 @@
+from typing import Any, Callable, Iterator
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import Column, String
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base
+
+from crouton import SQLAlchemyCRUDRouter
+
+from .conftest import MAKE_CLIENT, potato
+
+
+class Leek(BaseModel):
+    name: str
+    color: str
+
+    class Config:
+        orm_mode = True
+
+
+# Outside of the tables of the other tests
+LeekBase = declarative_base()
+
+
+class LeekModel(LeekBase):  # type: ignore
+    __tablename__ = "leeks"
+    name = Column(String, primary_key=True)
+    color = Column(String)
+
+
+def fill(client: TestClient) -> None:
+    client.post("/potato", json=potato(1, color="red", type="russet"))
+    client.post("/potato", json=potato(2, color="blue", type="fingerling"))
+    client.post("/potato", json=potato(3, color="red", type="red bliss"))
+
+
+def ids(client: TestClient, **params: Any) -> Any:
+    response = client.get("/potato", params=params)
+    assert response.status_code == 200, response.text
+    return [p["id"] for p in response.json()]
+
+
+def test_search(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(search_fields=["color", "type"])
+    with client:
+        fill(client)
+
+        # The row matching red twice ranks first
+        assert ids(client, q="red") == [3, 1]
+        assert ids(client, q="fing") == [2]
+        assert ids(client, q="red russet") == [1]
+        assert ids(client, q="green") == []
+
+        client.put("/potato/2", json=potato(2, color="red", type="fingerling"))
+        client.delete("/potato/1")
+        assert ids(client, q="red") == [3, 2]
+
+
+def test_search_pages(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(search_fields=["color", "type"])
+    with client:
+        fill(client)
+
+        first = client.get("/potato", params={"q": "red", "limit": 1})
+        after = first.headers["X-Next-Cursor"]
+        second = client.get("/potato", params={"q": "red", "limit": 1, "after": after})
+        assert [p["id"] for p in first.json() + second.json()] == [3, 1]
+
+
+def test_invalid_searches(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(search_fields=["color"])
+    with client:
+        assert client.get("/potato", params={"q": "?!"}).status_code == 422
+        response = client.get("/potato", params={"q": "red", "after": "bogus"})
+        assert response.status_code == 422
+
+
+def test_index_is_installed_at_startup(make_sa: MAKE_CLIENT, engine: Engine) -> None:
+    client, router = make_sa(search_fields=["color"])
+    fill(client)
+
+    # Without startup the first search does not run DDL
+    assert client.get("/potato", params={"q": "red"}).status_code == 503
+    assert not router.search_index.installed  # type: ignore
+
+    with client:
+        assert router.search_index.installed  # type: ignore
+        # Rows written before the index existed are indexed when it is created
+        assert ids(client, q="red") == [1, 3]
+
+
+def test_rebuild_installs_the_index(make_sa: MAKE_CLIENT, engine: Engine) -> None:
+    client, router = make_sa(search_fields=["color"])
+    fill(client)
+
+    router.rebuild_search_index(engine)  # type: ignore
+    assert ids(client, q="blue") == [2]
+
+
+def test_non_integer_primary_key_is_rejected(
+    get_db: Callable[[], Iterator[Any]], engine: Engine
+) -> None:
+    LeekBase.metadata.create_all(bind=engine)
+    router = SQLAlchemyCRUDRouter(
+        schema=Leek, db_model=LeekModel, db=get_db, search_fields=["color"]
+    )
+    app = FastAPI()
+    app.include_router(router)
+
+    with pytest.raises(ValueError, match="integer primary key"):
+        with TestClient(app):
+            pass
+
+
+def test_unknown_fields_are_rejected(make_sa: MAKE_CLIENT) -> None:
+    with pytest.raises(AssertionError):
+        make_sa(search_fields=["bogus"])
+
+
+def test_off_by_default(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa()
+    with client:
+        fill(client)
+
+        assert router.search_index is None  # type: ignore
+        assert ids(client, q="blue") == [1, 2, 3]
@@ -0,0 +1,180 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, List
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from crouton.core._querylog import (
+    SlowQueryLog,
+    TimedDatabase,
+    _after_cursor_execute,
+    _before_cursor_execute,
+    _current,
+    instrument_engine,
+    plan_warnings,
+)
+
+from .conftest import MAKE_CLIENT, PotatoModel, potato
+
+
+def test_slow_queries_are_logged(make_sa: MAKE_CLIENT, engine: Engine) -> None:
+    client, _ = make_sa(slow_query_threshold=0.0)
+    client.post("/potato", json=potato(1))
+    client.get("/potato", params={"sort": "mass"})
+
+    entries = client.get("/potato/_slow_queries").json()
+    get_all = [e for e in entries if e["route"] == "get_all"]
+    assert get_all[0]["prefix"] == "/potato"
+    assert get_all[0]["statement"].startswith("SELECT")
+    assert get_all[0]["plan"]
+    assert "unindexed ORDER BY" in get_all[0]["warnings"]
+    assert {e["route"] for e in entries} >= {"create", "get_all"}
+    assert event.contains(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def test_only_the_router_engine_is_timed(make_sa: MAKE_CLIENT, tmp_path: Any) -> None:
+    client, router = make_sa(slow_query_threshold=0.0)
+    client.get("/potato")
+    router.slow_query_log.clear()  # type: ignore
+
+    other = create_engine(f"sqlite:///{tmp_path / 'other.db'}")
+    token = _current.set((router.slow_query_log, ("/potato", "get_all")))
+    try:
+        with other.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    finally:
+        _current.reset(token)
+
+    assert router.slow_query_log.entries() == []  # type: ignore
+    assert not event.contains(other, "before_cursor_execute", _before_cursor_execute)
+
+
+def test_fast_queries_and_disabled_route(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa(slow_query_threshold=60.0, slow_query_route=False)
+    client.get("/potato")
+
+    assert router.slow_query_log.entries() == []  # type: ignore
+    assert client.get("/potato/_slow_queries").status_code == 422
+
+
+def test_slow_queries_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+
+    assert router.slow_query_log is None
+    assert client.get("/potato/_slow_queries").status_code == 422
+
+
+class FakeUrl:
+    dialect = "postgresql"
+
+
+class FakeDatabase:
+    url = FakeUrl()
+
+    def __init__(self) -> None:
+        self.queries: List[Any] = []
+        self.transactions = 0
+
+    async def fetch_all(self, query: Any, *args: Any) -> List[Any]:
+        self.queries.append(query)
+        return [("Seq Scan on potatoes",)]
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        self.transactions += 1
+        yield
+
+
+def test_timed_database_compiles_with_its_dialect() -> None:
+    database = FakeDatabase()
+    log = SlowQueryLog(0.0)
+    table = PotatoModel.__table__
+    query = table.select().where(table.c.color.ilike("r%"), table.c.id.in_([1, 2]))
+
+    async def main() -> None:
+        token = _current.set((log, ("/potato", "get_all")))
+        try:
+            await TimedDatabase(database).fetch_all(query)
+        finally:
+            _current.reset(token)
+
+    asyncio.run(main())
+    (entry,) = log.entries()
+    assert "ILIKE" in entry.statement
+    assert entry.parameters == {"color_1": "r%", "id_1_1": 1, "id_1_2": 2}
+    assert entry.warnings == ["full table scan"]
+    assert str(database.queries[1]).startswith("EXPLAIN SELECT")
+    assert database.transactions == 1
+
+
+def test_plan_warnings() -> None:
+    plan = ["SCAN potatoes", "USE TEMP B-TREE FOR ORDER BY"]
+    assert plan_warnings(plan) == ["full table scan", "unindexed ORDER BY"]
+    assert plan_warnings(["SEARCH potatoes USING INTEGER PRIMARY KEY"]) == []
+
+
+def test_only_dml_is_explained(make_sa: MAKE_CLIENT, engine: Engine) -> None:
+    _, router = make_sa(slow_query_threshold=0.0)
+    log = router.slow_query_log
+    instrument_engine(engine)
+    token = _current.set((log, ("/potato", "sync")))
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("SAVEPOINT sp"))
+            conn.execute(text("RELEASE SAVEPOINT sp"))
+            conn.execute(text("CREATE TABLE IF NOT EXISTS leeks (id INTEGER)"))
+            conn.execute(text("WITH t AS (SELECT 1) SELECT * FROM t"))
+    finally:
+        _current.reset(token)
+
+    plans = {e.statement.split()[0]: e.plan for e in log.entries()}  # type: ignore
+    assert plans["SAVEPOINT"] == plans["RELEASE"] == plans["CREATE"] == []
+    assert plans["WITH"]
+
+
+class FakeCursor:
+    def __init__(self, executed: List[str]) -> None:
+        self.executed = executed
+
+    def execute(self, statement: str, parameters: Any = None) -> None:
+        self.executed.append(statement)
+        if statement.startswith("EXPLAIN"):
+            raise RuntimeError("cannot explain")
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    class dialect:
+        name = "postgresql"
+
+    def __init__(self) -> None:
+        self.info = {"crouton_query_start": [0.0]}
+        self.executed: List[str] = []
+        self.connection = self
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.executed)
+
+    def in_transaction(self) -> bool:
+        return True
+
+
+def test_failed_explain_keeps_the_postgresql_transaction() -> None:
+    log = SlowQueryLog(0.0)
+    conn = FakeConnection()
+    token = _current.set((log, ("/potato", "get_all")))
+    try:
+        _after_cursor_execute(conn, None, "SELECT 1", {}, None, False)
+    finally:
+        _current.reset(token)
+
+    assert conn.executed == [
+        "SAVEPOINT crouton_explain",
+        "EXPLAIN SELECT 1",
+        "ROLLBACK TO SAVEPOINT crouton_explain",
+        "RELEASE SAVEPOINT crouton_explain",
+    ]
+    assert log.entries()[0].plan == ["EXPLAIN failed: cannot explain"]
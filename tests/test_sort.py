@@ -0,0 +1,128 @@
+import random
+from typing import List, Optional
+
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from crouton.core.mem import MAX_SORTED_INDEXES, SortedIndex
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def fill(client: TestClient) -> None:
+    for i, (mass, color) in enumerate([(3, "red"), (1, "blue"), (2, "red")], 1):
+        client.post("/potato", json=potato(i, color=color, mass=float(mass)))
+
+
+def test_default_order_is_the_primary_key(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    fill(client)
+
+    assert [p["id"] for p in client.get("/potato").json()] == [1, 2, 3]
+
+
+def test_sort(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    fill(client)
+
+    def ids(sort: str) -> List[int]:
+        response = client.get("/potato", params={"sort": sort})
+        assert response.status_code == 200, response.text
+        return [p["id"] for p in response.json()]
+
+    assert ids("mass") == [2, 3, 1]
+    assert ids("-mass") == [1, 3, 2]
+    # The primary key breaks ties, ascending unless given
+    assert ids("color") == [2, 1, 3]
+    assert ids("color,-id") == [2, 3, 1]
+    assert ids("-color,mass") == [3, 1, 2]
+
+
+def test_sort_is_paginated(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    fill(client)
+
+    pages = [
+        client.get("/potato", params={"sort": "mass", "skip": skip, "limit": 1})
+        for skip in range(3)
+    ]
+    assert [page.json()[0]["id"] for page in pages] == [2, 3, 1]
+
+
+def test_sort_sees_writes(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client()
+    fill(client)
+    client.get("/potato", params={"sort": "mass"})
+
+    client.post("/potato", json=potato(4, mass=0.0))
+    client.delete("/potato/1")
+    ids = [p["id"] for p in client.get("/potato", params={"sort": "mass"}).json()]
+    assert ids == [4, 2, 3]
+
+
+def test_unknown_field_is_rejected(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(sort_fields=["mass"])
+    fill(client)
+
+    response = client.get("/potato", params={"sort": "color"})
+    assert response.status_code == 422
+    assert "sortable fields are mass" in response.text
+    assert client.get("/potato", params={"sort": "bogus"}).status_code == 422
+    assert client.get("/potato", params={"sort": "-mass"}).status_code == 200
+
+
+def test_sorted_indexes_are_bounded(make_mem: MAKE_CLIENT) -> None:
+    client, router = make_mem()
+    fill(client)
+
+    fields = ["mass", "-mass", "color", "-color", "type", "-type", "thickness"]
+    orders = [f"{a},{b}" for a in fields for b in fields if a.strip("-") != b]
+    for sort in orders:
+        client.get("/potato", params={"sort": sort})
+
+    assert len(router._sorted) == MAX_SORTED_INDEXES  # type: ignore
+
+
+def test_sorted_indexes_follow_writes(make_mem: MAKE_CLIENT) -> None:
+    client, router = make_mem(patch_route=True)
+    fill(client)
+    client.get("/potato", params={"sort": "-color,mass"})
+    (index,) = router._sorted.values()  # type: ignore
+
+    client.post("/potato", json=potato(4, color="red", mass=2.5))
+    client.patch("/potato/1", json={"color": "blue"})
+    client.put("/potato/3", json=potato(3, color="green", mass=2.0))
+    client.delete("/potato/2")
+
+    response = client.get("/potato", params={"sort": "-color,mass"})
+    assert [p["id"] for p in response.json()] == [4, 3, 1]
+    # Kept sorted in place rather than sorted again
+    assert router._sorted[(("color", True), ("mass", False), ("id", False))] is index
+
+
+class Leek(BaseModel):
+    id: int
+    size: Optional[float]
+    name: str
+
+
+def test_sorted_index_matches_a_full_sort() -> None:
+    random.seed(1)
+    leeks = [
+        Leek(id=i, size=random.choice([None, 1.0, 2.0]), name=random.choice("abc"))
+        for i in range(200)
+    ]
+    sort = [("size", True), ("name", False), ("id", False)]
+    index = SortedIndex(sort, leeks[:100])
+    for leek in leeks[100:]:
+        index.add(leek)
+    for leek in leeks[::3]:
+        index.remove(leek)
+
+    expected = sorted(
+        (leek for i, leek in enumerate(leeks) if i % 3),
+        key=lambda leek: (leek.name, leek.id),
+    )
+    # None sorts first ascending, so last descending
+    expected.sort(key=lambda leek: (leek.size is not None, leek.size), reverse=True)
+    assert [leek.id for leek in index.models] == [leek.id for leek in expected]
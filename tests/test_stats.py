@@ -0,0 +1,173 @@
+from typing import Any, Dict, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from crouton.core import sqlalchemy
+
+from .conftest import MAKE_CLIENT, potato
+
+FIELDS = ["mass", "color"]
+
+
+def stats(client: TestClient) -> Dict[str, Any]:
+    response = client.get("/potato/_stats")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def fill(client: TestClient) -> None:
+    for i, color in enumerate(["red", "red", "blue"], 1):
+        client.post("/potato", json=potato(i, color=color))
+
+
+def test_stats(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(stats_fields=FIELDS, patch_route=True)
+    fill(client)
+
+    assert stats(client) == {
+        "count": 3,
+        "fields": {
+            "mass": {"count": 3, "sum": 6.0, "avg": 2.0, "min": 1.0, "max": 3.0},
+            "color": {"counts": {"blue": 1, "red": 2}},
+        },
+    }
+
+    client.post("/potato", json=potato(4, color="blue"))
+    client.put("/potato/1", json=potato(1, color="blue", mass=5.0))
+    client.patch("/potato/2", json={"color": "green"})
+    client.delete("/potato/3")
+
+    assert stats(client) == {
+        "count": 3,
+        "fields": {
+            "mass": {"count": 3, "sum": 11.0, "avg": 11 / 3, "min": 2.0, "max": 5.0},
+            "color": {"counts": {"blue": 2, "green": 1}},
+        },
+    }
+
+
+def test_failed_writes_are_not_counted(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(stats_fields=FIELDS, patch_route=True)
+    fill(client)
+    before = stats(client)
+
+    assert client.put("/potato/9", json=potato(9)).status_code == 404
+    assert client.patch("/potato/9", json={"mass": 1.0}).status_code == 404
+    assert client.patch("/potato/1", json={"mass": None}).status_code == 422
+    assert client.delete("/potato/9").status_code == 404
+    assert stats(client) == before
+
+
+def test_removed_extremes_are_recomputed(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(stats_fields=FIELDS)
+    fill(client)
+    stats(client)
+
+    client.delete("/potato/3")
+    client.delete("/potato/1")
+    assert stats(client)["fields"]["mass"] == {
+        "count": 1,
+        "sum": 2.0,
+        "avg": 2.0,
+        "min": 2.0,
+        "max": 2.0,
+    }
+
+    client.delete("/potato/2")
+    assert stats(client)["fields"]["mass"]["min"] is None
+
+
+def test_writes_of_many_rows_rebuild(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(stats_fields=FIELDS, bulk_route=True)
+    fill(client)
+    stats(client)
+
+    response = client.delete("/potato", params={"color": "red"})
+    assert response.status_code == 200, response.text
+    assert stats(client)["count"] == 1
+
+    client.delete("/potato")
+    assert stats(client) == {
+        "count": 0,
+        "fields": {
+            "mass": {"count": 0, "sum": 0, "avg": None, "min": None, "max": None},
+            "color": {"counts": {}},
+        },
+    }
+
+
+def test_writes_do_not_scan_the_table(
+    make_sa: MAKE_CLIENT, statements: List[str]
+) -> None:
+    def reads(client: TestClient) -> List[str]:
+        statements.clear()
+        response = client.post("/potato", json=potato(4))
+        id_ = response.json()["id"]
+        client.put(f"/potato/{id_}", json=potato(4, mass=8.0))
+        client.patch(f"/potato/{id_}", json={"mass": 9.0})
+        client.delete(f"/potato/{id_}")
+        return [s for s in statements if "FROM potatoes" in s]
+
+    plain, _ = make_sa(patch_route=True)
+    client, _ = make_sa(stats_fields=FIELDS, patch_route=True)
+    fill(client)
+    stats(client)
+
+    tracked = reads(client)
+    assert not [s for s in tracked if "GROUP BY" in s or "count(" in s]
+    # Only the patch, an UPDATE ... RETURNING, reads the values it replaces
+    assert len(tracked) == len(reads(plain)) + 1
+    assert stats(client)["fields"]["mass"]["max"] == 3.0
+
+
+def test_routers_share_persisted_stats(make_sa: MAKE_CLIENT) -> None:
+    # Routers of two processes write the same table and side table
+    first, _ = make_sa(stats_fields=FIELDS)
+    second, _ = make_sa(stats_fields=FIELDS)
+    fill(first)
+    stats(first)
+
+    first.post("/potato", json=potato(4, color="blue"))
+    second.post("/potato", json=potato(5, color="blue"))
+    second.delete("/potato/1")
+
+    expected = {"count": 4, "sum": 14.0, "avg": 3.5, "min": 2.0, "max": 5.0}
+    assert stats(first)["fields"]["mass"] == expected
+    assert stats(second)["fields"]["color"] == {"counts": {"blue": 3, "red": 1}}
+
+
+@pytest.mark.parametrize("drop_fails", [False, True])
+def test_failed_updates_rebuild_stats(
+    make_sa: MAKE_CLIENT, monkeypatch: pytest.MonkeyPatch, drop_fails: bool
+) -> None:
+    client, _ = make_sa(stats_fields=FIELDS)
+    fill(client)
+    stats(client)
+
+    def increment_stats(bind: Any, table: str, stats: Any, changes: Any) -> None:
+        if changes is not None or drop_fails:
+            raise RuntimeError("database went away")
+
+        increment(bind, table, stats, changes)
+
+    increment = sqlalchemy.increment_stats
+    monkeypatch.setattr(sqlalchemy, "increment_stats", increment_stats)
+    assert client.post("/potato", json=potato(4, color="blue")).status_code == 200
+    monkeypatch.undo()
+
+    assert stats(client)["count"] == 4
+    assert stats(client)["fields"]["color"] == {"counts": {"blue": 2, "red": 2}}
+
+
+def test_unknown_fields_are_rejected(make_client: MAKE_CLIENT) -> None:
+    with pytest.raises(AssertionError):
+        make_client(stats_fields=["bogus"])
+
+
+def test_off_by_default(make_client: MAKE_CLIENT) -> None:
+    client, router = make_client()
+    fill(client)
+
+    assert router.stats is None
+    assert client.get("/potato/_stats").status_code == 422
@@ -0,0 +1,99 @@
+from typing import Any, Dict, List
+
+from fastapi.testclient import TestClient
+
+from crouton.core._sync import complete_page
+from crouton.core._utils import AttrDict
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def sync(client: TestClient, **params: Any) -> Dict[str, Any]:
+    response = client.get("/potato/sync", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def changed(page: Dict[str, Any]) -> List[Any]:
+    return [(c["id"], c["deleted"]) for c in page["changes"]]
+
+
+def test_sync(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(change_tracking=True)
+    for i in range(1, 4):
+        client.post("/potato", json=potato(i))
+
+    with client:
+        # Rows written before tracking was installed are stamped with it
+        page = sync(client)
+        assert changed(page) == [(1, False), (2, False), (3, False)]
+        assert page["changes"][0]["data"]["mass"] == 1.0
+        assert not page["more"]
+
+        client.put("/potato/1", json=potato(1, color="blue"))
+        client.delete("/potato/2")
+        client.post("/potato", json=potato(4))
+
+        update = sync(client, since=page["seq"])
+        assert changed(update) == [(1, False), (2, True), (4, False)]
+        assert update["changes"][0]["data"]["color"] == "blue"
+        assert update["changes"][1]["data"] is None
+        assert sync(client, since=update["seq"]) == {
+            "changes": [],
+            "seq": update["seq"],
+            "more": False,
+        }
+
+
+def test_installed_at_startup(make_sa: MAKE_CLIENT, statements: List[str]) -> None:
+    client, _ = make_sa(change_tracking=True)
+    assert client.get("/potato/sync").status_code == 503
+
+    with client:
+        statements.clear()
+        sync(client)
+        assert not [s for s in statements if "CREATE" in s or "INSERT" in s]
+
+
+def test_sync_pages(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(change_tracking=True)
+    with client:
+        for i in range(1, 6):
+            client.post("/potato", json=potato(i))
+
+        seen, since, more = [], 0, True
+        while more:
+            page = sync(client, since=since, limit=2)
+            assert len(page["changes"]) <= 2
+            seen += [c["id"] for c in page["changes"]]
+            since, more = page["seq"], page["more"]
+
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_pages_end_between_positions() -> None:
+    def rows(*positions: int) -> List[Any]:
+        return [AttrDict(row_id=str(i), position=p) for i, p in enumerate(positions)]
+
+    assert complete_page(rows(1, 2), 2, rows) == (rows(1, 2), False)
+    # The transaction the limit splits goes to the next page
+    page, more = complete_page(rows(1, 2, 2), 2, rows)
+    assert [c.position for c in page] == [1] and more
+    # Unless it is the first one, returned whole
+    loaded = rows(5, 5, 5, 5)
+    assert complete_page(rows(5, 5, 5), 2, lambda _: loaded) == (loaded, True)
+
+
+def test_invalid_parameters(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(change_tracking=True)
+
+    assert client.get("/potato/sync", params={"since": -1}).status_code == 422
+    assert client.get("/potato/sync", params={"limit": 0}).status_code == 422
+    assert client.get("/potato/sync", params={"limit": 10_001}).status_code == 422
+
+
+def test_off_by_default(make_sa: MAKE_CLIENT) -> None:
+    client, router = make_sa()
+
+    assert router.change_tracker is None
+    assert client.get("/potato/sync").status_code == 422
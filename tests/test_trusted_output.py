@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+from fastapi.exceptions import ResponseValidationError
+from pydantic import BaseModel
+
+from crouton.core._encoders import row_encoder
+
+from .conftest import MAKE_CLIENT, Potato, potato
+
+
+def test_trusted_output_matches_the_response_model(make_client: MAKE_CLIENT) -> None:
+    plain, _ = make_client(get_many_route=True)
+    trusted, _ = make_client(get_many_route=True, trusted_output=True)
+    for client in (plain, trusted):
+        for i in range(1, 4):
+            client.post("/potato", json=potato(i))
+
+    for url in ("/potato", "/potato/2", "/potato/_many?ids=3&ids=9"):
+        res = trusted.get(url)
+        assert res.status_code == 200
+        assert res.headers["content-type"] == "application/json"
+        assert res.json() == plain.get(url).json()
+
+
+def test_trusted_output_errors(make_client: MAKE_CLIENT) -> None:
+    client, _ = make_client(trusted_output=True)
+
+    assert client.get("/potato/9").status_code == 404
+    assert client.get("/potato/nine").status_code == 422
+    assert client.get("/potato", params={"limit": 0}).status_code == 422
+
+
+def test_trusted_output_off_by_default(make_mem: MAKE_CLIENT) -> None:
+    for trusted in (False, True):
+        client, router = make_mem(trusted_output=trusted)
+        client.post("/potato", json=potato(1))
+        router._index[1] = Potato.construct(**potato(1, mass="heavy", id=1))
+
+        if trusted:
+            # Trusted rows are written as they are
+            assert client.get("/potato/1").json()["mass"] == "heavy"
+        else:
+            with pytest.raises(ResponseValidationError):
+                client.get("/potato/1")
+
+
+class Tag(BaseModel):
+    name: str
+    added: datetime
+
+
+class Item(BaseModel):
+    id: int
+    note: Optional[str]
+    seen: Optional[datetime]
+    tags: List[Tag]
+    scores: List[float]
+
+
+def test_row_encoder() -> None:
+    when = datetime(2024, 1, 2, 3, 4, 5)
+    item = Item(
+        id=1, note=None, seen=when, tags=[Tag(name="a", added=when)], scores=[1, 2]
+    )
+
+    assert row_encoder(Item)(item) == {
+        "id": 1,
+        "note": None,
+        "seen": "2024-01-02T03:04:05",
+        "tags": [{"name": "a", "added": "2024-01-02T03:04:05"}],
+        "scores": [1.0, 2.0],
+    }
+    assert row_encoder(Item)(item.copy(update={"seen": None}))["seen"] is None
@@ -0,0 +1,36 @@
+import pytest
+
+from .conftest import MAKE_CLIENT, potato
+
+
+def test_upsert(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(upsert_route=True)
+    client.post("/potato", json=potato(1))
+
+    body = [potato(9, id=1), potato(2, id=2), potato(3, id=2)]
+    res = client.put("/potato", json=body)
+    assert res.status_code == 200
+    # The last row of a duplicated id wins, and each id is returned once
+    assert res.json() == [potato(9, id=1), potato(3, id=2)]
+    assert client.get("/potato").json() == res.json()
+
+
+def test_upsert_validation(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa(upsert_route=True, upsert_limit=2)
+
+    assert client.put("/potato", json=[]).status_code == 422
+    body = [potato(i, id=i) for i in range(1, 4)]
+    assert client.put("/potato", json=body).status_code == 422
+    assert client.put("/potato", json=[{"id": 1}]).status_code == 422
+    assert client.get("/potato").json() == []
+
+
+def test_upsert_off_by_default(make_sa: MAKE_CLIENT) -> None:
+    client, _ = make_sa()
+
+    assert client.put("/potato", json=[potato(1, id=1)]).status_code == 405
+
+
+def test_upsert_unsupported(make_mem: MAKE_CLIENT) -> None:
+    with pytest.raises(NotImplementedError):
+        make_mem(upsert_route=True)
@@ -0,0 +1,155 @@
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy import Column, Float, Integer
+from sqlalchemy.orm import declarative_base
+
+from crouton import SQLAlchemyCRUDRouter
+
+Base = declarative_base()
+
+
+class Carrot(BaseModel):
+    id: int
+    mass: float
+    version: int = 0
+
+    class Config:
+        orm_mode = True
+
+
+class CarrotModel(Base):
+    __tablename__ = "carrots"
+    id = Column(Integer, primary_key=True)
+    mass = Column(Float)
+    version = Column(Integer, nullable=False, default=0)
+    __mapper_args__ = {"version_id_col": version}
+
+
+class OnionModel(Base):
+    __tablename__ = "onions"
+    id = Column(Integer, primary_key=True)
+    mass = Column(Float)
+    version = Column(Integer, nullable=False, default=0)
+
+
+@pytest.fixture(params=["version_id_col", "version_column"])
+def versioned(
+    request: Any, engine: Any, get_db: Callable[[], Iterator[Any]]
+) -> Tuple[TestClient, str, int]:
+    Base.metadata.create_all(bind=engine)
+    if request.param == "version_id_col":
+        router = SQLAlchemyCRUDRouter(
+            schema=Carrot, db_model=CarrotModel, db=get_db, patch_route=True
+        )
+    else:
+        router = SQLAlchemyCRUDRouter(
+            schema=Carrot,
+            db_model=OnionModel,
+            db=get_db,
+            patch_route=True,
+            version_column="version",
+        )
+
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    prefix = "/" + router.prefix.strip("/")
+    # The ORM numbers the versions of a version_id_col from 1
+    version = client.post(prefix, json={"mass": 1, "version": 0}).json()["version"]
+    return client, prefix, version
+
+
+def test_update_with_version(versioned: Tuple[TestClient, str, int]) -> None:
+    client, prefix, v = versioned
+    url = f"{prefix}/1"
+
+    res = client.put(url, json={"mass": 2, "version": v}, headers=if_match(v))
+    assert res.status_code == 200
+    assert res.json() == {"id": 1, "mass": 2, "version": v + 1}
+
+    res = client.put(url, json={"mass": 3, "version": v + 1}, headers=if_match(v))
+    assert res.status_code == 412
+    # Without If-Match the version of the body is expected
+    res = client.put(url, json={"mass": 3, "version": v})
+    assert res.status_code == 412
+    res = client.put(url, json={"mass": 3, "version": v + 1})
+    assert res.json() == {"id": 1, "mass": 3, "version": v + 2}
+    assert client.put(f"{prefix}/9", json={"mass": 3, "version": v}).status_code == 404
+
+
+def test_patch_with_version(versioned: Tuple[TestClient, str, int]) -> None:
+    client, prefix, v = versioned
+    url = f"{prefix}/1"
+
+    res = client.patch(url, json={"mass": 5}, headers={"If-Match": f'W/"{v}"'})
+    assert res.json() == {"id": 1, "mass": 5, "version": v + 1}
+    assert client.patch(url, json={"mass": 6}, headers=if_match(v)).status_code == 412
+    res = client.patch(url, json={"mass": 6}, headers={"If-Match": "*"})
+    assert res.json()["version"] == v + 2
+    res = client.patch(f"{prefix}/9", json={"mass": 6}, headers=if_match(v))
+    assert res.status_code == 404
+    res = client.patch(url, json={"mass": 6}, headers={"If-Match": "two"})
+    assert res.status_code == 412
+
+
+def test_delete_with_version(versioned: Tuple[TestClient, str, int]) -> None:
+    client, prefix, v = versioned
+
+    assert client.delete(f"{prefix}/1", headers=if_match(v + 3)).status_code == 412
+    assert client.delete(f"{prefix}/9", headers=if_match(v)).status_code == 404
+    res = client.delete(f"{prefix}/1", headers=if_match(v))
+    assert res.json() == {"id": 1, "mass": 1, "version": v}
+    assert client.get(prefix).json() == []
+
+
+def if_match(version: int) -> Dict[str, str]:
+    return {"If-Match": f'"{version}"'}
+
+
+def test_no_version_column(make_sa: Any) -> None:
+    client, _ = make_sa()
+    client.post("/potato", json={"thickness": 1, "mass": 1, "color": "r", "type": "t"})
+
+    # If-Match is not part of the routes of a router without versions
+    body = {"thickness": 1, "mass": 2, "color": "r", "type": "t"}
+    res = client.put("/potato/1", json=body, headers={"If-Match": '"7"'})
+    assert res.status_code == 200
+    assert client.put("/potato/9", json=body).status_code == 404
+
+
+def test_databases_router_versions(tmp_path: Any) -> None:
+    pytest.importorskip("aiosqlite")
+    from databases import Database
+    from sqlalchemy import create_engine
+
+    from crouton import DatabasesCRUDRouter
+
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    Base.metadata.create_all(bind=create_engine(url))
+    database = Database(url)
+    router = DatabasesCRUDRouter(
+        schema=Carrot,
+        table=Base.metadata.tables["onions"],
+        database=database,
+        patch_route=True,
+        version_column="version",
+    )
+    app = FastAPI(on_startup=[database.connect], on_shutdown=[database.disconnect])
+    app.include_router(router)
+
+    with TestClient(app) as client:
+        client.post("/onions", json={"mass": 1, "version": 0})
+        res = client.patch("/onions/1", json={"mass": 2}, headers={"If-Match": '"0"'})
+        assert res.json()["version"] == 1
+        res = client.patch("/onions/1", json={"mass": 3}, headers={"If-Match": '"0"'})
+        assert res.status_code == 412
+        res = client.delete("/onions/1", headers={"If-Match": '"0"'})
+        assert res.status_code == 412
+        res = client.delete("/onions/1", headers={"If-Match": '"1"'})
+        assert res.status_code == 200
+        res = client.delete("/onions/1", headers={"If-Match": '"1"'})
+        assert res.status_code == 404